@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,6 +8,88 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 480
 
+    # Analysis
+    ANALYSIS_BATCH_SIZE: int = 8
+    PIPELINE_QUEUE_SIZE: int = 4
+
+    # Background analysis workers (0 threads = split the CPUs evenly between workers)
+    ANALYSIS_WORKERS: int = 1
+    ANALYSIS_WORKER_THREADS: int = 0
+    JOB_POLL_INTERVAL: float = 1.0
+    # Running jobs are shared by every API process: a cap across all of them (0 = ANALYSIS_WORKERS),
+    # and a heartbeat so only jobs of dead workers are requeued
+    ANALYSIS_MAX_RUNNING_JOBS: int = 0
+    JOB_HEARTBEAT_INTERVAL: float = 10.0
+    JOB_STALE_SECONDS: float = 60.0
+
+    # Split one analysis into up to N time segments run in parallel (1 = off)
+    ANALYSIS_SEGMENTS: int = 1
+    ANALYSIS_MIN_SEGMENT_SECONDS: float = 60.0
+    # Run detection only on the zones' bounding box (margin = fraction of the frame size)
+    ANALYSIS_ROI: bool = False
+    ANALYSIS_ROI_MARGIN: float = 0.05
+    # Tiled inference: overlapping native-resolution tiles merged with cross-tile NMS
+    ANALYSIS_TILED: bool = False
+    TILE_SIZE: int = 640
+    TILE_OVERLAP: float = 0.2
+    TILE_OVERVIEW: bool = True
+    TILE_BATCH: int = 16
+    TILE_NMS_IOU: float = 0.5
+    TILE_NMS_IOS: float = 0.7
+    # Motion gate (opt-in): reuse the last detections when nothing changed inside the zones
+    ANALYSIS_MOTION_GATE: bool = False
+    MOTION_WIDTH: int = 256
+    MOTION_PIXEL_DELTA: int = 20
+    MOTION_THRESHOLD: float = 0.001
+    MOTION_REFRESH_SECONDS: float = 10.0
+    # Tracking (opt-in): persistent IDs for unique visitors, entries, exits and dwell time per zone
+    ANALYSIS_TRACKING: bool = False
+    TRACK_IOU: float = 0.3
+    TRACK_MAX_AGE_SECONDS: float = 1.0
+    TRACK_MIN_HITS: int = 3
+
+    # Raw detections cached per (video content, model, input size, stride)
+    DETECTION_CACHE_ENABLED: bool = True
+    DETECTION_CACHE_DIR: str = "data/cache/detections"
+    DETECTION_CACHE_MAX_MB: int = 2048
+
+    # Columnar frame timeline; the legacy _frames.json is only written on request
+    TIMELINE_FLUSH_ROWS: int = 1024
+    TIMELINE_JSON_EXPORT: bool = False
+    STREAM_FLUSH_SECONDS: float = 2.0
+    # Timeline rollups in the database: min/max/avg per zone and time bucket (seconds)
+    ROLLUP_BUCKETS: List[int] = [1, 10, 60]
+    ROLLUP_INSERT_BATCH: int = 5000
+
+    # Resumable analyses: seconds between checkpoints (0 disables them)
+    CHECKPOINT_INTERVAL_SECONDS: float = 30.0
+
+    # Live views: one analysis per (video, zones) fanned out to every viewer
+    BROADCAST_SUBSCRIBER_QUEUE: int = 4
+    BROADCAST_IDLE_SECONDS: float = 2.0
+    LIVE_WS_MAX_FPS: float = 30.0
+
+    # Per-viewer adaptive quality: JPEG quality/scale/frame skip chasing a delivery latency
+    LIVE_JPEG_QUALITY: int = 70
+    LIVE_DISPLAY_WIDTH: int = 640
+    LIVE_TARGET_LATENCY_MS: float = 500.0
+    LIVE_MAX_FRAME_SKIP: int = 4
+    LIVE_ADAPT_INTERVAL: float = 1.0
+
+    # Live cameras (RTSP/HTTP): reconnect backoff, stall timeout and rolling count window
+    CAMERA_RECONNECT_SECONDS: float = 1.0
+    CAMERA_MAX_RECONNECT_SECONDS: float = 30.0
+    CAMERA_STALL_SECONDS: float = 5.0
+    CAMERA_WINDOW_SECONDS: float = 60.0
+    # Shared inference for all cameras: fair batched model calls on a fixed worker pool,
+    # each camera analyzed at most CAMERA_FPS_BUDGET frames/s unless it sets its own budget
+    CAMERA_SCHEDULER: bool = True
+    CAMERA_INFERENCE_WORKERS: int = 1
+    CAMERA_MAX_BATCH: int = 16
+    CAMERA_BATCH_WAIT_MS: float = 20.0
+    CAMERA_INFERENCE_TIMEOUT_SECONDS: float = 30.0
+    CAMERA_FPS_BUDGET: float = 5.0
+
     class Config:
         env_file = ".env"
         extra = "ignore"
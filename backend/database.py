@@ -1,5 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn, DDLElement
+from sqlalchemy.ext.compiler import compiles
 from backend.core.config import settings
 
 engine = create_engine(settings.DATABASE_URL)
@@ -11,4 +13,44 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+class AddColumn(DDLElement):
+    """ALTER TABLE ... ADD COLUMN for a model column, compiled by the dialect"""
+
+    def __init__(self, column):
+        self.column = column
+
+
+@compiles(AddColumn)
+def _compile_add_column(element, compiler, **kw):
+    table = compiler.preparer.format_table(element.column.table)
+    return f"ALTER TABLE {table} ADD COLUMN {compiler.process(CreateColumn(element.column), **kw)}"
+
+
+def add_missing_columns(metadata, bind=engine):
+    """Add columns declared on the models but missing from tables that already exist.
+
+    create_all only creates missing tables, so a column added to a model
+    would otherwise never reach an existing database. A NOT NULL column
+    needs a server default to fill the existing rows; one without is
+    skipped with a warning.
+    """
+    existing = inspect(bind)
+    tables = set(existing.get_table_names())
+    with bind.begin() as connection:
+        for table in metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            present = {column['name'] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    print(f"[database] can't add NOT NULL column {table.name}.{column.name} without a server default")
+                    continue
+                if hasattr(column.type, 'create'):
+                    # Named types (a PostgreSQL enum) have to exist before the column
+                    column.type.create(connection, checkfirst=True)
+                connection.execute(AddColumn(column))
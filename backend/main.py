@@ -1,10 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.routers import user_router, admin_router, video_router, zone_router, analysis_router, export_router, chatbot_router
+from backend.routers import user_router, admin_router, video_router, zone_router, analysis_router, camera_router, export_router, chatbot_router
 from backend import models, database
+from backend.services.job_queue import worker_pool
 
 # create tables if not already
 models.Base.metadata.create_all(bind=database.engine)
+database.add_missing_columns(models.Base.metadata)
 
 app = FastAPI(title="Crowd Count API")
 
@@ -22,9 +24,18 @@ app.include_router(admin_router.router)
 app.include_router(video_router.router)
 app.include_router(zone_router.router)
 app.include_router(analysis_router.router)
+app.include_router(camera_router.router)
 app.include_router(export_router.router)
 app.include_router(chatbot_router.router)
 
+@app.on_event("startup")
+def start_analysis_workers():
+    worker_pool.start()
+
+@app.on_event("shutdown")
+def stop_analysis_workers():
+    worker_pool.stop()
+
 @app.get("/")
 def root():
     return {"message": "Backend running!"}
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, TIMESTAMP, func
+from sqlalchemy import Column, Integer, String, Boolean, Enum, Float, Index, TIMESTAMP, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import ForeignKey, JSON
 import enum
@@ -46,9 +46,28 @@ class Zone(Base):
     video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
     label = Column(String(100), nullable=False)
     coordinates = Column(JSON, nullable=False)
+    zone_type = Column(
+        Enum("occupancy", "line", name="zone_type"),
+        default="occupancy",
+        server_default="occupancy",
+        nullable=False
+    )
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
+#live camera feeds; zones are kept on the camera, in the same format as Zone rows
+class Camera(Base):
+    __tablename__ = "cameras"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(100), nullable=False)
+    url = Column(String(500), nullable=False)
+    zones = Column(JSON, nullable=False, default=list)
+    fps_budget = Column(Float, nullable=True)
+    priority = Column(Integer, nullable=False, default=1, server_default="1")
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
 
@@ -61,4 +80,49 @@ class AnalysisResult(Base):
     zone_counts = Column(JSON)
     processed_at = Column(TIMESTAMP, server_default=func.now())
     created_at = Column(TIMESTAMP, server_default=func.now())
-    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+# Timeline of an analysis aggregated per zone into fixed time buckets (1s/10s/1min)
+class ZoneCountRollup(Base):
+    __tablename__ = "zone_count_rollups"
+    __table_args__ = (
+        Index("ix_zone_count_rollups_result", "result_id", "bucket_seconds", "zone_label", "bucket_start"),
+        Index("ix_zone_count_rollups_video", "video_id", "bucket_seconds", "bucket_start"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    result_id = Column(Integer, ForeignKey("analysis_results.id", ondelete="CASCADE"), nullable=False)
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
+    zone_id = Column(Integer)
+    zone_label = Column(String(100), nullable=False)
+    bucket_seconds = Column(Integer, nullable=False)
+    bucket_start = Column(Float, nullable=False)
+    min_count = Column(Float, nullable=False)
+    max_count = Column(Float, nullable=False)
+    avg_count = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False)
+
+#background analysis jobs
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(
+        Enum("queued", "running", "completed", "failed", "cancelled", name="job_status"),
+        default="queued",
+        nullable=False,
+        index=True
+    )
+    params = Column(JSON)
+    progress = Column(Integer, default=0)
+    pipeline_stats = Column(JSON)
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    worker = Column(String(100))
+    heartbeat_at = Column(TIMESTAMP)
+    error = Column(String(1000))
+    result_id = Column(Integer, ForeignKey("analysis_results.id", ondelete="SET NULL"))
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    started_at = Column(TIMESTAMP)
+    finished_at = Column(TIMESTAMP)
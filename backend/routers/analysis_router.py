@@ -1,14 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
 from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import datetime
 from backend import database, models
+from backend.core.config import settings
 from backend.services.yolo_service import yolo_service
+from backend.services.broadcast import Subscription, live_hub
+from backend.services.sampling import FILL_MODES
+from backend.services.preprocess import roi_covers
+from backend.services.zone_geometry import split_zones, zone_shape_error
+from backend.services.detection_cache import detection_cache
+from backend.services import recount as recount_service
+from backend.services.rollups import save_rollups
+from backend.services.timeline import TimelineReader, TimelineWriter, is_timeline, open_timeline, remove_frame_data, timeline_path_for
+from backend.services import job_queue, stream_sessions
+from typing import List, Optional
+import asyncio
+import json
 import os
-import traceback
+import time
 
 router = APIRouter(prefix="/api/analysis", tags=["Analysis"])
 
+def validate_sampling(detect_stride: int, target_fps: Optional[float], fill: str):
+    """Reject invalid detection stride / target fps / fill options"""
+    if detect_stride < 1:
+        raise HTTPException(status_code=400, detail="detect_stride must be at least 1")
+    if target_fps is not None and target_fps <= 0:
+        raise HTTPException(status_code=400, detail="target_fps must be positive")
+    if fill not in FILL_MODES:
+        raise HTTPException(status_code=400, detail=f"fill must be one of: {', '.join(FILL_MODES)}")
+
+def negotiate_fps(max_fps: Optional[float]) -> float:
+    """Frame rate a WebSocket client gets: what it asked for, within (0, LIVE_WS_MAX_FPS]"""
+    if not max_fps or max_fps <= 0:
+        return settings.LIVE_WS_MAX_FPS
+    return min(float(max_fps), settings.LIVE_WS_MAX_FPS)
+
 @router.get("/progress/{video_id}")
 def get_progress(video_id: int, db: Session = Depends(database.get_db)):
     """Get analysis progress for a video"""
@@ -17,8 +46,35 @@ def get_progress(video_id: int, db: Session = Depends(database.get_db)):
         return {"percentage": 0, "current": 0, "total": 0}
     
     progress_key = f"video_{video.filepath}"
-    progress = yolo_service.progress.get(progress_key, {'percentage': 0, 'current': 0, 'total': 0})
-    return progress
+    progress = yolo_service.progress.get(progress_key)
+    if progress:
+        return progress
+    
+    # Full analyses run in worker processes, which report progress on the job row
+    job = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.video_id == video_id,
+        models.AnalysisJob.status.in_(("queued", "running"))
+    ).order_by(models.AnalysisJob.id.desc()).first()
+    if job:
+        return {"percentage": job.progress or 0, "current": 0, "total": 0, "job_id": job.id, "status": job.status}
+    return {"percentage": 0, "current": 0, "total": 0}
+
+@router.get("/pipeline/{video_id}")
+def get_pipeline_stats(video_id: int, db: Session = Depends(database.get_db)):
+    """Get queue depth and per-stage latency of the analysis pipelines for a video"""
+    video = db.query(models.Video).filter(models.Video.id == video_id).first()
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    stats = yolo_service.get_pipeline_stats(video.filepath)
+    # Full analyses run in worker processes, which publish their pipeline stats on the job row
+    job = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.video_id == video_id,
+        models.AnalysisJob.pipeline_stats.isnot(None)
+    ).order_by(models.AnalysisJob.id.desc()).first()
+    if job and 'video' not in stats:
+        stats = dict(job.pipeline_stats, **stats, job_id=job.id, status=job.status)
+    return stats
 
 @router.get("/all/{username}")
 def get_all_analysis(username: str, db: Session = Depends(database.get_db)):
@@ -51,6 +107,7 @@ def get_video_analysis(video_id: int, db: Session = Depends(database.get_db)):
     
     if not result:
         return None
+    video = db.query(models.Video).filter(models.Video.id == video_id).first()
     
     return {
         "id": result.id,
@@ -60,16 +117,15 @@ def get_video_analysis(video_id: int, db: Session = Depends(database.get_db)):
         "total_count": result.total_count,
         "zone_counts": result.zone_counts,
         "processed_at": result.processed_at.isoformat(),
-        "output_video": f"/api/analysis/result/{video_id}?path={result.output_video_path}"
+        "output_video": f"/api/analysis/result/{video_id}?path={result.output_video_path}",
+        "summary": video.result_summary if video else None
     }
 
-@router.post("/start/stream")
-def start_analysis_stream(
-    video_id: int = Body(...),
-    username: str = Body(...),
-    db: Session = Depends(database.get_db)
-):
-    """Start real-time streaming analysis"""
+def live_stream_subscription(db: Session, video_id: int, username: str, detect_stride: int,
+                             target_fps: Optional[float], fill: str, resume: bool, transport: str):
+    """Subscribe to the live streaming analysis of a video, starting (or resuming) it if none is running"""
+    validate_sampling(detect_stride, target_fps, fill)
+    
     # Verify user
     user = db.query(models.User).filter(models.User.username == username).first()
     if not user:
@@ -92,15 +148,167 @@ def start_analysis_stream(
         {
             'id': zone.id,
             'label': zone.label,
-            'coordinates': zone.coordinates
+            'coordinates': zone.coordinates,
+            'type': zone.zone_type
         }
         for zone in zones
     ]
     
-    return StreamingResponse(
-        yolo_service.analyze_video_stream(video.filepath, zones_data),
-        media_type="text/event-stream"
-    )
+    sampling = {'detect_stride': detect_stride, 'target_fps': target_fps, 'fill': fill}
+    zones_key = stream_sessions.zones_key(zones_data)
+    user_id = user.id
+    info = {'video_id': video.id, 'zones_key': zones_key, 'mode': 'analysis', **sampling}
+    
+    def start():
+        # Only runs when no session with these options is live yet
+        partial = stream_sessions.find_partial(video_id, zones_key, sampling) if resume else None
+        output_path = partial['output_path'] if partial else job_queue.new_output_path(video_id)
+        info['output_path'] = output_path
+        running = [session.get('output_path') for session in live_hub.stats()]
+        stream_sessions.discard_partials(video_id, keep=[output_path, *running])
+        
+        def save_result(summary: dict) -> dict:
+            # Runs on the session's producer thread, so it uses its own session
+            session_db = database.SessionLocal()
+            try:
+                stream_video = session_db.query(models.Video).filter(models.Video.id == video_id).first()
+                result = job_queue.replace_analysis_result(session_db, stream_video, user_id, output_path, summary)
+                stream_video.status = "completed"
+                session_db.commit()
+                return {'result_id': result.id}
+            finally:
+                session_db.close()
+        
+        return yolo_service.live_events(
+            video.filepath, zones_data, output_path,
+            detect_stride=detect_stride, target_fps=target_fps, fill=fill,
+            session={'video_id': video_id, 'user_id': user_id, 'zones_key': zones_key, 'sampling': sampling},
+            resume=partial, on_complete=save_result
+        )
+    
+    key = f"analysis:{video.id}:{zones_key}:{detect_stride}:{target_fps}:{fill}"
+    return live_hub.subscribe(key, start, info, transport)
+
+@router.post("/start/stream")
+def start_analysis_stream(
+    video_id: int = Body(...),
+    username: str = Body(...),
+    detect_stride: int = Body(1),
+    target_fps: Optional[float] = Body(None),
+    fill: str = Body("hold"),
+    resume: bool = Body(True),
+    db: Session = Depends(database.get_db)
+):
+    """Start real-time streaming analysis.
+
+    Counts are persisted while streaming and the result is saved when the
+    stream completes. A stream the client dropped is continued from where it
+    stopped when started again with the same zones and sampling options
+    (unless resume is false). While such a stream is live, further requests
+    with the same options watch it instead of starting another analysis.
+    """
+    subscription = live_stream_subscription(db, video_id, username, detect_stride, target_fps, fill, resume, 'sse')
+    return StreamingResponse(subscription.sse(), media_type="text/event-stream")
+
+async def serve_live_websocket(websocket: WebSocket, subscription: Subscription, max_fps: Optional[float]):
+    """Send a live subscription's events over an accepted WebSocket (see stream_analysis_ws for the protocol)"""
+    rate = {'fps': negotiate_fps(max_fps), 'changed': True}
+    client = {'disconnected': False}
+    
+    async def receive_control():
+        # Runs until the client disconnects; rate changes are acknowledged by the sender
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except WebSocketDisconnect:
+                client['disconnected'] = True
+                return
+            except (KeyError, ValueError):
+                # Binary or non-JSON messages are ignored
+                continue
+            if isinstance(message, dict) and message.get('type') == 'rate':
+                try:
+                    rate['fps'] = negotiate_fps(message.get('max_fps'))
+                except (TypeError, ValueError):
+                    continue
+                rate['changed'] = True
+    
+    control = asyncio.create_task(receive_control())
+    events = subscription.events()
+    last_sent = 0.0
+    try:
+        async for event in iterate_in_threadpool(events):
+            if client['disconnected']:
+                break
+            if rate['changed']:
+                rate['changed'] = False
+                await websocket.send_json({'type': 'rate', 'fps': rate['fps']})
+            if event.jpeg is None:
+                kind = 'error' if 'error' in event.data else event.data.get('type', 'complete')
+                await websocket.send_json(dict(event.data, type=kind))
+                continue
+            now = time.monotonic()
+            if now - last_sent < 1.0 / rate['fps']:
+                subscription.skipped += 1
+                continue
+            if not subscription.admit(event):
+                continue
+            last_sent = now
+            header = json.dumps(dict(event.data, type='frame'))
+            jpeg = event.jpeg_at(subscription.controller.quality, subscription.controller.scale)
+            await websocket.send_text(header)
+            await websocket.send_bytes(jpeg)
+            subscription.sent(event, len(header) + len(jpeg))
+    except WebSocketDisconnect:
+        client['disconnected'] = True
+    finally:
+        control.cancel()
+        await asyncio.gather(control, return_exceptions=True)
+        events.close()
+        if not client['disconnected']:
+            try:
+                await websocket.close()
+            except RuntimeError:
+                # The client went away while the server was closing
+                pass
+
+@router.websocket("/ws/stream/{video_id}")
+async def stream_analysis_ws(
+    websocket: WebSocket,
+    video_id: int,
+    username: str,
+    detect_stride: int = 1,
+    target_fps: Optional[float] = None,
+    fill: str = "hold",
+    resume: bool = True,
+    max_fps: Optional[float] = None
+):
+    """Real-time streaming analysis over a WebSocket, without base64.
+
+    Joins the same live session as /start/stream. Every frame is sent as a
+    JSON text message {'type': 'frame', 'counts', 'progress', 'frame_number',
+    'total_frames'} followed by a binary message with the raw JPEG. The
+    server first answers {'type': 'rate', 'fps': n}, the frame rate it
+    agreed to send (max_fps clamped to LIVE_WS_MAX_FPS); the client can
+    renegotiate at any time by sending {'type': 'rate', 'max_fps': n}, and
+    frames above the rate are skipped. Within that rate, JPEG quality, size
+    and frame skipping adapt to how fast the client keeps up (see
+    QualityController). The last message is {'type': 'complete',
+    ...summary} or {'type': 'error', 'error'}.
+    """
+    await websocket.accept()
+    db = database.SessionLocal()
+    try:
+        subscription = await run_in_threadpool(
+            live_stream_subscription, db, video_id, username, detect_stride, target_fps, fill, resume, 'websocket'
+        )
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+    finally:
+        db.close()
+    
+    await serve_live_websocket(websocket, subscription, max_fps)
 
 @router.get("/stream/mjpeg/{video_id}")
 def stream_video_mjpeg(
@@ -131,22 +339,64 @@ def stream_video_mjpeg(
         {
             'id': zone.id,
             'label': zone.label,
-            'coordinates': zone.coordinates
+            'coordinates': zone.coordinates,
+            'type': zone.zone_type
         }
         for zone in zones
     ]
     
+    # Join any live analysis of this video and zone set instead of running another one
+    zones_key = stream_sessions.zones_key(zones_data)
+    subscription = live_hub.attach(
+        lambda info: info['video_id'] == video_id and info['zones_key'] == zones_key, 'mjpeg'
+    ) or live_hub.subscribe(
+        f"live:{video.id}:{zones_key}",
+        lambda: yolo_service.live_events(video.filepath, zones_data),
+        {'video_id': video.id, 'zones_key': zones_key, 'mode': 'live'}, 'mjpeg'
+    )
     return StreamingResponse(
-        yolo_service.analyze_video_mjpeg(video.filepath, zones_data),
+        subscription.mjpeg(),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
-@router.post("/start")
+@router.get("/live")
+def get_live_sessions():
+    """Running live analyses with per-viewer transport, delivered/dropped frames and bytes per frame"""
+    return live_hub.stats()
+
+@router.post("/start", status_code=202)
 def start_analysis(
     video_id: int = Body(...),
     username: str = Body(...),
+    detect_stride: int = Body(1),
+    target_fps: Optional[float] = Body(None),
+    fill: str = Body("hold"),
+    segments: Optional[int] = Body(None),
+    roi: Optional[bool] = Body(None),
+    tiled: Optional[bool] = Body(None),
+    motion: Optional[bool] = Body(None),
+    track: Optional[bool] = Body(None),
     db: Session = Depends(database.get_db)
 ):
+    """Queue a full analysis; poll /jobs/{job_id} for its status and result.
+
+    roi=true runs detection only on the bounding box of the zones (default:
+    ANALYSIS_ROI), which is faster when the zones cover a small part of the
+    frame but limits later recounts to zones inside that box. tiled=true
+    detects in overlapping native-resolution tiles (default: ANALYSIS_TILED)
+    to find small people in high-resolution footage, at a higher cost.
+    motion=true (default: ANALYSIS_MOTION_GATE, off) skips inference on frames
+    where nothing changed inside the zones; the result reports the skip
+    rate, and recounts are limited to the zones' bounding box as with roi.
+    track=true (default: ANALYSIS_TRACKING) follows people across frames and
+    adds unique visitors, entries, exits and dwell times to each zone's
+    counts; fill="track" also counts the frames between detections from the
+    tracked people's predicted positions.
+    """
+    validate_sampling(detect_stride, target_fps, fill)
+    if segments is not None and segments < 1:
+        raise HTTPException(status_code=400, detail="segments must be at least 1")
+    
     # Verify user
     user = db.query(models.User).filter(models.User.username == username).first()
     if not user:
@@ -161,81 +411,183 @@ def start_analysis(
     if not os.path.exists(video.filepath):
         raise HTTPException(status_code=404, detail="Video file not found")
     
-    # Delete old analysis results for this video
-    old_results = db.query(models.AnalysisResult).filter(
-        models.AnalysisResult.video_id == video_id
-    ).all()
-    
-    for old_result in old_results:
-        # Delete old output video file
-        if os.path.exists(old_result.output_video_path):
-            os.remove(old_result.output_video_path)
-        # Delete old frame data file
-        if old_result.frame_data_path and os.path.exists(old_result.frame_data_path):
-            os.remove(old_result.frame_data_path)
-        db.delete(old_result)
-    
-    db.commit()
-    
-    # Get zones for this video
-    zones = db.query(models.Zone).filter(models.Zone.video_id == video_id).all()
+    # Zones are read again by the worker when the job starts
+    zone_count = db.query(models.Zone).filter(models.Zone.video_id == video_id).count()
+    if not zone_count:
+        raise HTTPException(status_code=400, detail="No zones defined for this video")
     
+    job = job_queue.enqueue_analysis(db, video, user, {
+        'detect_stride': detect_stride,
+        'target_fps': target_fps,
+        'fill': fill,
+        'segments': segments,
+        'roi': roi,
+        'tiled': tiled,
+        'motion': motion,
+        'track': track
+    })
+    print(f"Queued analysis job {job.id} for video: {video.filepath}")
+    return job_response(job, db)
+
+def job_response(job: models.AnalysisJob, db: Session) -> dict:
+    """Job status, with the analysis result once it completed"""
+    response = {
+        "job_id": job.id,
+        "video_id": job.video_id,
+        "status": job.status,
+        "progress": job.progress or 0,
+        "cancel_requested": job.cancel_requested,
+        "params": job.params,
+        "error": job.error,
+        "worker": job.worker,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "result": None
+    }
+    if job.status == "completed" and job.result_id:
+        result = db.query(models.AnalysisResult).filter(models.AnalysisResult.id == job.result_id).first()
+        if result:
+            video = db.query(models.Video).filter(models.Video.id == result.video_id).first()
+            response["result"] = {
+                "id": result.id,
+                "video_id": result.video_id,
+                "status": "completed",
+                "total_count": result.total_count,
+                "zone_counts": result.zone_counts,
+                "frame_data_path": result.frame_data_path,
+                "output_video": f"/api/analysis/result/{result.video_id}?path={result.output_video_path}",
+                "processed_at": result.processed_at.isoformat(),
+                "summary": video.result_summary if video else None
+            }
+    return response
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: int, db: Session = Depends(database.get_db)):
+    """Get status, progress and (when completed) the result of an analysis job"""
+    job = db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job, db)
+
+@router.get("/jobs/video/{video_id}")
+def list_video_jobs(video_id: int, db: Session = Depends(database.get_db)):
+    """List analysis jobs of a video, newest first"""
+    jobs = db.query(models.AnalysisJob).filter(
+        models.AnalysisJob.video_id == video_id
+    ).order_by(models.AnalysisJob.id.desc()).all()
+    return [job_response(job, db) for job in jobs]
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: int, db: Session = Depends(database.get_db)):
+    """Cancel a queued job, or stop a running one at its next progress check"""
+    job = db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status in job_queue.TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    job = job_queue.cancel_job(db, job)
+    return job_response(job, db)
+
+@router.get("/workers")
+def get_workers():
+    """Status of the background analysis worker processes"""
+    return {
+        "threads_per_worker": job_queue.worker_pool.threads_per_worker,
+        "workers": job_queue.worker_pool.status()
+    }
+
+@router.post("/recount/{video_id}")
+def recount_zones(
+    video_id: int,
+    zones: Optional[List[dict]] = Body(None),
+    save: bool = Body(False),
+    db: Session = Depends(database.get_db)
+):
+    """Recount the latest analysis for a zone set from its stored detection centers.
+
+    Uses the video's current zones unless `zones` (id, label, coordinates on
+    the 640x360 canvas) is given. No decode or inference runs. With save=true
+    the result row, its frame timeline and its rollups are updated; the annotated video keeps
+    the zones it was rendered with. Counting lines need tracks, which are not
+    stored, so they are skipped and keep the crossings of the analysis.
+    Likewise, zones unchanged since a tracked analysis keep its unique
+    visitors, entries, exits and dwell times; other zones are listed in
+    'tracking_unavailable' and are saved with counts only. Analyses with
+    fill="track" cannot be recounted at all.
+    """
+    result = db.query(models.AnalysisResult).filter(
+        models.AnalysisResult.video_id == video_id
+    ).order_by(models.AnalysisResult.created_at.desc()).first()
+    if not result:
+        raise HTTPException(status_code=404, detail="No analysis found for this video")
+    
+    detections_path = recount_service.detections_path_for(result.output_video_path)
+    if not os.path.exists(detections_path):
+        raise HTTPException(status_code=409, detail="Analysis has no stored detections; run it again first")
+    
+    if zones is None:
+        zones = [
+            {'id': zone.id, 'label': zone.label, 'coordinates': zone.coordinates, 'type': zone.zone_type}
+            for zone in db.query(models.Zone).filter(models.Zone.video_id == video_id).all()
+        ]
+    else:
+        zones = [
+            {'id': zone.get('id', i + 1), 'label': zone.get('label', f"Zone {i + 1}"),
+             'coordinates': zone.get('coordinates'), 'type': zone.get('type', 'occupancy')}
+            for i, zone in enumerate(zones)
+        ]
+        for zone in zones:
+            error = zone_shape_error(zone['type'], zone['coordinates'])
+            if error:
+                raise HTTPException(status_code=400, detail=f"{zone['label']}: {error}")
+    zones, _ = split_zones(zones)
     if not zones:
         raise HTTPException(status_code=400, detail="No zones defined for this video")
     
-    # Prepare zones data for YOLO service
-    zones_data = [
-        {
-            'id': zone.id,
-            'label': zone.label,
-            'coordinates': zone.coordinates
-        }
-        for zone in zones
-    ]
-    
-    print(f"Zones from database: {zones_data}")
-    
-    try:
-        # Generate output video path
-        output_dir = os.path.join("data", "results")
-        os.makedirs(output_dir, exist_ok=True)
-        output_filename = f"analyzed_{video_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
-        output_path = os.path.join(output_dir, output_filename)
-        
-        # Run YOLO analysis
-        print(f"Starting analysis for video: {video.filepath}")
-        print(f"Passing zones to YOLO: {zones_data}")
-        result = yolo_service.analyze_video(video.filepath, zones_data, output_path)
-        print(f"Analysis complete. Output: {output_path}")
-        
-        # Save to database
-        analysis_result = models.AnalysisResult(
-            video_id=video_id,
-            user_id=user.id,
-            output_video_path=output_path,
-            frame_data_path=result.get('frame_data_path'),
-            total_count=result['total_count'],
-            zone_counts=result['zone_counts'],
-            processed_at=datetime.now()
-        )
-        db.add(analysis_result)
+    stored = recount_service.load_detection_centers(detections_path)
+    if stored['fill'] == 'track':
+        raise HTTPException(status_code=409, detail="Analyses with fill=track can't be recounted, as tracks are not stored; run it again instead")
+    if not roi_covers(stored['roi'], recount_service.scale_zones(zones, stored['width'], stored['height'])):
+        raise HTTPException(status_code=409, detail="Zones extend past the region the analysis detected in; run it again first")
+    recounted = recount_service.recount(stored, zones)
+    stale = recount_service.carry_tracking(recounted['zone_counts'], result.zone_counts, stored['zones'], zones)
+    recounted['tracking_unavailable'] = stale
+    
+    if save:
+        frame_data_path = result.frame_data_path
+        if frame_data_path and not is_timeline(frame_data_path):
+            # Legacy JSON timelines are replaced by the columnar format
+            remove_frame_data(frame_data_path)
+            frame_data_path = None
+        frame_data_path = frame_data_path or timeline_path_for(result.output_video_path)
+        timeline = TimelineWriter(frame_data_path, [zone['zone_label'] for zone in recounted['zone_counts']])
+        timeline.extend(recounted['frame_data'])
+        timeline.close()
+        result.frame_data_path = frame_data_path
+        result.total_count = recounted['total_count']
+        result.zone_counts = recounted['zone_counts'] + [
+            zone for zone in result.zone_counts or [] if zone.get('type') == 'line'
+        ]
+        save_rollups(db, result)
         db.commit()
-        db.refresh(analysis_result)
-        
-        return {
-            "id": analysis_result.id,
-            "video_id": video_id,
-            "status": "completed",
-            "total_count": result['total_count'],
-            "zone_counts": result['zone_counts'],
-            "frame_data_path": result.get('frame_data_path'),
-            "output_video": f"/api/analysis/result/{video_id}?path={output_path}",
-            "processed_at": analysis_result.processed_at.isoformat()
-        }
-    except Exception as e:
-        print(f"Analysis error: {str(e)}")
-        print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+    
+    return {
+        "result_id": result.id,
+        "video_id": video_id,
+        "saved": save,
+        **recounted
+    }
+
+@router.get("/cache")
+def get_detection_cache_stats():
+    """Size, entry count and hit/miss statistics of the detection cache"""
+    return detection_cache.stats()
+
+@router.delete("/cache")
+def clear_detection_cache():
+    """Drop all cached detections"""
+    return {"message": "Detection cache cleared", "removed": detection_cache.clear()}
 
 @router.get("/result/{video_id}")
 def get_analysis_result(video_id: int, path: str):
@@ -258,8 +610,113 @@ def get_frame_data(video_id: int, db: Session = Depends(database.get_db)):
     if not os.path.exists(result.frame_data_path):
         raise HTTPException(status_code=404, detail="Frame data file not found")
     
+    # Columnar timelines are converted chunk by chunk from the memory-mapped columns
+    if is_timeline(result.frame_data_path):
+        return StreamingResponse(TimelineReader(result.frame_data_path).iter_json(), media_type="application/json")
     return FileResponse(result.frame_data_path, media_type="application/json")
 
+@router.get("/timeline/{video_id}")
+def query_timeline(
+    video_id: int,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    zones: Optional[str] = None,
+    points: int = 500,
+    db: Session = Depends(database.get_db)
+):
+    """Downsampled zone counts (min/max/mean per bucket) for a time window of the latest analysis.
+
+    start/end are in seconds (default: whole video), zones is a
+    comma-separated list of zone labels (default: all) and points caps the
+    number of buckets returned.
+    """
+    if points < 1 or points > 10000:
+        raise HTTPException(status_code=400, detail="points must be between 1 and 10000")
+    if start is not None and end is not None and end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    
+    result = db.query(models.AnalysisResult).filter(
+        models.AnalysisResult.video_id == video_id
+    ).order_by(models.AnalysisResult.created_at.desc()).first()
+    
+    if not result or not result.frame_data_path or not os.path.exists(result.frame_data_path):
+        raise HTTPException(status_code=404, detail="Frame data not found")
+    
+    labels = [label.strip() for label in zones.split(',') if label.strip()] if zones else None
+    return {
+        "video_id": video_id,
+        "result_id": result.id,
+        **open_timeline(result.frame_data_path).query(start, end, labels, points)
+    }
+
+@router.get("/rollups/{video_id}")
+def query_rollups(
+    video_id: int,
+    bucket: int = 10,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    zones: Optional[str] = None,
+    db: Session = Depends(database.get_db)
+):
+    """Zone counts of the latest analysis per time bucket, from the rollup tables.
+
+    bucket is the bucket size in seconds (one of ROLLUP_BUCKETS), start/end
+    select the buckets starting in that window (seconds) and zones is a
+    comma-separated list of zone labels (default: all). Besides the series,
+    'overall' aggregates the window per zone in SQL: minimum, maximum,
+    sample-weighted average and samples.
+    """
+    if bucket not in settings.ROLLUP_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of: {', '.join(map(str, settings.ROLLUP_BUCKETS))}")
+    if start is not None and end is not None and end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    
+    result = db.query(models.AnalysisResult).filter(
+        models.AnalysisResult.video_id == video_id
+    ).order_by(models.AnalysisResult.created_at.desc()).first()
+    if not result:
+        raise HTTPException(status_code=404, detail="No analysis found for this video")
+    
+    rollup = models.ZoneCountRollup
+    filters = [rollup.result_id == result.id, rollup.bucket_seconds == bucket]
+    if start is not None:
+        filters.append(rollup.bucket_start >= start)
+    if end is not None:
+        filters.append(rollup.bucket_start <= end)
+    if zones:
+        filters.append(rollup.zone_label.in_([label.strip() for label in zones.split(',') if label.strip()]))
+    
+    series = {}
+    rows = db.query(
+        rollup.zone_label, rollup.bucket_start, rollup.min_count, rollup.max_count, rollup.avg_count, rollup.samples
+    ).filter(*filters).order_by(rollup.zone_label, rollup.bucket_start).all()
+    for label, bucket_start, low, high, avg, samples in rows:
+        zone = series.setdefault(label, {'time': [], 'min': [], 'max': [], 'avg': [], 'samples': []})
+        zone['time'].append(bucket_start)
+        zone['min'].append(low)
+        zone['max'].append(high)
+        zone['avg'].append(avg)
+        zone['samples'].append(samples)
+    
+    overall = db.query(
+        rollup.zone_label,
+        func.min(rollup.min_count),
+        func.max(rollup.max_count),
+        func.sum(rollup.avg_count * rollup.samples) / func.sum(rollup.samples),
+        func.sum(rollup.samples)
+    ).filter(*filters).group_by(rollup.zone_label).all()
+    
+    return {
+        "video_id": video_id,
+        "result_id": result.id,
+        "bucket_seconds": bucket,
+        "zones": series,
+        "overall": {
+            label: {'min': low, 'max': high, 'avg': round(float(avg), 2), 'samples': int(samples)}
+            for label, low, high, avg, samples in overall
+        }
+    }
+
 @router.delete("/results/{result_id}")
 def delete_analysis_result(result_id: int, db: Session = Depends(database.get_db)):
     """Delete an analysis result"""
@@ -271,9 +728,14 @@ def delete_analysis_result(result_id: int, db: Session = Depends(database.get_db
     if os.path.exists(result.output_video_path):
         os.remove(result.output_video_path)
     
-    # Delete frame data file
-    if result.frame_data_path and os.path.exists(result.frame_data_path):
-        os.remove(result.frame_data_path)
+    # Delete frame data (timeline directory or legacy JSON) and any JSON export
+    remove_frame_data(result.frame_data_path)
+    remove_frame_data(result.output_video_path.replace('.mp4', '_frames.json'))
+    
+    # Delete stored detection centers
+    detections_path = recount_service.detections_path_for(result.output_video_path)
+    if os.path.exists(detections_path):
+        os.remove(detections_path)
     
     db.delete(result)
     db.commit()
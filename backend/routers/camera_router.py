@@ -0,0 +1,187 @@
+from fastapi import APIRouter, Depends, HTTPException, Body, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from backend import database, models
+from backend.routers.analysis_router import serve_live_websocket
+from backend.services.broadcast import Subscription, live_hub
+from backend.services.yolo_service import yolo_service
+from backend.services.zone_geometry import zone_shape_error
+from backend.services import stream_sessions
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+router = APIRouter(prefix="/api/camera", tags=["Camera"])
+
+# Network streams only: other sources (files, devices) would be opened on the server itself
+CAMERA_URL_SCHEMES = ("rtsp", "rtsps", "http", "https")
+
+def validate_url(url: str) -> str:
+    """A camera stream URL with an allowed scheme and a host"""
+    parts = urlsplit(url.strip())
+    if parts.scheme.lower() not in CAMERA_URL_SCHEMES or not parts.hostname:
+        raise HTTPException(status_code=400, detail=f"Camera URL must be a {', '.join(CAMERA_URL_SCHEMES)} URL with a host")
+    return url.strip()
+
+def validate_zones(zones: List[dict]) -> List[dict]:
+    """Zones in the Zone row format (id, label, coordinates on the 640x360 canvas, type), ids and types filled in"""
+    zones = [
+        {'id': zone.get('id', i + 1), 'label': zone.get('label', f"Zone {i + 1}"), 'coordinates': zone.get('coordinates'),
+         'type': zone.get('type', 'occupancy')}
+        for i, zone in enumerate(zones)
+    ]
+    for zone in zones:
+        error = zone_shape_error(zone['type'], zone['coordinates'])
+        if error:
+            raise HTTPException(status_code=400, detail=f"{zone['label']}: {error}")
+    return zones
+
+def camera_response(camera: models.Camera) -> dict:
+    return {"id": camera.id, "name": camera.name, "url": camera.url, "zones": camera.zones,
+            "fps_budget": camera.fps_budget, "priority": camera.priority}
+
+def validate_budget(fps_budget: Optional[float], priority: int):
+    if fps_budget is not None and fps_budget <= 0:
+        raise HTTPException(status_code=400, detail="fps_budget must be positive")
+    if priority < 1:
+        raise HTTPException(status_code=400, detail="priority must be at least 1")
+
+@router.post("/", status_code=201)
+def create_camera(
+    username: str = Body(...),
+    name: str = Body(...),
+    url: str = Body(...),
+    zones: List[dict] = Body([]),
+    fps_budget: Optional[float] = Body(None),
+    priority: int = Body(1),
+    db: Session = Depends(database.get_db)
+):
+    """Register a live camera feed (rtsp, rtsps, http or https URL) with its zones.
+
+    fps_budget caps the frames per second analyzed for this camera
+    (CAMERA_FPS_BUDGET if unset); priority is its weight in the shared
+    scheduler when the cameras together ask for more than it can run.
+    """
+    url = validate_url(url)
+    validate_budget(fps_budget, priority)
+    user = db.query(models.User).filter(models.User.username == username).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    camera = models.Camera(user_id=user.id, name=name, url=url, zones=validate_zones(zones),
+                           fps_budget=fps_budget, priority=priority)
+    db.add(camera)
+    db.commit()
+    db.refresh(camera)
+    return {"message": "Camera created", "camera_id": camera.id}
+
+@router.get("/list/{username}")
+def list_cameras(username: str, db: Session = Depends(database.get_db)):
+    user = db.query(models.User).filter(models.User.username == username).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    cameras = db.query(models.Camera).filter(models.Camera.user_id == user.id).all()
+    return [camera_response(camera) for camera in cameras]
+
+@router.put("/{camera_id}/zones")
+def update_camera_zones(camera_id: int, zones: List[dict] = Body(...), db: Session = Depends(database.get_db)):
+    """Replace a camera's zones; viewers joining afterwards get an analysis with the new zones"""
+    camera = db.query(models.Camera).filter(models.Camera.id == camera_id).first()
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    camera.zones = validate_zones(zones)
+    db.commit()
+    return camera_response(camera)
+
+@router.put("/{camera_id}/budget")
+def update_camera_budget(
+    camera_id: int,
+    fps_budget: Optional[float] = Body(None),
+    priority: int = Body(1),
+    db: Session = Depends(database.get_db)
+):
+    """Change a camera's fps budget and scheduler priority; applies from the next time its analysis starts"""
+    validate_budget(fps_budget, priority)
+    camera = db.query(models.Camera).filter(models.Camera.id == camera_id).first()
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    camera.fps_budget = fps_budget
+    camera.priority = priority
+    db.commit()
+    return camera_response(camera)
+
+@router.delete("/{camera_id}")
+def delete_camera(camera_id: int, db: Session = Depends(database.get_db)):
+    camera = db.query(models.Camera).filter(models.Camera.id == camera_id).first()
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    db.delete(camera)
+    db.commit()
+    return {"message": "Camera deleted"}
+
+def camera_subscription(db: Session, camera_id: int, transport: str) -> Subscription:
+    """Subscribe to the live analysis of a camera, starting it if no viewer is watching yet"""
+    camera = db.query(models.Camera).filter(models.Camera.id == camera_id).first()
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    if not camera.zones:
+        raise HTTPException(status_code=400, detail="No zones defined for this camera")
+    # Cameras registered before URLs were validated
+    validate_url(camera.url)
+
+    url, zones, fps_budget, priority = camera.url, camera.zones, camera.fps_budget, camera.priority
+    zones_key = stream_sessions.zones_key(zones)
+    return live_hub.subscribe(
+        f"camera:{camera_id}:{zones_key}",
+        lambda: yolo_service.camera_events(url, zones, f"camera_{camera_id}", fps_budget=fps_budget, priority=priority),
+        {'camera_id': camera_id, 'zones_key': zones_key, 'mode': 'camera'}, transport
+    )
+
+@router.get("/{camera_id}/stream")
+def stream_camera(camera_id: int, db: Session = Depends(database.get_db)):
+    """Live analysis of a camera as server-sent events.
+
+    Each event has the annotated frame (base64), the current 'counts', the
+    'rolling' average/maximum per zone over CAMERA_WINDOW_SECONDS, the
+    'crossings' of counting lines and the frame's glass-to-count
+    'latency_ms'. {'type': 'status'} events report a reconnecting source.
+    The analysis runs while at least one viewer (of any transport) watches.
+    """
+    subscription = camera_subscription(db, camera_id, 'sse')
+    return StreamingResponse(subscription.sse(), media_type="text/event-stream")
+
+@router.get("/{camera_id}/mjpeg")
+def stream_camera_mjpeg(camera_id: int, db: Session = Depends(database.get_db)):
+    """Live analysis of a camera as MJPEG"""
+    subscription = camera_subscription(db, camera_id, 'mjpeg')
+    return StreamingResponse(subscription.mjpeg(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+@router.websocket("/ws/{camera_id}")
+async def stream_camera_ws(websocket: WebSocket, camera_id: int, max_fps: Optional[float] = None):
+    """Live analysis of a camera over a WebSocket, with the protocol of /api/analysis/ws/stream"""
+    await websocket.accept()
+    db = database.SessionLocal()
+    try:
+        subscription = await run_in_threadpool(camera_subscription, db, camera_id, 'websocket')
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+    finally:
+        db.close()
+
+    await serve_live_websocket(websocket, subscription, max_fps)
+
+@router.get("/scheduler")
+def get_scheduler_stats():
+    """Shared camera inference: batches run, average batch size, worker utilization and per-camera throughput and wait"""
+    if yolo_service.scheduler is None:
+        raise HTTPException(status_code=404, detail="No camera is being analyzed")
+    return yolo_service.scheduler.stats()
+
+@router.get("/{camera_id}/counts")
+def get_camera_counts(camera_id: int):
+    """Latest counts of a camera being watched: rolling window, glass-to-count latency percentiles and source health"""
+    counts = yolo_service.live_counts.get(f"camera_{camera_id}")
+    if counts is None:
+        raise HTTPException(status_code=404, detail="Camera is not being analyzed")
+    return counts
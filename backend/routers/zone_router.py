@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from backend import models, database, schemas
+from backend.services.zone_geometry import zone_shape_error
 
 router = APIRouter(prefix="/api/zone", tags=["Zone"])
 
@@ -11,8 +12,18 @@ def create_zone(
     video_id: int = Body(...),
     label: str = Body(...),
     coordinates: list = Body(...),
+    zone_type: str = Body("occupancy"),
     db: Session = Depends(database.get_db)
 ):
+    """Create a zone: an occupancy area (polygon, 3+ points), or with zone_type="line" a counting line (2 points).
+
+    A line counts directional crossings of tracked people: walking from its
+    first point to its second, crossing from left to right is 'in'.
+    """
+    error = zone_shape_error(zone_type, coordinates)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
     user = db.execute(select(models.User)
                       .where(models.User.username == username)).scalar()
     if not user:
@@ -27,7 +38,8 @@ def create_zone(
         user_id=user.id,
         video_id=video.id,
         label=label,
-        coordinates=coordinates
+        coordinates=coordinates,
+        zone_type=zone_type
     )
     db.add(new_zone)
     db.commit()
@@ -39,7 +51,7 @@ def list_zones(video_id: int, db: Session = Depends(database.get_db)):
     zones = db.query(models.Zone)\
               .filter(models.Zone.video_id == video_id).all()
     return [
-        {"id": z.id, "label": z.label, "coordinates": z.coordinates}
+        {"id": z.id, "label": z.label, "coordinates": z.coordinates, "type": z.zone_type}
         for z in zones
     ]
 
@@ -0,0 +1,291 @@
+import base64
+import json
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Callable, Dict, Generator, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from backend.core.config import settings
+from backend.services.rate_control import QualityController
+
+
+class LiveEvent:
+    """One message of a live analysis: an annotated JPEG frame with its counts, or a final/error payload.
+
+    Wire formats are built on first use and cached per (format, quality,
+    scale), so a frame is re-encoded and base64-encoded once per quality
+    level no matter how many viewers receive it. `image` is the annotated
+    BGR frame the lower-quality variants are encoded from.
+    """
+
+    __slots__ = ('data', 'jpeg', 'image', 'created', '_cache')
+
+    def __init__(self, data: Dict, jpeg: bytes = None, image: np.ndarray = None):
+        self.data = data
+        self.jpeg = jpeg
+        self.image = image
+        self.created = time.monotonic()
+        self._cache = {}
+
+    def jpeg_at(self, quality: int = None, scale: float = 1.0) -> bytes:
+        """The frame as JPEG at a given quality and output scale (None, 1.0 = as produced)"""
+        if (quality is None and scale == 1.0) or self.image is None:
+            return self.jpeg
+        key = ('jpeg', quality, scale)
+        if key not in self._cache:
+            image = self.image
+            if scale != 1.0:
+                image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality or settings.LIVE_JPEG_QUALITY])
+            self._cache[key] = buffer.tobytes()
+        return self._cache[key]
+
+    def sse(self, quality: int = None, scale: float = 1.0) -> bytes:
+        key = ('sse', quality, scale)
+        if key not in self._cache:
+            jpeg = self.jpeg_at(quality, scale) if self.jpeg else None
+            payload = dict(self.data, frame=base64.b64encode(jpeg).decode('utf-8')) if jpeg else self.data
+            self._cache[key] = f"data: {json.dumps(payload)}\n\n".encode('utf-8')
+        return self._cache[key]
+
+    def mjpeg(self, quality: int = None, scale: float = 1.0) -> bytes:
+        if not self.jpeg:
+            return b''
+        key = ('mjpeg', quality, scale)
+        if key not in self._cache:
+            self._cache[key] = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + self.jpeg_at(quality, scale) + b'\r\n'
+        return self._cache[key]
+
+
+class Subscription:
+    """A viewer's bounded inbox on a live session.
+
+    The producer never waits on a viewer: when the inbox is full the oldest
+    event is dropped, so a slow client skips frames and always receives the
+    newest ones (and the final event, which is the last one put). Bytes
+    and frames written to the client are tallied per transport, and a
+    QualityController picks the JPEG quality, scale and frame skip that
+    keep this viewer's delivery latency on target.
+    """
+
+    def __init__(self, session: 'LiveSession', size: int, transport: str = 'sse'):
+        self.session = session
+        self.transport = transport
+        self.delivered = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.frames = 0
+        self.bytes = 0
+        self.controller = QualityController()
+        self.closed = False
+        self._events = deque(maxlen=max(1, size))
+        self._cond = threading.Condition()
+
+    def put(self, event: LiveEvent):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+
+    def record(self, nbytes: int, frame: bool = True):
+        """Count bytes written to the client (and a frame, unless it was a control message)"""
+        self.bytes += nbytes
+        self.frames += int(frame)
+
+    def finish(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def events(self) -> Generator[LiveEvent, None, None]:
+        """Events until the session ends; leaving the generator unsubscribes"""
+        try:
+            while True:
+                with self._cond:
+                    while not self._events and not self.closed:
+                        self._cond.wait(timeout=1.0)
+                    if not self._events:
+                        return
+                    event = self._events.popleft()
+                self.delivered += 1
+                yield event
+        finally:
+            self.session.unsubscribe(self)
+
+    def admit(self, event: LiveEvent) -> bool:
+        """Whether to send an event; the quality controller may skip frames"""
+        if event.jpeg is None or self.controller.admit():
+            return True
+        self.skipped += 1
+        return False
+
+    def sent(self, event: LiveEvent, nbytes: int):
+        """Record an event written to the client and feed its delivery age to the controller"""
+        self.record(nbytes, event.jpeg is not None)
+        if event.jpeg is not None:
+            self.controller.observe(time.monotonic() - event.created, self.dropped)
+
+    def _messages(self, render: Callable[[LiveEvent, Optional[int], float], bytes]) -> Generator[bytes, None, None]:
+        events = self.events()
+        try:
+            for event in events:
+                if not self.admit(event):
+                    continue
+                message = render(event, self.controller.quality, self.controller.scale)
+                if not message:
+                    continue
+                yield message
+                # Resumed once the server has written the message out
+                self.sent(event, len(message))
+        finally:
+            events.close()
+
+    def sse(self) -> Generator[bytes, None, None]:
+        return self._messages(LiveEvent.sse)
+
+    def mjpeg(self) -> Generator[bytes, None, None]:
+        return self._messages(LiveEvent.mjpeg)
+
+    def stats(self) -> Dict:
+        return {
+            'transport': self.transport,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'skipped': self.skipped,
+            'pending': len(self._events),
+            'frames': self.frames,
+            'bytes': self.bytes,
+            'bytes_per_frame': round(self.bytes / self.frames) if self.frames else 0,
+            'quality': self.controller.state(),
+        }
+
+
+class LiveSession:
+    """One running analysis whose events are published to every subscriber.
+
+    A producer thread drives the event generator and copies each event into
+    the subscribers' inboxes. Once the last viewer has been gone for
+    BROADCAST_IDLE_SECONDS the generator is closed, which stops the analysis
+    exactly like a disconnect of its only client used to.
+    """
+
+    def __init__(self, hub: 'BroadcastHub', key: str, info: Dict = None):
+        self.hub = hub
+        self.key = key
+        self.info = info if info is not None else {}
+        self.subscribers: List[Subscription] = []
+        self.published = 0
+        self.started_at = time.time()
+        self.closed = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, transport: str = 'sse') -> Subscription:
+        subscription = Subscription(self, settings.BROADCAST_SUBSCRIBER_QUEUE, transport)
+        with self._lock:
+            self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+
+    def start(self, events: Iterator[LiveEvent]) -> 'LiveSession':
+        self._thread = threading.Thread(target=self._run, args=(events,), name=f'live-{self.key}', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self, events: Iterator[LiveEvent]):
+        idle_since = None
+        try:
+            for event in events:
+                with self._lock:
+                    subscribers = list(self.subscribers)
+                for subscription in subscribers:
+                    subscription.put(event)
+                self.published += 1
+                if subscribers:
+                    idle_since = None
+                elif idle_since is None:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= settings.BROADCAST_IDLE_SECONDS:
+                    print(f"[live {self.key}] No viewers left, stopping")
+                    break
+        except Exception as e:
+            print(f"[live {self.key}] Error: {str(e)}")
+            print(traceback.format_exc())
+            with self._lock:
+                subscribers = list(self.subscribers)
+            for subscription in subscribers:
+                subscription.put(LiveEvent({'error': str(e)}))
+        finally:
+            # Runs the analysis' own cleanup (checkpoint, writer release) on this thread
+            if hasattr(events, 'close'):
+                events.close()
+            self.hub._remove(self)
+            with self._lock:
+                subscribers = list(self.subscribers)
+            for subscription in subscribers:
+                subscription.finish()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            subscribers = [subscription.stats() for subscription in self.subscribers]
+        return {
+            'key': self.key,
+            **self.info,
+            'published': self.published,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'subscribers': subscribers,
+        }
+
+
+class BroadcastHub:
+    """In-process registry of live sessions: one analysis per key, any number of viewers"""
+
+    def __init__(self):
+        self._sessions: Dict[str, LiveSession] = {}
+        # Reentrant so a session's start() may look at the running sessions
+        self._lock = threading.RLock()
+
+    def subscribe(self, key: str, start: Callable[[], Iterator[LiveEvent]], info: Dict = None,
+                  transport: str = 'sse') -> Subscription:
+        """Attach to the session running under key, starting it with start() if there is none"""
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                return session.subscribe(transport)
+            session = LiveSession(self, key, info)
+            subscription = session.subscribe(transport)
+            session.start(start())
+            self._sessions[key] = session
+        return subscription
+
+    def attach(self, match: Callable[[Dict], bool], transport: str = 'sse') -> Optional[Subscription]:
+        """Attach to a running session whose info matches, if any"""
+        with self._lock:
+            for session in self._sessions.values():
+                if match(session.info):
+                    return session.subscribe(transport)
+        return None
+
+    def _remove(self, session: LiveSession):
+        with self._lock:
+            session.closed = True
+            if self._sessions.get(session.key) is session:
+                del self._sessions[session.key]
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [session.stats() for session in sessions]
+
+
+# Singleton instance
+live_hub = BroadcastHub()
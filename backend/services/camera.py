@@ -0,0 +1,193 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class LatestFrameReader:
+    """Reads a live source (RTSP/HTTP URL or device) on its own thread, keeping only the newest frame.
+
+    The reader grabs frames as fast as the source sends them, so the
+    source's buffers never fill up and the analysis, whatever its pace,
+    always gets the most recent frame: frames it had no time for are
+    overwritten (and counted as dropped) instead of queuing up behind it.
+    Every frame carries its source sequence number and the wall-clock time
+    it arrived, for glass-to-count latency.
+
+    When the source cannot be opened or stops delivering frames for
+    `stall_seconds`, it is released and reopened with exponential backoff
+    (`backoff` doubling up to `max_backoff` seconds, with jitter); the
+    backoff resets after the first frame of a new connection.
+    """
+
+    def __init__(self, source: str, backoff: float = 1.0, max_backoff: float = 30.0, stall_seconds: float = 5.0):
+        self.source = int(source) if str(source).isdigit() else source
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stall_seconds = stall_seconds
+        self.connected = False
+        self.connections = 0
+        self.reconnects = 0
+        self.read = 0
+        self.dropped = 0
+        self.last_error = None
+        self.source_fps = 0.0
+        self._arrivals = deque(maxlen=60)
+        self._frame = None
+        self._seq = 0
+        self._arrived = 0.0
+        self._consumed = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'LatestFrameReader':
+        self._thread = threading.Thread(target=self._run, name=f'camera-{self.source}', daemon=True)
+        self._thread.start()
+        return self
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.source)
+        # Ask the backend for the shortest possible internal buffer where it supports it
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def _run(self):
+        delay = self.backoff
+        while not self._stop.is_set():
+            cap = self._open()
+            if cap is None:
+                self.last_error = f"Cannot open {self.source}"
+            else:
+                self.connections += 1
+                self.reconnects += int(self.connections > 1)
+                fps = cap.get(cv2.CAP_PROP_FPS)
+                self.source_fps = fps if 0 < fps <= 240 else 0.0
+                last_frame = time.monotonic()
+                try:
+                    while not self._stop.is_set():
+                        ok, frame = cap.read()
+                        if not ok:
+                            if time.monotonic() - last_frame > self.stall_seconds:
+                                self.last_error = f"No frames from {self.source} for {self.stall_seconds:.0f}s"
+                                break
+                            # End of a file-like source, or a hiccup of a live one
+                            if cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0:
+                                self.last_error = "Source ended"
+                                break
+                            time.sleep(0.01)
+                            continue
+                        last_frame = time.monotonic()
+                        delay = self.backoff
+                        self._publish(frame)
+                finally:
+                    cap.release()
+                    self.connected = False
+            if self._stop.is_set():
+                break
+            # Back off before reconnecting, with jitter so cameras that dropped together don't retry together
+            self._stop.wait(delay * random.uniform(0.8, 1.2))
+            delay = min(self.max_backoff, delay * 2)
+
+    def _publish(self, frame: np.ndarray):
+        now = time.time()
+        with self._cond:
+            if self._frame is not None and self._consumed < self._seq:
+                self.dropped += 1
+            self._frame = frame
+            self._seq += 1
+            self._arrived = now
+            self.read += 1
+            self.connected = True
+            self._arrivals.append(now)
+            self._cond.notify_all()
+
+    @property
+    def fps(self) -> float:
+        """Source frame rate: as reported by the source, else measured from recent arrivals"""
+        if self.source_fps:
+            return self.source_fps
+        with self._cond:
+            arrivals = list(self._arrivals)
+        if len(arrivals) > 1 and arrivals[-1] > arrivals[0]:
+            return (len(arrivals) - 1) / (arrivals[-1] - arrivals[0])
+        return 0.0
+
+    def latest(self, after: int = 0, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], int, float]:
+        """The newest frame with a sequence number above `after` as (frame, seq, arrival time).
+
+        Waits up to timeout seconds for one; returns (None, after, 0.0) if
+        none came (the source is stalled or reconnecting).
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._seq <= after and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, after, 0.0
+                self._cond.wait(remaining)
+            if self._seq <= after:
+                return None, after, 0.0
+            self._consumed = self._seq
+            return self._frame, self._seq, self._arrived
+
+    def close(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=self.stall_seconds + 1)
+
+    def stats(self) -> Dict:
+        return {
+            'source_connected': self.connected,
+            'connections': self.connections,
+            'reconnects': self.reconnects,
+            'frames_read': self.read,
+            'frames_dropped': self.dropped,
+            'source_fps': round(self.fps, 2),
+            'last_error': self.last_error,
+        }
+
+
+class RollingCounts:
+    """Per-label counts and glass-to-count latency over the last `window` seconds"""
+
+    def __init__(self, labels: List[str], window: float):
+        self.labels = labels
+        self.window = window
+        self._samples = deque()
+
+    def add(self, at: float, counts: Dict[str, int], latency: float):
+        self._samples.append((at, [counts[label] for label in self.labels], latency))
+        while self._samples and at - self._samples[0][0] > self.window:
+            self._samples.popleft()
+
+    def summary(self) -> Dict:
+        if not self._samples:
+            return {'window_seconds': self.window, 'samples': 0, 'analysis_fps': 0.0, 'counts': {}, 'latency_ms': {}}
+        counts = np.array([sample[1] for sample in self._samples], dtype=np.float64).reshape(len(self._samples), -1)
+        latency = np.array([sample[2] for sample in self._samples]) * 1000
+        span = self._samples[-1][0] - self._samples[0][0]
+        return {
+            'window_seconds': self.window,
+            'samples': len(self._samples),
+            'analysis_fps': round((len(self._samples) - 1) / span, 2) if span > 0 else 0.0,
+            'counts': {
+                label: {'avg': round(float(counts[:, i].mean()), 2), 'max': int(counts[:, i].max())}
+                for i, label in enumerate(self.labels)
+            },
+            'latency_ms': {
+                'avg': round(float(latency.mean()), 1),
+                'p50': round(float(np.percentile(latency, 50)), 1),
+                'p95': round(float(np.percentile(latency, 95)), 1),
+                'max': round(float(latency.max()), 1),
+            },
+        }
@@ -0,0 +1,141 @@
+import glob
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from backend.core.config import settings
+
+CHECKPOINT_VERSION = 2
+
+
+def checkpoint_path_for(output_path: str) -> str:
+    return output_path.replace('.mp4', '_checkpoint.json')
+
+
+def load_checkpoint(output_path: str) -> Optional[Dict]:
+    """Last committed checkpoint of an analysis writing to output_path, if any"""
+    try:
+        with open(checkpoint_path_for(output_path)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get('version') == CHECKPOINT_VERSION else None
+
+
+def discard_checkpoint(output_path: str):
+    """Delete the checkpoint file, video parts and detection chunks of an analysis"""
+    base = output_path[:-len('.mp4')] if output_path.endswith('.mp4') else output_path
+    paths = glob.glob(glob.escape(base) + '_ckpt*.mp4') + glob.glob(glob.escape(base) + '_ckpt*_detections.npz')
+    paths.append(checkpoint_path_for(output_path))
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class _Marker:
+    """Encode-queue item asking the encoder thread to commit a checkpoint"""
+
+    def __init__(self, state: Dict):
+        self.state = state
+
+
+class AnalysisCheckpoint:
+    """Crash-safe checkpoints of a running analysis.
+
+    The annotated video is written as a series of parts (<output>_ckpt<k>.mp4)
+    by the pipeline's encoder thread. When a checkpoint is due, the analysis
+    loop flushes its timeline and submits a marker with its state (frames
+    done, carried detections, per-zone maxima, fill state, ...) behind the
+    frames already queued. The encoder closes the current part once it gets
+    there, so every frame before the marker is on disk, and only then
+    atomically writes <output>_checkpoint.json listing the closed parts.
+    A restarted analysis reads that file, truncates the timeline to the
+    committed rows, seeks to the next frame and opens a new part; finish()
+    joins all parts into the output video without re-encoding.
+    """
+
+    def __init__(self, output_path: str, fps: float, state: Dict = None, interval: float = None):
+        self.output_path = output_path
+        self.fps = fps
+        self.interval = settings.CHECKPOINT_INTERVAL_SECONDS if interval is None else interval
+        self.parts: List[str] = list(state['parts']) if state else []
+        self.detection_chunks: List[str] = list(state.get('detection_chunks', [])) if state else []
+        self.last_checkpoint = time.monotonic()
+        self.writer = None
+        self._open_part()
+
+    def _open_part(self):
+        import imageio
+        path = self.output_path.replace('.mp4', f'_ckpt{len(self.parts)}.mp4')
+        if os.path.exists(path):
+            os.remove(path)
+        self.parts.append(path)
+        self.writer = imageio.get_writer(path, fps=self.fps, codec='libx264', pixelformat='yuv420p')
+
+    def encode(self, item):
+        """Pipeline encode callback: write a BGR frame, or commit a checkpoint marker"""
+        if isinstance(item, _Marker):
+            self.writer.close()
+            closed_parts = list(self.parts)
+            self._open_part()
+            self._commit(dict(item.state, parts=closed_parts))
+        else:
+            self.writer.append_data(cv2.cvtColor(item, cv2.COLOR_BGR2RGB))
+
+    def due(self) -> bool:
+        return bool(self.interval) and time.monotonic() - self.last_checkpoint >= self.interval
+
+    def marker(self, state: Dict, recorder=None) -> _Marker:
+        """Checkpoint marker for the encode queue; saves detections recorded since the last one"""
+        self.last_checkpoint = time.monotonic()
+        if recorder is not None:
+            self.save_detections(recorder)
+        return _Marker(dict(state, detection_chunks=list(self.detection_chunks)))
+
+    def save_detections(self, recorder):
+        """Move the recorder's rows into a new on-disk chunk"""
+        arrays = recorder.pop_arrays()
+        path = self.output_path.replace('.mp4', f'_ckpt{len(self.detection_chunks)}_detections.npz')
+        np.savez(path, **arrays)
+        self.detection_chunks.append(path)
+
+    def load_detections(self) -> List[Dict[str, np.ndarray]]:
+        """Detection chunks committed by earlier checkpoints, in order"""
+        chunks = []
+        for path in self.detection_chunks:
+            with np.load(path) as data:
+                chunks.append({name: data[name] for name in data.files})
+        return chunks
+
+    def _commit(self, state: Dict):
+        state = dict(state, version=CHECKPOINT_VERSION, output_path=self.output_path, updated_at=time.time())
+        path = checkpoint_path_for(self.output_path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def suspend(self, state: Dict, recorder=None):
+        """Close the current part and commit state directly (pipeline already drained)"""
+        self.writer.close()
+        if recorder is not None:
+            self.save_detections(recorder)
+        self._commit(dict(state, parts=list(self.parts), detection_chunks=list(self.detection_chunks)))
+
+    def close(self):
+        self.writer.close()
+
+    def finish(self):
+        """Join the parts into the output video and drop the checkpoint artifacts"""
+        self.writer.close()
+        parts = [path for path in self.parts if os.path.exists(path) and os.path.getsize(path) > 0]
+        if len(parts) == 1:
+            os.replace(parts[0], self.output_path)
+        elif parts:
+            from backend.services.segments import concat_videos
+            concat_videos(parts, self.output_path)
+        discard_checkpoint(self.output_path)
@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+
+from backend.core.config import settings
+from backend.services.preprocess import Region, roi_covers
+
+# Bump when the stored arrays change meaning
+CACHE_VERSION = 3
+
+
+class DetectionRecorder:
+    """Collects the raw detections of every detection frame during an analysis"""
+
+    def __init__(self):
+        self.frames: List[int] = []
+        self.boxes: List[np.ndarray] = []
+        self.scores: List[np.ndarray] = []
+
+    def add(self, frame_index: int, boxes: np.ndarray, scores: np.ndarray):
+        self.frames.append(frame_index)
+        self.boxes.append(np.asarray(boxes, dtype=np.float32).reshape(-1, 4))
+        self.scores.append(np.asarray(scores, dtype=np.float32).reshape(-1))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Flat arrays: frame indices, per-frame offsets into boxes/scores"""
+        counts = [len(b) for b in self.boxes]
+        return {
+            'frames': np.asarray(self.frames, dtype=np.int64),
+            'offsets': np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            'boxes': np.concatenate(self.boxes) if self.boxes else np.zeros((0, 4), dtype=np.float32),
+            'scores': np.concatenate(self.scores) if self.scores else np.zeros(0, dtype=np.float32),
+        }
+
+    def pop_arrays(self) -> Dict[str, np.ndarray]:
+        """arrays() of the rows recorded so far, which are then dropped from memory"""
+        arrays = self.arrays()
+        self.frames, self.boxes, self.scores = [], [], []
+        return arrays
+
+    @staticmethod
+    def merge(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """Concatenate arrays() of consecutive segments"""
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for part in parts:
+            offsets.append(part['offsets'][1:] + base)
+            base += len(part['boxes'])
+        return {
+            'frames': np.concatenate([part['frames'] for part in parts]),
+            'offsets': np.concatenate(offsets),
+            'boxes': np.concatenate([part['boxes'] for part in parts]),
+            'scores': np.concatenate([part['scores'] for part in parts]),
+        }
+
+
+class CachedDetections:
+    """Read side of a cache entry: boxes and scores of a detection frame.
+
+    region is where the entry's detections are fresh (None = whole frame).
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], region: Region = None):
+        self.arrays = arrays
+        self.region = region
+        self.offsets = arrays['offsets']
+        self.boxes = arrays['boxes']
+        self.scores = arrays['scores']
+        self.rows = {int(frame): i for i, frame in enumerate(arrays['frames'])}
+
+    def __contains__(self, frame_index: int) -> bool:
+        return frame_index in self.rows
+
+    def get(self, frame_index: int):
+        """(boxes, scores) of a frame; KeyError if it was not a detection frame"""
+        i = self.rows[frame_index]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.boxes[start:end], self.scores[start:end]
+
+
+class DetectionCache:
+    """On-disk cache of raw per-frame detections.
+
+    Entries are compressed .npz files keyed by the content hash of the video
+    plus model name, input size and detection stride, so re-analyzing the
+    same upload with edited zones skips inference entirely. Total size is
+    capped at DETECTION_CACHE_MAX_MB with least-recently-used eviction
+    (file mtime is bumped on every hit). Hit/miss counters live in a small
+    JSON file next to the entries, updated under a file lock so every
+    worker process contributes without losing counts.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or settings.DETECTION_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else settings.DETECTION_CACHE_MAX_MB * 1024 * 1024
+        self.lock = threading.Lock()
+        self._hashes = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _stats_path(self) -> str:
+        return os.path.join(self.cache_dir, "stats.json")
+
+    def content_hash(self, video_path: str) -> str:
+        """SHA-256 of the file contents, memoized per (path, size, mtime)"""
+        stat = os.stat(video_path)
+        memo_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._hashes:
+            digest = hashlib.sha256()
+            with open(video_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            self._hashes[memo_key] = digest.hexdigest()
+        return self._hashes[memo_key]
+
+    def key_for(self, video_path: str, model_name: str, input_size: int, stride: int,
+                region: Tuple[int, int, int, int] = None, tiling: str = None, motion: str = None) -> str:
+        parts = f"v{CACHE_VERSION}|{self.content_hash(video_path)}|{model_name}|{input_size}|{stride}"
+        if region:
+            # Detections of a cropped run only cover that region
+            parts += "|roi=" + ",".join(str(v) for v in region)
+        if tiling:
+            parts += f"|tiles={tiling}"
+        if motion:
+            # Motion-gated runs reuse detections on frames that were static inside their zones;
+            # the entry records that region, so the zones themselves are not part of the key
+            parts += f"|motion={motion}"
+        return hashlib.sha256(parts.encode()).hexdigest()[:32]
+
+    def load(self, key: str, zones: List[Dict] = None) -> Optional[CachedDetections]:
+        """Cached detections for a key, or None on a miss.
+
+        With (native) zones, an entry whose recorded region doesn't cover
+        them is a miss too: its detections are stale outside that region.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in ('frames', 'offsets', 'boxes', 'scores')}
+                region = tuple(int(v) for v in data['region']) if 'region' in data.files else ()
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            self._count('misses')
+            return None
+        if zones and region and not roi_covers(region, zones):
+            self._count('misses')
+            return None
+        self._count('hits')
+        return CachedDetections(arrays, region or None)
+
+    def store(self, key: str, arrays: Dict[str, np.ndarray], region: Region = None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        # Write under a temporary name so readers never see a partial entry
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp_path, region=np.array(region if region else [], dtype=np.int64), **arrays)
+        os.replace(tmp_path, path)
+        self._count('stores')
+        self.evict()
+
+    def entries(self) -> List[Dict]:
+        """Cache files, least recently used first"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npz') or '.tmp' in name:
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append({'key': name[:-4], 'path': path, 'bytes': stat.st_size, 'last_used': stat.st_mtime})
+        return sorted(entries, key=lambda entry: entry['last_used'])
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits max_bytes"""
+        entries = self.entries()
+        total = sum(entry['bytes'] for entry in entries)
+        evicted = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry['path'])
+            except OSError:
+                continue
+            total -= entry['bytes']
+            evicted += 1
+        if evicted:
+            self._count('evictions', evicted)
+        return evicted
+
+    def clear(self) -> int:
+        entries = self.entries()
+        for entry in entries:
+            try:
+                os.remove(entry['path'])
+            except OSError:
+                pass
+        return len(entries)
+
+    def _read_stats(self) -> Dict:
+        try:
+            with open(self._stats_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def _stats_lock(self):
+        """Exclusive lock on the stats file across processes (job workers, segment workers)"""
+        with open(os.path.join(self.cache_dir, "stats.lock"), 'a+') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _count(self, name: str, amount: int = 1):
+        with self.lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with self._stats_lock():
+                    self._update_stats(name, amount)
+            except OSError:
+                pass
+
+    def _update_stats(self, name: str, amount: int):
+        stats = self._read_stats()
+        stats[name] = stats.get(name, 0) + amount
+        stats['updated_at'] = time.time()
+        tmp_path = f"{self._stats_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(stats, f)
+        os.replace(tmp_path, self._stats_path())
+
+    def stats(self) -> Dict:
+        counters = self._read_stats()
+        entries = self.entries()
+        hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+        return {
+            'entries': len(entries),
+            'bytes': sum(entry['bytes'] for entry in entries),
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            'stores': counters.get('stores', 0),
+            'evictions': counters.get('evictions', 0),
+        }
+
+
+detection_cache = DetectionCache()
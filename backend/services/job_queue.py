@@ -0,0 +1,455 @@
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import Session
+
+from backend import database, models
+from backend.core.config import settings
+from backend.services.checkpoints import discard_checkpoint
+from backend.services.recount import detections_path_for
+from backend.services.rollups import save_rollups
+from backend.services.timeline import remove_frame_data, timeline_path_for
+from backend.services.worker_pool import init_worker, job_worker_main, threads_per_worker
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+# Result keys stored in their own AnalysisResult columns (or not stored at all), not in the run summary
+RESULT_FIELDS = ("total_count", "zone_counts", "output_video", "output_video_path", "frame_data_path",
+                 "detections", "complete")
+
+
+def new_output_path(video_id: int) -> str:
+    """Fresh annotated-video path under data/results for a video"""
+    output_dir = os.path.join("data", "results")
+    os.makedirs(output_dir, exist_ok=True)
+    output_filename = f"analyzed_{video_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
+    return os.path.join(output_dir, output_filename)
+
+
+def remove_result_files(output_path: str, frame_data_path: str = None):
+    """Delete an analysis' output video, frame data, detection centers and checkpoints if present"""
+    json_path = output_path.replace('.mp4', '_frames.json')
+    for path in (output_path, json_path, detections_path_for(output_path)):
+        if path and os.path.exists(path):
+            os.remove(path)
+    remove_frame_data(frame_data_path or timeline_path_for(output_path))
+    discard_checkpoint(output_path)
+
+
+def analysis_summary(result: Dict) -> Dict:
+    """How an analysis ran: sampling, detection cache, motion gate and tracking fields of its result"""
+    return {key: value for key, value in result.items() if key not in RESULT_FIELDS}
+
+
+def replace_analysis_result(db: Session, video: models.Video, user_id: int, output_path: str,
+                            result: Dict) -> models.AnalysisResult:
+    """Store a finished analysis as the video's result, dropping older results and their files.
+
+    The result's timeline is rolled up into zone_count_rollups as well, and
+    the run summary (analysis_summary) is kept in Video.result_summary.
+    Flushes but does not commit, so callers can update related rows in the
+    same transaction.
+    """
+    old_results = db.query(models.AnalysisResult).filter(
+        models.AnalysisResult.video_id == video.id
+    ).all()
+    for old_result in old_results:
+        if old_result.output_video_path != output_path:
+            remove_result_files(old_result.output_video_path, old_result.frame_data_path)
+        db.delete(old_result)
+
+    analysis_result = models.AnalysisResult(
+        video_id=video.id,
+        user_id=user_id,
+        output_video_path=output_path,
+        frame_data_path=result.get('frame_data_path'),
+        total_count=result['total_count'],
+        zone_counts=result['zone_counts'],
+        processed_at=datetime.now()
+    )
+    db.add(analysis_result)
+    video.result_summary = analysis_summary(result)
+    db.flush()
+    save_rollups(db, analysis_result)
+    return analysis_result
+
+
+def enqueue_analysis(db: Session, video: models.Video, user: models.User, params: Dict) -> models.AnalysisJob:
+    """Queue an analysis of a video; a worker process picks it up"""
+    job = models.AnalysisJob(
+        video_id=video.id,
+        user_id=user.id,
+        status="queued",
+        params=params,
+        progress=0
+    )
+    db.add(job)
+    if video.status != "processing":
+        video.status = "pending"
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def cancel_job(db: Session, job: models.AnalysisJob) -> models.AnalysisJob:
+    """Cancel a queued job immediately, or ask the worker running it to stop"""
+    if job.status in TERMINAL_STATUSES:
+        return job
+    cancelled = db.execute(
+        update(models.AnalysisJob)
+        .where(models.AnalysisJob.id == job.id, models.AnalysisJob.status == "queued")
+        .values(status="cancelled", cancel_requested=True, finished_at=datetime.now())
+    ).rowcount
+    if cancelled:
+        video = db.query(models.Video).filter(models.Video.id == job.video_id).first()
+        if video:
+            video.status = _idle_video_status(db, video.id)
+    else:
+        # Already claimed: the worker sees the flag on its next progress check
+        db.execute(
+            update(models.AnalysisJob)
+            .where(models.AnalysisJob.id == job.id)
+            .values(cancel_requested=True)
+        )
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def worker_identity(worker_name: str) -> str:
+    """Owner recorded on a claimed job: host, process id and worker name"""
+    return f"{socket.gethostname()}:{os.getpid()}:{worker_name}"[:100]
+
+
+def max_running_jobs() -> int:
+    return settings.ANALYSIS_MAX_RUNNING_JOBS or settings.ANALYSIS_WORKERS
+
+
+def _running_jobs(db: Session) -> int:
+    return db.query(func.count(models.AnalysisJob.id)).filter(models.AnalysisJob.status == "running").scalar()
+
+
+def claim_next_job(db: Session, worker: str) -> models.AnalysisJob:
+    """Atomically move the oldest queued job to running for this worker.
+
+    Every API process runs its own worker pool on the same table, so the
+    ANALYSIS_MAX_RUNNING_JOBS cap is checked against all running jobs, and
+    rechecked after the claim: a worker that raced past it puts the job
+    back and tries again on its next poll.
+    """
+    while True:
+        if _running_jobs(db) >= max_running_jobs():
+            return None
+        job = db.query(models.AnalysisJob).filter(
+            models.AnalysisJob.status == "queued"
+        ).order_by(models.AnalysisJob.id).first()
+        if not job:
+            return None
+        # Conditional update so two workers can never claim the same job
+        now = datetime.now()
+        claimed = db.execute(
+            update(models.AnalysisJob)
+            .where(models.AnalysisJob.id == job.id, models.AnalysisJob.status == "queued")
+            .values(status="running", worker=worker, started_at=now, heartbeat_at=now)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            continue
+        if _running_jobs(db) > max_running_jobs():
+            db.execute(
+                update(models.AnalysisJob)
+                .where(models.AnalysisJob.id == job.id, models.AnalysisJob.worker == worker)
+                .values(status="queued", worker=None, started_at=None, heartbeat_at=None)
+            )
+            db.commit()
+            return None
+        db.refresh(job)
+        return job
+
+
+def requeue_orphaned_jobs(db: Session, stale_seconds: float = None) -> int:
+    """Put running jobs whose worker stopped sending heartbeats back on the queue.
+
+    Jobs of live workers, in this process or any other, keep running.
+    """
+    stale_before = datetime.now() - timedelta(seconds=stale_seconds or settings.JOB_STALE_SECONDS)
+    count = db.execute(
+        update(models.AnalysisJob)
+        .where(
+            models.AnalysisJob.status == "running",
+            or_(models.AnalysisJob.heartbeat_at.is_(None), models.AnalysisJob.heartbeat_at < stale_before)
+        )
+        .values(status="queued", worker=None, progress=0, heartbeat_at=None)
+    ).rowcount
+    db.commit()
+    return count
+
+
+class JobHeartbeat:
+    """Background thread stamping a running job's heartbeat_at every JOB_HEARTBEAT_INTERVAL.
+
+    Runs beside the analysis, so slow stages (model load, long decodes)
+    never make a live job look orphaned.
+    """
+
+    def __init__(self, job_id: int, worker: str, interval: float = None):
+        self.job_id = job_id
+        self.worker = worker
+        self.interval = interval or settings.JOB_HEARTBEAT_INTERVAL
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_id}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = database.SessionLocal()
+            try:
+                db.execute(
+                    update(models.AnalysisJob)
+                    .where(models.AnalysisJob.id == self.job_id, models.AnalysisJob.worker == self.worker,
+                           models.AnalysisJob.status == "running")
+                    .values(heartbeat_at=datetime.now())
+                )
+                db.commit()
+            except Exception as e:
+                print(f"[job {self.job_id}] Heartbeat failed: {str(e)}")
+            finally:
+                db.close()
+
+
+def _idle_video_status(db: Session, video_id: int) -> str:
+    """Video status when no job is running: completed if any result exists"""
+    has_result = db.query(models.AnalysisResult).filter(
+        models.AnalysisResult.video_id == video_id
+    ).first() is not None
+    return "completed" if has_result else "pending"
+
+
+class JobMonitor:
+    """Throttled progress reporting and cancel polling for a running job.
+
+    Called by analyze_video once per batch; touches the database at most
+    once per interval. With pipeline_stats, the pipeline's queue depth and
+    stage latencies are published on the job row too, since the API process
+    cannot see the worker's pipelines.
+    """
+
+    def __init__(self, job_id: int, progress: Dict, progress_key: str, interval: float = 1.0,
+                 pipeline_stats: Callable[[], Dict] = None):
+        self.job_id = job_id
+        self.progress = progress
+        self.progress_key = progress_key
+        self.interval = interval
+        self.pipeline_stats = pipeline_stats
+        self.last_check = 0.0
+        self.cancelled = False
+
+    def __call__(self) -> bool:
+        now = time.monotonic()
+        if now - self.last_check < self.interval:
+            return self.cancelled
+        self.last_check = now
+        values = {'progress': self.progress.get(self.progress_key, {}).get('percentage', 0)}
+        stats = self.pipeline_stats() if self.pipeline_stats else None
+        if stats:
+            values['pipeline_stats'] = stats
+        db = database.SessionLocal()
+        try:
+            db.execute(
+                update(models.AnalysisJob)
+                .where(models.AnalysisJob.id == self.job_id)
+                .values(**values)
+            )
+            self.cancelled = bool(db.query(models.AnalysisJob.cancel_requested).filter(
+                models.AnalysisJob.id == self.job_id
+            ).scalar())
+            db.commit()
+        finally:
+            db.close()
+        return self.cancelled
+
+
+def run_job(job_id: int):
+    """Run one claimed job to completion, recording the outcome on the job row"""
+    from backend.services.yolo_service import yolo_service, AnalysisCancelled
+
+    db = database.SessionLocal()
+    output_path = None
+    try:
+        job = db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).first()
+        video = db.query(models.Video).filter(models.Video.id == job.video_id).first()
+        if not video or not os.path.exists(video.filepath):
+            raise Exception("Video file not found")
+        zones = db.query(models.Zone).filter(models.Zone.video_id == video.id).all()
+        if not zones:
+            raise Exception("No zones defined for this video")
+        zones_data = [
+            {
+                'id': zone.id,
+                'label': zone.label,
+                'coordinates': zone.coordinates,
+                'type': zone.zone_type
+            }
+            for zone in zones
+        ]
+
+        # A requeued job reuses its output path so it can resume from its last checkpoint
+        params = dict(job.params or {})
+        output_path = params.pop('output_path', None) or new_output_path(video.id)
+        resume = 'output_path' in (job.params or {})
+        job.params = dict(params, output_path=output_path)
+        video.status = "processing"
+        db.commit()
+
+        monitor = JobMonitor(job.id, yolo_service.progress, f"video_{video.filepath}", settings.JOB_POLL_INTERVAL,
+                             lambda: yolo_service.get_pipeline_stats(video.filepath))
+        print(f"[job {job.id}] Starting analysis for video: {video.filepath}")
+        try:
+            result = yolo_service.analyze_video(
+                video.filepath, zones_data, output_path,
+                should_cancel=monitor, resume=resume, **params
+            )
+        except AnalysisCancelled:
+            remove_result_files(output_path)
+            job.status = "cancelled"
+            job.finished_at = datetime.now()
+            video.status = _idle_video_status(db, video.id)
+            db.commit()
+            print(f"[job {job.id}] Cancelled")
+            return
+
+        analysis_result = replace_analysis_result(db, video, job.user_id, output_path, result)
+
+        job.pipeline_stats = yolo_service.get_pipeline_stats(video.filepath) or job.pipeline_stats
+        job.status = "completed"
+        job.progress = 100
+        job.result_id = analysis_result.id
+        job.finished_at = datetime.now()
+        video.status = "completed"
+        db.commit()
+        print(f"[job {job.id}] Analysis complete. Output: {output_path}")
+    except Exception as e:
+        print(f"[job {job_id}] Analysis error: {str(e)}")
+        print(traceback.format_exc())
+        db.rollback()
+        if output_path:
+            remove_result_files(output_path)
+        job = db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).first()
+        if job:
+            job.status = "failed"
+            job.error = str(e)[:1000]
+            job.finished_at = datetime.now()
+            video = db.query(models.Video).filter(models.Video.id == job.video_id).first()
+            if video:
+                video.status = _idle_video_status(db, video.id)
+            db.commit()
+    finally:
+        db.close()
+
+
+def worker_main(worker_name: str, num_threads: int, poll_interval: float, stop_event):
+    """Entry point of a worker process: claim and run jobs until stopped"""
+    # Pin the thread budget and load this process' own model once, up front
+    try:
+        init_worker(num_threads)
+    except Exception as e:
+        # Jobs retry the lazy load and fail with the error instead of sitting in the queue
+        print(f"[{worker_name}] Model load failed: {str(e)}")
+    print(f"[{worker_name}] Analysis worker started ({num_threads} threads)")
+    worker = worker_identity(worker_name)
+    last_requeue = 0.0
+    # Workers are not daemonic (segmented analyses start their own pool), so exit with the parent
+    parent = multiprocessing.parent_process()
+    while not stop_event.is_set() and (parent is None or parent.is_alive()):
+        db = database.SessionLocal()
+        try:
+            # Jobs of workers that died in any API process go back on the queue
+            if time.monotonic() - last_requeue >= settings.JOB_HEARTBEAT_INTERVAL:
+                last_requeue = time.monotonic()
+                requeued = requeue_orphaned_jobs(db)
+                if requeued:
+                    print(f"[{worker_name}] Requeued {requeued} analysis job(s) of stopped workers")
+            job = claim_next_job(db, worker)
+            job_id = job.id if job else None
+        except Exception as e:
+            print(f"[{worker_name}] Queue error: {str(e)}")
+            job_id = None
+        finally:
+            db.close()
+
+        if job_id is None:
+            stop_event.wait(poll_interval)
+            continue
+        with JobHeartbeat(job_id, worker):
+            run_job(job_id)
+
+
+class AnalysisWorkerPool:
+    """Fixed set of worker processes draining the analysis_jobs table.
+
+    Each worker runs one analysis at a time with its own model instance, and
+    the thread budget of the box is split between workers so N workers never
+    oversubscribe the CPU.
+    """
+
+    def __init__(self, workers: int = None, threads: int = None):
+        self.workers = max(1, workers or settings.ANALYSIS_WORKERS)
+        self.threads_per_worker = threads or threads_per_worker(self.workers)
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = None
+        self.processes: List[multiprocessing.Process] = []
+
+    def start(self):
+        if self.processes:
+            return
+        db = database.SessionLocal()
+        try:
+            requeued = requeue_orphaned_jobs(db)
+            if requeued:
+                print(f"Requeued {requeued} analysis job(s) left running by stopped workers")
+        finally:
+            db.close()
+
+        self.stop_event = self.context.Event()
+        for i in range(self.workers):
+            process = self.context.Process(
+                target=job_worker_main,
+                args=(f"analysis-worker-{i}", self.threads_per_worker, settings.JOB_POLL_INTERVAL, self.stop_event),
+                daemon=False
+            )
+            process.start()
+            self.processes.append(process)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop idle workers; workers still mid-job are terminated, and their jobs requeued once their heartbeat is stale"""
+        if not self.processes:
+            return
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.processes = []
+
+    def status(self) -> List[Dict]:
+        return [
+            {'name': f"analysis-worker-{i}", 'pid': process.pid, 'alive': process.is_alive()}
+            for i, process in enumerate(self.processes)
+        ]
+
+
+worker_pool = AnalysisWorkerPool()
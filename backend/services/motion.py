@@ -0,0 +1,83 @@
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Skips inference on detection frames where nothing changed inside the zones.
+
+    Each detection frame is reduced to a small blurred grayscale copy
+    (`width` pixels wide) and compared with the copy of the last frame that
+    went through the model. Pixels that differ by more than `pixel_delta`
+    are counted inside a mask of the zone polygons, grown by `margin` x the
+    frame width so bodies whose center is near a zone count too. When fewer
+    than `threshold` of the mask's pixels changed, the frame is static: the
+    previous detections are reused and the model is not run. Comparing with
+    the last detected frame (not the previous one) means slow changes still
+    add up to a detection, and after `refresh` frames without one a frame is
+    detected anyway.
+
+    Only counters are carried across checkpoints; after a resume the first
+    detection frame always runs the model.
+    """
+
+    def __init__(self, zones: List[Dict], width: int, height: int, enabled: bool = True, small_width: int = 256,
+                 pixel_delta: int = 20, threshold: float = 0.001, margin: float = 0.05, refresh: int = 0):
+        self.enabled = enabled
+        self.pixel_delta = pixel_delta
+        self.threshold = threshold
+        self.refresh = refresh
+        scale = min(1.0, small_width / width)
+        self.size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        self.mask = np.zeros((self.size[1], self.size[0]), dtype=np.uint8)
+        for zone in zones:
+            polygon = np.asarray(zone['coordinates'], dtype=np.float64).reshape(-1, 2) * scale
+            cv2.fillPoly(self.mask, [np.round(polygon).astype(np.int32)], 255)
+        grow = int(round(margin * self.size[0]))
+        if not zones:
+            self.mask[:] = 255
+        elif grow:
+            self.mask = cv2.dilate(self.mask, np.ones((2 * grow + 1, 2 * grow + 1), dtype=np.uint8))
+        self.mask_pixels = max(1, cv2.countNonZero(self.mask))
+        self.reference = None
+        self.last_detected = None
+        self.checked = 0
+        self.skipped = 0
+
+    def _small(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+    def changed(self, small: np.ndarray) -> float:
+        """Fraction of the zone mask that differs from the last detected frame"""
+        _, moved = cv2.threshold(cv2.absdiff(small, self.reference), self.pixel_delta, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(cv2.bitwise_and(moved, self.mask)) / self.mask_pixels
+
+    def should_detect(self, frame: np.ndarray, frame_index: int) -> bool:
+        """Whether a detection frame must go through the model (False = reuse the last detections)"""
+        if not self.enabled:
+            return True
+        self.checked += 1
+        small = self._small(frame)
+        if self.reference is not None and (not self.refresh or frame_index - self.last_detected < self.refresh) \
+                and self.changed(small) < self.threshold:
+            self.skipped += 1
+            return False
+        self.reference = small
+        self.last_detected = frame_index
+        return True
+
+    def state(self) -> Dict:
+        return {'checked': self.checked, 'skipped': self.skipped}
+
+    def restore(self, state: Dict):
+        self.checked = state.get('checked', 0)
+        self.skipped = state.get('skipped', 0)
+
+    def summary(self) -> Dict:
+        return {
+            'motion_gate': self.enabled,
+            'motion_skipped_frames': self.skipped,
+            'motion_skip_rate': round(self.skipped / self.checked, 4) if self.checked else 0.0
+        }
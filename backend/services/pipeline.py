@@ -0,0 +1,191 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, Generator, List
+
+import numpy as np
+
+# Marks the end of a stage's input
+_END = object()
+
+
+class StageStats:
+    """Item count and latency bookkeeping for one pipeline stage"""
+
+    def __init__(self, name: str, stage_queue: queue.Queue = None):
+        self.name = name
+        self.queue = stage_queue
+        self.items = 0
+        self.total_time = 0.0
+        self.last_latency = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, items: int = 1):
+        with self.lock:
+            self.items += items
+            self.total_time += seconds
+            self.last_latency = seconds
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            avg = self.total_time / self.items if self.items else 0.0
+            return {
+                'stage': self.name,
+                'items': self.items,
+                'busy_seconds': round(self.total_time, 3),
+                'avg_latency_ms': round(avg * 1000, 2),
+                'last_latency_ms': round(self.last_latency * 1000, 2),
+                'queue_depth': self.queue.qsize() if self.queue is not None else None,
+                'queue_size': self.queue.maxsize if self.queue is not None else None,
+            }
+
+
+class FramePipeline:
+    """Decode -> detect -> encode pipeline linked by bounded queues.
+
+    A decoder thread reads batches of frames from the capture into a bounded
+    queue, the caller runs inference by iterating over batches(), and an
+    encoder thread drains a second bounded queue through the encode callback.
+    Full queues block the producer, so a slow stage applies back-pressure
+    instead of buffering the whole video in memory. With max_frames set the
+    decoder stops after that many frames (used to analyze one segment).
+    """
+
+    def __init__(self, cap, batch_size: int = 1, encode: Callable = None, queue_size: int = 4,
+                 max_frames: int = None):
+        self.cap = cap
+        self.batch_size = max(1, batch_size)
+        self.max_frames = max_frames
+        self.encode = encode
+        self.decode_queue = queue.Queue(maxsize=queue_size)
+        self.encode_queue = queue.Queue(maxsize=queue_size * self.batch_size) if encode else None
+        self.decode_stats = StageStats('decode', self.decode_queue)
+        self.detect_stats = StageStats('detect')
+        self.encode_stats = StageStats('encode', self.encode_queue) if encode else None
+        self.started_at = None
+        self.finished_at = None
+        self._submit_wait = 0.0
+        self._stop = threading.Event()
+        self._error = None
+        self._threads = []
+
+    def start(self) -> 'FramePipeline':
+        self.started_at = time.time()
+        self._threads.append(threading.Thread(target=self._decode_loop, name='pipeline-decode', daemon=True))
+        if self.encode:
+            self._threads.append(threading.Thread(target=self._encode_loop, name='pipeline-encode', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Blocking put that gives up once the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decode_loop(self):
+        remaining = self.max_frames
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                frames = []
+                limit = self.batch_size if remaining is None else min(self.batch_size, remaining)
+                while len(frames) < limit:
+                    ret, frame = self.cap.read()
+                    if not ret:
+                        break
+                    frames.append(frame)
+                if not frames:
+                    break
+                if remaining is not None:
+                    remaining -= len(frames)
+                self.decode_stats.record(time.perf_counter() - start, len(frames))
+                if not self._put(self.decode_queue, frames):
+                    return
+        except Exception as e:
+            self._error = e
+        self._put(self.decode_queue, _END)
+
+    def _encode_loop(self):
+        while True:
+            item = self.encode_queue.get()
+            if item is _END:
+                return
+            if self._error is not None:
+                continue
+            start = time.perf_counter()
+            try:
+                self.encode(item)
+            except Exception as e:
+                self._error = e
+                continue
+            self.encode_stats.record(time.perf_counter() - start)
+
+    def batches(self) -> Generator[List[np.ndarray], None, None]:
+        """Yield decoded batches; time spent by the caller counts as the detect stage"""
+        while True:
+            item = self.decode_queue.get()
+            if item is _END:
+                break
+            start = time.perf_counter()
+            waited = self._submit_wait
+            yield item
+            # Time blocked on a full encode queue belongs to the encoder, not detection
+            busy = time.perf_counter() - start - (self._submit_wait - waited)
+            self.detect_stats.record(busy, len(item))
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, item):
+        """Hand a processed frame to the encoder thread (blocks when the queue is full)"""
+        if self._error is not None:
+            raise self._error
+        start = time.perf_counter()
+        self._put(self.encode_queue, item)
+        self._submit_wait += time.perf_counter() - start
+
+    @property
+    def error(self) -> Exception:
+        """First exception raised by the decode or encode stage, if any"""
+        return self._error
+
+    def close(self, wait: bool = True):
+        """Flush the encoder and join the stage threads.
+
+        With wait=False (client disconnected, caller failed) decoding is
+        abandoned; frames already queued for encoding are still written.
+        Stage errors are not raised here, check `error` after closing.
+        """
+        if not wait:
+            self._stop.set()
+            # Drain so a blocked decoder can observe the stop flag
+            while not self.decode_queue.empty():
+                try:
+                    self.decode_queue.get_nowait()
+                except queue.Empty:
+                    break
+        if self.encode:
+            self.encode_queue.put(_END)
+        for thread in self._threads:
+            thread.join()
+        self.finished_at = time.time()
+
+    def stats(self) -> Dict:
+        stages = [self.decode_stats, self.detect_stats]
+        if self.encode_stats:
+            stages.append(self.encode_stats)
+        snapshots = [stage.snapshot() for stage in stages]
+        bottleneck = max(snapshots, key=lambda s: s['busy_seconds'])['stage'] if snapshots else None
+        end = self.finished_at or time.time()
+        return {
+            'batch_size': self.batch_size,
+            'running': self.started_at is not None and self.finished_at is None,
+            'elapsed_seconds': round(end - self.started_at, 3) if self.started_at else 0,
+            'bottleneck': bottleneck,
+            'stages': snapshots,
+        }
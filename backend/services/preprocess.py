@@ -0,0 +1,135 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+# Padding value of the letterbox borders, as used by Ultralytics
+PAD_VALUE = 114
+# Model input sides are padded to a multiple of the network stride
+MODEL_STRIDE = 32
+
+Region = Tuple[int, int, int, int]
+
+
+class Letterbox:
+    """Aspect-preserving letterbox from a video's native frames to the model input.
+
+    Computed once per video: frames are scaled by one gain so the longer
+    side fits `size` and padded evenly to a multiple of the model stride
+    (rectangular inference, like Ultralytics' own letterbox), which is
+    described by a single affine transform (native -> input) and its
+    inverse. Every analysis path runs the model on these images (see
+    to_tensor), so the model does no resizing of its own, and maps the
+    boxes it returns back to native pixels with `to_native`. Counting is
+    therefore done on native coordinates everywhere and the same frame gives
+    the same counts whichever endpoint analyzed it.
+
+    With a `roi` (x0, y0, x1, y1) only that region of the frame is fed to
+    the model, at the same gain as the full frame, so people keep their
+    size in pixels and the input shrinks with the region. An explicit
+    `gain` overrides the full-frame one (tiles use 1.0: native pixels).
+    """
+
+    def __init__(self, width: int, height: int, size: int = 640, roi: Region = None, gain: float = None):
+        self.width = width
+        self.height = height
+        self.size = size
+        self.roi = tuple(roi) if roi else (0, 0, width, height)
+        self.cropped = self.roi != (0, 0, width, height)
+        x0, y0, x1, y1 = self.roi
+        self.gain = min(size / width, size / height) if gain is None else gain
+        self.resized = (max(1, int(round((x1 - x0) * self.gain))), max(1, int(round((y1 - y0) * self.gain))))
+        self.input_size = tuple(math.ceil(side / MODEL_STRIDE) * MODEL_STRIDE for side in self.resized)
+        pad_x = (self.input_size[0] - self.resized[0]) / 2
+        pad_y = (self.input_size[1] - self.resized[1]) / 2
+        # Odd padding puts the extra pixel on the right / bottom
+        self._borders = (
+            int(round(pad_y - 0.1)), int(round(pad_y + 0.1)),
+            int(round(pad_x - 0.1)), int(round(pad_x + 0.1)),
+        )
+        top, _, left, _ = self._borders
+        self.matrix = np.array([
+            [self.gain, 0, left - self.gain * x0],
+            [0, self.gain, top - self.gain * y0],
+        ], dtype=np.float64)
+        self.inverse = cv2.invertAffineTransform(self.matrix)
+
+    @property
+    def pixels(self) -> int:
+        """Model input pixels per frame"""
+        return self.input_size[0] * self.input_size[1]
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        """The letterboxed model input for a native BGR frame"""
+        image = frame
+        if self.cropped:
+            x0, y0, x1, y1 = self.roi
+            image = frame[y0:y1, x0:x1]
+        if self.resized != (image.shape[1], image.shape[0]):
+            image = cv2.resize(image, self.resized, interpolation=cv2.INTER_LINEAR)
+        top, bottom, left, right = self._borders
+        return cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                                  value=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+
+    def to_tensor(self, frames: List[np.ndarray]) -> torch.Tensor:
+        """Letterbox native BGR frames into one (n, 3, h, w) RGB float tensor in [0, 1]"""
+        return images_to_tensor([self(frame) for frame in frames])
+
+    def to_native(self, boxes: np.ndarray) -> np.ndarray:
+        """Map xyxy boxes from model input to native pixels, clipped to the frame"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if not len(boxes):
+            return boxes
+        scale = self.inverse[0, 0]
+        native = np.empty_like(boxes)
+        native[:, [0, 2]] = boxes[:, [0, 2]] * scale + self.inverse[0, 2]
+        native[:, [1, 3]] = boxes[:, [1, 3]] * scale + self.inverse[1, 2]
+        native[:, [0, 2]] = native[:, [0, 2]].clip(0, self.width)
+        native[:, [1, 3]] = native[:, [1, 3]].clip(0, self.height)
+        return native
+
+
+def images_to_tensor(images: List[np.ndarray]) -> torch.Tensor:
+    """Stack same-sized BGR model inputs into one (n, 3, h, w) RGB float tensor in [0, 1]"""
+    batch = np.ascontiguousarray(np.stack(images)[..., ::-1].transpose(0, 3, 1, 2))
+    return torch.from_numpy(batch).float().div_(255.0)
+
+
+def zone_roi(zones: List[Dict], width: int, height: int, margin: float) -> Optional[Region]:
+    """Bounding box of all (native) zone polygons, grown by margin x frame size and clipped to the frame.
+
+    The margin leaves room for the bodies of people whose center is just
+    inside a zone, so their boxes (and centers) are not cut by the crop.
+    Returns None when the region would be the whole frame anyway.
+    """
+    if not zones:
+        return None
+    points = np.concatenate([np.asarray(zone['coordinates'], dtype=np.float64).reshape(-1, 2) for zone in zones])
+    pad_x, pad_y = margin * width, margin * height
+    roi = (
+        max(0, int(math.floor(points[:, 0].min() - pad_x))),
+        max(0, int(math.floor(points[:, 1].min() - pad_y))),
+        min(width, int(math.ceil(points[:, 0].max() + pad_x))),
+        min(height, int(math.ceil(points[:, 1].max() + pad_y))),
+    )
+    if roi[2] <= roi[0] or roi[3] <= roi[1] or roi == (0, 0, width, height):
+        return None
+    return roi
+
+
+def roi_covers(roi: Optional[Region], zones: List[Dict]) -> bool:
+    """Whether every (native) zone polygon lies inside a region (None = whole frame)"""
+    if roi is None:
+        return True
+    points = np.concatenate([np.asarray(zone['coordinates'], dtype=np.float64).reshape(-1, 2) for zone in zones])
+    x0, y0, x1, y1 = roi
+    return bool((points[:, 0] >= x0).all() and (points[:, 0] <= x1).all()
+                and (points[:, 1] >= y0).all() and (points[:, 1] <= y1).all())
+
+
+def display_size(width: int, height: int, display_width: int) -> tuple:
+    """Aspect-correct size of a live preview that is display_width wide (never upscaled)"""
+    scale = min(1.0, display_width / width)
+    return int(round(width * scale)), int(round(height * scale))
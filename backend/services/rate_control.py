@@ -0,0 +1,94 @@
+import time
+from typing import Dict, Optional, Tuple
+
+from backend.core.config import settings
+
+# (JPEG quality, output scale) from best to worst; None keeps the session's own quality
+QUALITY_LADDER: Tuple[Tuple[Optional[int], float], ...] = (
+    (None, 1.0),
+    (50, 1.0),
+    (40, 0.75),
+    (30, 0.5),
+)
+
+
+class QualityController:
+    """Adaptive JPEG quality, resolution and frame skipping for one live viewer.
+
+    After every frame sent to the viewer it observes the frame's age on
+    delivery (time since the analysis produced it, so it includes waiting
+    in the viewer's inbox and writing to the socket) and keeps an EWMA of
+    it. At most once per LIVE_ADAPT_INTERVAL seconds:
+    - above the target latency, or if the inbox dropped frames, it steps
+      down the quality ladder, and once at the bottom sends only every
+      skip-th frame (up to LIVE_MAX_FRAME_SKIP);
+    - below half the target it recovers in the opposite order.
+    The reason of the last change is kept so a degraded viewer can be
+    explained from the session stats.
+    """
+
+    def __init__(self, target_ms: float = None, max_skip: int = None, interval: float = None):
+        self.target = (settings.LIVE_TARGET_LATENCY_MS if target_ms is None else target_ms) / 1000
+        self.max_skip = max(1, settings.LIVE_MAX_FRAME_SKIP if max_skip is None else max_skip)
+        self.interval = settings.LIVE_ADAPT_INTERVAL if interval is None else interval
+        self.level = 0
+        self.skip = 1
+        self.latency = None
+        self.changes = 0
+        self.reason = None
+        self._frames = 0
+        self._dropped = 0
+        self._last_change = time.monotonic()
+
+    @property
+    def quality(self) -> Optional[int]:
+        return QUALITY_LADDER[self.level][0]
+
+    @property
+    def scale(self) -> float:
+        return QUALITY_LADDER[self.level][1]
+
+    def admit(self) -> bool:
+        """Whether the next frame should be sent (False = skip it)"""
+        self._frames += 1
+        return self._frames % self.skip == 0
+
+    def observe(self, latency: float, dropped: int = 0):
+        """Feed the delivery age of a frame (seconds) and the inbox's total dropped count"""
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        overflow = dropped > self._dropped
+        self._dropped = dropped
+        now = time.monotonic()
+        if now - self._last_change < self.interval:
+            return
+        if overflow or self.latency > self.target:
+            why = 'inbox overflow' if overflow else f'latency {self.latency * 1000:.0f}ms over target'
+            if self.level < len(QUALITY_LADDER) - 1:
+                self._change(now, f'{why}: lower quality', level=self.level + 1)
+            elif self.skip < self.max_skip:
+                self._change(now, f'{why}: skip more frames', skip=self.skip + 1)
+        elif self.latency < self.target / 2:
+            why = f'latency {self.latency * 1000:.0f}ms under target'
+            if self.skip > 1:
+                self._change(now, f'{why}: skip fewer frames', skip=self.skip - 1)
+            elif self.level > 0:
+                self._change(now, f'{why}: raise quality', level=self.level - 1)
+
+    def _change(self, now: float, reason: str, level: int = None, skip: int = None):
+        self.level = self.level if level is None else level
+        self.skip = self.skip if skip is None else skip
+        self.reason = reason
+        self.changes += 1
+        self._last_change = now
+
+    def state(self) -> Dict:
+        return {
+            'level': self.level,
+            'jpeg_quality': self.quality,
+            'scale': self.scale,
+            'frame_skip': self.skip,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'target_latency_ms': round(self.target * 1000, 1),
+            'changes': self.changes,
+            'last_change': self.reason,
+        }
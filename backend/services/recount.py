@@ -0,0 +1,147 @@
+import json
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend.services.sampling import DetectionSampler
+from backend.services.zone_geometry import ZoneIndex, box_centers
+
+# Per-zone fields of a tracked analysis (see ZoneTracker.zone_summary); tracks are not stored
+TRACKING_FIELDS = ('unique', 'entries', 'exits', 'dwell_seconds', 'avg_dwell_seconds', 'max_dwell_seconds')
+
+
+def detections_path_for(output_path: str) -> str:
+    """Detection centers artifact stored next to an analysis' output video"""
+    return output_path.replace('.mp4', '_detections.npz')
+
+
+def save_detection_centers(path: str, detections: Dict[str, np.ndarray], fps: float, frames: int,
+                           width: int, height: int, stride: int, fill: str, roi: Tuple[int, int, int, int] = None,
+                           zones: List[Dict] = None):
+    """Store per-frame detection centers (native resolution) of a finished analysis.
+
+    roi is the region detection was restricted to, if any; recounts are only
+    valid for zones inside it. zones (on the 640x360 canvas) are the ones
+    the analysis counted, so recounts know which zones are unchanged.
+    """
+    np.savez_compressed(
+        path,
+        frames=detections['frames'],
+        offsets=detections['offsets'],
+        centers=box_centers(detections['boxes']).astype(np.int32),
+        meta=np.array([fps, frames, width, height, stride], dtype=np.float64),
+        fill=np.array(fill),
+        roi=np.array(roi if roi else [], dtype=np.int64),
+        zones=np.array(json.dumps(zones or []))
+    )
+
+
+def load_detection_centers(path: str) -> Dict:
+    with np.load(path) as data:
+        fps, frames, width, height, stride = data['meta']
+        return {
+            'frames': data['frames'],
+            'offsets': data['offsets'],
+            'centers': data['centers'],
+            'fps': fps,
+            'frame_count': int(frames),
+            'width': int(width),
+            'height': int(height),
+            'stride': int(stride),
+            'fill': str(data['fill']),
+            'roi': tuple(int(v) for v in data['roi']) or None if 'roi' in data.files else None,
+            'zones': json.loads(str(data['zones'])) if 'zones' in data.files else None,
+        }
+
+
+def scale_zones(zones: List[Dict], width: int, height: int) -> List[Dict]:
+    """Scale zones from the 640x360 drawing canvas to video resolution, as analyze_video does"""
+    return [
+        {
+            'id': zone['id'],
+            'label': zone['label'],
+            'coordinates': [[int((x / 640) * width), int((y / 360) * height)] for x, y in zone['coordinates']],
+            'type': zone.get('type', 'occupancy')
+        }
+        for zone in zones
+    ]
+
+
+def recount(stored: Dict, zones: List[Dict]) -> Dict:
+    """Zone counts and per-frame timeline for a zone set, without decoding or inference.
+
+    All stored centers of the video are assigned to zones in a single
+    ZoneIndex pass and binned per detection frame; the timeline is then
+    rebuilt with the same DetectionSampler fill the analysis used, so an
+    unchanged zone set reproduces the analysis' own results. Timelines
+    filled from tracks (fill='track') cannot be rebuilt, as tracks are not
+    stored; callers must reject those.
+    """
+    if stored['fill'] == 'track':
+        raise ValueError("Timelines filled from tracks cannot be recounted")
+    start = time.perf_counter()
+    scaled_zones = scale_zones(zones, stored['width'], stored['height'])
+    zone_index = ZoneIndex(scaled_zones)
+
+    offsets = stored['offsets']
+    assigned = zone_index.assign(stored['centers'])
+    frame_of = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    counts = np.zeros((len(offsets) - 1, len(scaled_zones)), dtype=np.int64)
+    inside = assigned >= 0
+    np.add.at(counts, (frame_of[inside], assigned[inside]), 1)
+    rows = {int(frame): i for i, frame in enumerate(stored['frames'])}
+
+    fps = stored['fps']
+    labels = [zone['label'] for zone in scaled_zones]
+    sampler = DetectionSampler(fps, stored['stride'], None, stored['fill'])
+    frame_data = []
+    current = [0] * len(labels)
+    for frame_index in range(stored['frame_count']):
+        keyframe = sampler.is_keyframe(frame_index)
+        if keyframe and frame_index in rows:
+            current = counts[rows[frame_index]].tolist()
+        frame_data.extend(sampler.timeline_rows(
+            round((frame_index + 1) / fps, 2),
+            dict(zip(labels, current)),
+            keyframe
+        ))
+    frame_data.extend(sampler.flush())
+
+    zone_max = counts.max(axis=0) if len(counts) else np.zeros(len(scaled_zones), dtype=np.int64)
+    zone_counts = [
+        {'zone_id': zone['id'], 'zone_label': zone['label'], 'count': int(zone_max[i])}
+        for i, zone in enumerate(scaled_zones)
+    ]
+    return {
+        'total_count': sum(zone['count'] for zone in zone_counts),
+        'zone_counts': zone_counts,
+        'frame_data': frame_data,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+
+def carry_tracking(zone_counts: List[Dict], previous: List[Dict], analyzed_zones: List[Dict],
+                   zones: List[Dict]) -> List[str]:
+    """Copy the tracking fields of unchanged zones from the analysis' zone_counts into recounted ones.
+
+    A zone is unchanged when the analysis counted a zone with the same id
+    and coordinates. Returns the labels of the recounted zones whose
+    tracking fields could not be kept (new or moved zones of a tracked
+    analysis), empty when the analysis was not tracked; those keep their
+    counts only.
+    """
+    tracked = {zone['zone_id']: zone for zone in previous or [] if 'unique' in zone}
+    if not tracked:
+        return []
+    analyzed = {zone['id']: zone['coordinates'] for zone in analyzed_zones or []}
+    coordinates = {zone['id']: zone['coordinates'] for zone in zones}
+    stale = []
+    for zone in zone_counts:
+        zone_id = zone['zone_id']
+        if zone_id in tracked and zone_id in analyzed and analyzed[zone_id] == coordinates[zone_id]:
+            zone.update({field: tracked[zone_id][field] for field in TRACKING_FIELDS if field in tracked[zone_id]})
+        else:
+            stale.append(zone['zone_label'])
+    return stale
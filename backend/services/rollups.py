@@ -0,0 +1,73 @@
+import os
+from typing import Dict, Generator, List
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.core.config import settings
+from backend.services.timeline import TimelineReader, open_timeline
+
+
+def rollup_rows(reader: TimelineReader, buckets: List[int]) -> Generator[Dict, None, None]:
+    """Min, max, average and sample count per zone and time bucket of a timeline.
+
+    A bucket of `seconds` covers [k * seconds, (k + 1) * seconds) of video
+    time; only buckets with at least one row are produced. The timeline is
+    sorted by time, so each bucket is a contiguous run of rows and one
+    reduceat per statistic covers the whole column.
+    """
+    if not reader.rows or not reader.labels:
+        return
+    times = np.asarray(reader.time, dtype=np.float64)
+    columns = [np.asarray(column, dtype=np.float64) for column in reader.zones]
+    for seconds in buckets:
+        index = np.floor(times / seconds).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+        sizes = np.diff(np.append(starts, len(times)))
+        bucket_starts = (index[starts] * seconds).tolist()
+        for label, values in zip(reader.labels, columns):
+            mins = np.minimum.reduceat(values, starts).tolist()
+            maxs = np.maximum.reduceat(values, starts).tolist()
+            means = np.round(np.add.reduceat(values, starts) / sizes, 3).tolist()
+            for start, low, high, mean, samples in zip(bucket_starts, mins, maxs, means, sizes.tolist()):
+                yield {
+                    'zone_label': label,
+                    'bucket_seconds': seconds,
+                    'bucket_start': start,
+                    'min_count': low,
+                    'max_count': high,
+                    'avg_count': mean,
+                    'samples': samples,
+                }
+
+
+def save_rollups(db: Session, result: models.AnalysisResult) -> int:
+    """Replace an analysis result's rollup rows with fresh ones from its timeline.
+
+    Rows are written with executemany inserts of ROLLUP_INSERT_BATCH rows.
+    Flushes but does not commit, so the rollups land in the caller's
+    transaction together with the result. Returns the rows inserted.
+    """
+    db.query(models.ZoneCountRollup).filter(
+        models.ZoneCountRollup.result_id == result.id
+    ).delete(synchronize_session=False)
+    if not result.frame_data_path or not os.path.exists(result.frame_data_path):
+        return 0
+
+    zone_ids = {zone['zone_label']: zone.get('zone_id') for zone in result.zone_counts or [] if 'zone_label' in zone}
+    table = models.ZoneCountRollup.__table__
+    inserted = 0
+    batch = []
+    for row in rollup_rows(open_timeline(result.frame_data_path), settings.ROLLUP_BUCKETS):
+        row.update(result_id=result.id, video_id=result.video_id, zone_id=zone_ids.get(row['zone_label']))
+        batch.append(row)
+        if len(batch) >= settings.ROLLUP_INSERT_BATCH:
+            db.execute(table.insert(), batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        db.execute(table.insert(), batch)
+        inserted += len(batch)
+    db.flush()
+    return inserted
@@ -0,0 +1,84 @@
+from typing import Dict, List
+
+FILL_MODES = ('hold', 'interpolate', 'track')
+
+
+class DetectionSampler:
+    """Decides which frames go through the model and fills the timeline for the rest.
+
+    Detection runs on every `stride`-th frame (frame 0 always included). The
+    stride is either given directly or derived from a target analysis fps.
+    Skipped frames reuse the last detections for drawing; their timeline
+    counts are either held from the last detected frame ('hold'), linearly
+    interpolated between the surrounding detected frames ('interpolate'), or
+    counted from the tracker's predicted boxes ('track', see ZoneTracker),
+    in which case the caller passes those counts and they are used as is.
+    """
+
+    def __init__(self, fps: float, stride: int = 1, target_fps: float = None, fill: str = 'hold'):
+        if fill not in FILL_MODES:
+            raise ValueError(f"fill must be one of {FILL_MODES}")
+        if target_fps:
+            stride = round(fps / target_fps) if fps else 1
+        self.stride = max(1, int(stride or 1))
+        self.fill = fill
+        self.detected_frames = 0
+        self._last = None
+        self._pending = []
+
+    def is_keyframe(self, frame_index: int) -> bool:
+        """Whether the 0-based frame index runs detection"""
+        return frame_index % self.stride == 0
+
+    def timeline_rows(self, frame_time: float, counts: Dict[str, float], keyframe: bool) -> List[Dict]:
+        """Timeline rows that are complete after this frame, in frame order"""
+        if keyframe:
+            self.detected_frames += 1
+        if self.fill != 'interpolate' or self.stride == 1:
+            return [{'time': frame_time, 'counts': counts}]
+        if not keyframe:
+            # Wait for the next detected frame to interpolate towards
+            self._pending.append(frame_time)
+            return []
+        rows = []
+        if self._last is not None and self._pending:
+            last_time, last_counts = self._last
+            span = frame_time - last_time
+            for pending_time in self._pending:
+                weight = (pending_time - last_time) / span if span else 0
+                rows.append({
+                    'time': pending_time,
+                    'counts': {
+                        label: round(last_counts[label] + (counts[label] - last_counts[label]) * weight, 2)
+                        for label in counts
+                    }
+                })
+        self._pending = []
+        self._last = (frame_time, counts)
+        rows.append({'time': frame_time, 'counts': counts})
+        return rows
+
+    def flush(self) -> List[Dict]:
+        """Rows still waiting for a next detected frame; they hold the last counts"""
+        rows = []
+        if self._last is not None:
+            rows = [{'time': pending_time, 'counts': dict(self._last[1])} for pending_time in self._pending]
+        self._pending = []
+        return rows
+
+    def state(self) -> Dict:
+        """JSON-serializable fill state, to continue the timeline after a restart"""
+        return {
+            'detected_frames': self.detected_frames,
+            'last': list(self._last) if self._last is not None else None,
+            'pending': list(self._pending)
+        }
+
+    def restore(self, state: Dict):
+        self.detected_frames = state.get('detected_frames', 0)
+        last = state.get('last')
+        self._last = (last[0], last[1]) if last else None
+        self._pending = list(state.get('pending', []))
+
+    def summary(self) -> Dict:
+        return {'detect_stride': self.stride, 'fill': self.fill, 'detected_frames': self.detected_frames}
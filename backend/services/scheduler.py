@@ -0,0 +1,220 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.services.preprocess import Letterbox
+
+# Runs one model call over frames of several sources, each with its own letterbox
+Detector = Callable[[List[np.ndarray], List[Letterbox]], List[Tuple[np.ndarray, np.ndarray]]]
+
+
+class SourceHandle:
+    """A live source registered with the scheduler: its fps budget, fair-share weight and counters"""
+
+    def __init__(self, key: str, fps: float = None, weight: float = 1.0):
+        self.key = key
+        self.fps = fps
+        self.interval = 1.0 / fps if fps else 0.0
+        self.weight = max(weight, 1e-3)
+        self.next_due = 0.0
+        self.vtime = 0.0
+        self.pending: Optional['_Request'] = None
+        self.served = 0
+        self.waited = 0.0
+        self.registered_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        uptime = time.monotonic() - self.registered_at
+        return {
+            'source': self.key,
+            'fps_budget': self.fps,
+            'weight': self.weight,
+            'served': self.served,
+            'served_fps': round(self.served / uptime, 2) if uptime > 0 else 0.0,
+            'avg_wait_ms': round(self.waited / self.served * 1000, 1) if self.served else 0.0,
+        }
+
+
+class _Request:
+    __slots__ = ('source', 'frame', 'letterbox', 'submitted', 'done', 'result', 'error')
+
+    def __init__(self, source: SourceHandle, frame: np.ndarray, letterbox: Letterbox):
+        self.source = source
+        self.frame = frame
+        self.letterbox = letterbox
+        self.submitted = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class InferenceScheduler:
+    """Shared, batched person detection for many live sources on a fixed pool of workers.
+
+    Sources (cameras) register with an fps budget and a weight. A source
+    first waits for its next slot (`pace`), so it never asks for more
+    than its budget, then submits its newest frame and waits for the boxes
+    (`detect`); each source has at most one frame in flight. Every worker
+    owns one detector (worker 0 the service's own model) and repeatedly
+    takes a batch of pending frames, one per source, and runs them through
+    the model in a single call.
+
+    Batches are filled by weighted fair queuing: each served frame advances
+    its source's virtual time by 1 / weight (starting from the scheduler's
+    virtual clock, so an idle source cannot bank credit), and the pending
+    frames with the lowest virtual time go first. When the sources ask for
+    more than the workers can run, each gets throughput in proportion to
+    its weight and no source waits more than one round behind the others.
+    Frames batched together must share a model input size; a worker waits
+    up to `batch_wait` seconds for a fuller batch while fewer frames than
+    registered sources are pending.
+
+    A worker whose detector fails to load exits; once every worker has,
+    pending and later `detect` calls raise that error. `detect` also gives
+    up after `timeout` seconds, so a stuck model never hangs its callers.
+    """
+
+    def __init__(self, detector_factory: Callable[[int], Detector], workers: int = 1, max_batch: int = 16,
+                 batch_wait: float = 0.02, timeout: float = 30.0):
+        self.detector_factory = detector_factory
+        self.workers = max(1, workers)
+        self.max_batch = max(1, max_batch)
+        self.batch_wait = batch_wait
+        self.timeout = timeout
+        self.failed_workers = 0
+        self.error: Optional[Exception] = None
+        self.sources: List[SourceHandle] = []
+        self.vclock = 0.0
+        self.batches = 0
+        self.frames = 0
+        self.busy = 0.0
+        self.started_at = None
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def register(self, key: str, fps: float = None, weight: float = 1.0) -> SourceHandle:
+        handle = SourceHandle(key, fps, weight)
+        with self._cond:
+            handle.vtime = self.vclock
+            self.sources.append(handle)
+            if not self._threads:
+                self.started_at = time.monotonic()
+                self._threads = [
+                    threading.Thread(target=self._work, args=(i,), name=f'camera-inference-{i}', daemon=True)
+                    for i in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+        return handle
+
+    def unregister(self, handle: SourceHandle):
+        with self._cond:
+            if handle in self.sources:
+                self.sources.remove(handle)
+
+    def pace(self, handle: SourceHandle):
+        """Wait for the source's next slot under its fps budget"""
+        now = time.monotonic()
+        if handle.next_due > now:
+            time.sleep(handle.next_due - now)
+            now = handle.next_due
+        handle.next_due = max(now, handle.next_due) + handle.interval
+
+    def detect(self, handle: SourceHandle, frame: np.ndarray, letterbox: Letterbox) -> Tuple[np.ndarray, np.ndarray]:
+        """Native person boxes and scores for a source's frame, from a shared batched model call"""
+        request = _Request(handle, frame, letterbox)
+        with self._cond:
+            if self.error is not None:
+                raise self.error
+            handle.pending = request
+            self._cond.notify_all()
+        if not request.done.wait(self.timeout):
+            with self._cond:
+                if handle.pending is request:
+                    handle.pending = None
+            raise TimeoutError(f"No detections for {handle.key} within {self.timeout:.0f}s")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _take_batch(self) -> List[_Request]:
+        """Fairest batch of pending frames (one per source, same input size); called with the lock held"""
+        deadline = time.monotonic() + self.batch_wait
+        while True:
+            pending = [source.pending for source in self.sources if source.pending is not None]
+            wanted = min(self.max_batch, len(self.sources))
+            remaining = deadline - time.monotonic()
+            if pending and (len(pending) >= wanted or remaining <= 0):
+                break
+            self._cond.wait(remaining if pending else 1.0)
+            if not pending:
+                deadline = time.monotonic() + self.batch_wait
+        pending.sort(key=lambda request: (request.source.vtime, request.submitted))
+        size = pending[0].letterbox.input_size
+        batch = [request for request in pending if request.letterbox.input_size == size][:self.max_batch]
+        self.vclock = max(self.vclock, batch[0].source.vtime)
+        for request in batch:
+            source = request.source
+            source.pending = None
+            source.vtime = max(source.vtime, self.vclock) + 1.0 / source.weight
+        return batch
+
+    def _fail(self, error: Exception):
+        """The last worker is gone: fail every pending request; called with the lock held"""
+        self.error = error
+        for source in self.sources:
+            request = source.pending
+            if request is not None:
+                source.pending = None
+                request.error = error
+                request.done.set()
+
+    def _work(self, worker: int):
+        try:
+            detector = self.detector_factory(worker)
+        except Exception as e:
+            print(f"[camera scheduler] worker {worker} could not load its detector: {e}")
+            with self._cond:
+                self.failed_workers += 1
+                if self.failed_workers == self.workers:
+                    self._fail(e)
+            return
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            start = time.monotonic()
+            try:
+                results = detector([request.frame for request in batch], [request.letterbox for request in batch])
+            except Exception as e:
+                results = None
+                for request in batch:
+                    request.error = e
+            finished = time.monotonic()
+            with self._cond:
+                self.batches += 1
+                self.frames += len(batch)
+                self.busy += finished - start
+            for i, request in enumerate(batch):
+                if results is not None:
+                    request.result = results[i]
+                request.source.served += 1
+                request.source.waited += finished - request.submitted
+                request.done.set()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            sources = [source.stats() for source in self.sources]
+            uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+            return {
+                'workers': self.workers,
+                'failed_workers': self.failed_workers,
+                'error': str(self.error) if self.error else None,
+                'max_batch': self.max_batch,
+                'batches': self.batches,
+                'frames': self.frames,
+                'avg_batch_size': round(self.frames / self.batches, 2) if self.batches else 0.0,
+                'utilization': round(self.busy / (uptime * self.workers), 3) if uptime > 0 else 0.0,
+                'sources': sources,
+            }
@@ -0,0 +1,283 @@
+import math
+import multiprocessing
+import os
+import subprocess
+import tempfile
+from concurrent.futures import FIRST_EXCEPTION, wait
+from typing import Callable, Dict, List, Tuple
+
+import cv2
+import imageio_ffmpeg
+import numpy as np
+
+from backend.core.config import settings
+from backend.services.checkpoints import discard_checkpoint
+from backend.services.detection_cache import DetectionRecorder, detection_cache
+from backend.services.recount import detections_path_for, save_detection_centers, scale_zones
+from backend.services.sampling import DetectionSampler
+from backend.services.timeline import TimelineReader, TimelineWriter, remove_frame_data, timeline_path_for
+
+
+def plan_segments(total_frames: int, fps: float, segments: int, stride: int = 1,
+                  min_seconds: float = None) -> List[Tuple[int, int]]:
+    """Split [0, total_frames) into at most `segments` (start, end) frame ranges.
+
+    Segments shorter than min_seconds are merged away, and every boundary is a
+    multiple of the detection stride so each segment detects on exactly the
+    frames a single pass would. The last segment is open-ended (end None) so
+    it reads to the real end of the file even if the frame count is off.
+    """
+    min_seconds = settings.ANALYSIS_MIN_SEGMENT_SECONDS if min_seconds is None else min_seconds
+    stride = max(1, stride)
+    min_frames = max(stride, int(min_seconds * fps))
+    segments = max(1, min(segments, total_frames // min_frames if min_frames else segments))
+    length = math.ceil(math.ceil(total_frames / segments) / stride) * stride
+    bounds = []
+    start = 0
+    while start < total_frames and len(bounds) < segments:
+        bounds.append([start, start + length])
+        start += length
+    if not bounds:
+        bounds = [[0, None]]
+    bounds[-1][1] = None
+    return [tuple(bound) for bound in bounds]
+
+
+def merge_zone_counts(results: List[Dict]) -> Tuple[List[Dict], int]:
+    """Per-zone maximum across segment results, and the total of those maxima.
+
+    Tracking fields and line crossings add up over the segments (each
+    tracked on its own), with the average dwell recomputed over all
+    entries; counting lines are left out of the total.
+    """
+    merged = {}
+    for result in results:
+        for zone in result['zone_counts']:
+            current = merged.get(zone['zone_id'])
+            if current is None:
+                merged[zone['zone_id']] = dict(zone)
+                continue
+            if zone.get('type') == 'line':
+                for field in ('count', 'in', 'out'):
+                    current[field] += zone[field]
+                continue
+            current['count'] = max(current['count'], zone['count'])
+            if 'unique' in zone:
+                for field in ('unique', 'entries', 'exits'):
+                    current[field] += zone[field]
+                current['dwell_seconds'] = round(current['dwell_seconds'] + zone['dwell_seconds'], 2)
+                current['max_dwell_seconds'] = max(current['max_dwell_seconds'], zone['max_dwell_seconds'])
+    zone_counts = list(merged.values())
+    for zone in zone_counts:
+        if 'unique' in zone:
+            zone['avg_dwell_seconds'] = round(zone['dwell_seconds'] / zone['entries'], 2) if zone['entries'] else 0.0
+    return zone_counts, sum(zone['count'] for zone in zone_counts if zone.get('type') != 'line')
+
+
+def merge_motion_summaries(results: List[Dict]) -> Dict:
+    """Motion gate summary of the whole video from the segments' summaries"""
+    skipped = sum(result.get('motion_skipped_frames', 0) for result in results)
+    checked = sum(result.get('detected_frames', 0) for result in results if result.get('motion_gate'))
+    return {
+        'motion_gate': any(result.get('motion_gate') for result in results),
+        'motion_skipped_frames': skipped,
+        'motion_skip_rate': round(skipped / checked, 4) if checked else 0.0
+    }
+
+
+def stitch_timelines(readers: List[TimelineReader], writer: TimelineWriter, stride: int = 1,
+                     fill: str = 'hold', chunk_rows: int = 65536):
+    """Append per-segment timelines to writer in order, copying column blocks.
+
+    With interpolated fill, the rows after a segment's last detected frame
+    were held (the next detection is in the next segment); they are
+    re-interpolated towards the next segment's first row so the stitched
+    timeline matches a single pass.
+    """
+    for i, reader in enumerate(readers):
+        following = readers[i + 1] if i + 1 < len(readers) else None
+        fix = fill == 'interpolate' and stride > 1 and following is not None and following.rows \
+            and reader.rows >= stride
+        tail_start = reader.rows - stride + 1 if fix else reader.rows
+        for start in range(0, tail_start, chunk_rows):
+            end = min(tail_start, start + chunk_rows)
+            writer.append_arrays(reader.time[start:end], reader.counts(start, end))
+        if fix:
+            anchor_time = float(reader.time[reader.rows - stride])
+            anchor = reader.counts(reader.rows - stride, reader.rows - stride + 1)[0].tolist()
+            target_time = float(following.time[0])
+            target = following.counts(0, 1)[0].tolist()
+            span = target_time - anchor_time
+            times = reader.time[tail_start:].tolist()
+            counts = []
+            for frame_time in times:
+                weight = (frame_time - anchor_time) / span if span else 0
+                counts.append([round(a + (b - a) * weight, 2) for a, b in zip(anchor, target)])
+            writer.append_arrays(np.asarray(times), np.asarray(counts))
+
+
+def concat_videos(paths: List[str], output_path: str):
+    """Join MP4 segments encoded with identical settings without re-encoding"""
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_path = f.name
+    try:
+        subprocess.run(
+            [imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+             '-i', list_path, '-c', 'copy', '-movflags', '+faststart', output_path],
+            check=True, capture_output=True
+        )
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"Joining video segments failed: {e.stderr.decode(errors='replace').strip()}")
+    finally:
+        os.remove(list_path)
+
+
+class _SegmentMonitor:
+    """should_cancel for a segment worker: reports its progress and checks the shared cancel flag"""
+
+    def __init__(self, progress: Dict, progress_key: str, index: int, shared_progress, cancel_event):
+        self.progress = progress
+        self.progress_key = progress_key
+        self.index = index
+        self.shared_progress = shared_progress
+        self.cancel_event = cancel_event
+
+    def __call__(self) -> bool:
+        self.shared_progress[self.index] = self.progress.get(self.progress_key, {}).get('current', 0)
+        return self.cancel_event.is_set()
+
+
+def _run_segment(video_path: str, zones: List[Dict], output_path: str, options: Dict,
+                 index: int, start_frame: int, end_frame: int, shared_progress, cancel_event) -> Dict:
+    from backend.services.yolo_service import yolo_service
+
+    monitor = _SegmentMonitor(yolo_service.progress, f"video_{video_path}", index, shared_progress, cancel_event)
+    return yolo_service.analyze_video(
+        video_path, zones, output_path, segments=1, start_frame=start_frame, end_frame=end_frame,
+        should_cancel=monitor, **options
+    )
+
+
+def analyze_video_segmented(service, video_path: str, zones: List[Dict], output_path: str, segments: int,
+                            should_cancel: Callable[[], bool] = None, **options) -> Dict:
+    """Analyze a video as parallel time segments and stitch the results.
+
+    Each segment runs analyze_video over its frame range in a worker of an
+    AnalysisProcessPool (own model, CPU threads of this process split between
+    the workers). The annotated segments are joined with a stream copy, the
+    timelines are concatenated and per-zone maxima merged, so the result has
+    the same shape as a single-pass analyze_video. Short videos that don't
+    fill two segments fall back to a single pass in this process. On a
+    detection cache miss the segments' detections are merged and cached as
+    one whole-video entry.
+    """
+    import torch
+    from backend.services.worker_pool import AnalysisProcessPool
+    from backend.services.yolo_service import AnalysisCancelled
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception("Cannot open video file")
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    sampler = DetectionSampler(fps, options.get('detect_stride', 1), options.get('target_fps'), options.get('fill', 'hold'))
+    bounds = plan_segments(total_frames, fps, segments, sampler.stride)
+    if len(bounds) == 1:
+        return service.analyze_video(video_path, zones, output_path, should_cancel=should_cancel, segments=1, **options)
+
+    print(f"Analyzing {video_path} as {len(bounds)} segments: {bounds}")
+    scaled_zones = scale_zones(zones, width, height)
+    region = service.detection_region(scaled_zones, width, height, options.get('roi'))
+    if options.get('use_cache'):
+        options = dict(options, cache_key=service.detection_cache_key(
+            video_path, sampler.stride, region, options.get('tiled'),
+            service.motion_signature(options.get('motion'))
+        ))
+    progress_key = f"video_{video_path}"
+    service.progress[progress_key] = {'current': 0, 'total': total_frames, 'percentage': 0}
+    segment_paths = [output_path.replace('.mp4', f'_part{i}.mp4') for i in range(len(bounds))]
+    threads = max(1, torch.get_num_threads() // len(bounds))
+
+    results = []
+    manager = multiprocessing.get_context("spawn").Manager()
+    try:
+        shared_progress = manager.dict()
+        cancel_event = manager.Event()
+        with AnalysisProcessPool(workers=len(bounds), threads=threads) as pool:
+            futures = [
+                pool.executor.submit(_run_segment, video_path, zones, path, options, i, start, end,
+                                     shared_progress, cancel_event)
+                for i, (path, (start, end)) in enumerate(zip(segment_paths, bounds))
+            ]
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=settings.JOB_POLL_INTERVAL, return_when=FIRST_EXCEPTION)
+                if any(future.exception() for future in done):
+                    cancel_event.set()
+                current = min(total_frames, sum(shared_progress.values()))
+                service.progress[progress_key] = {
+                    'current': current,
+                    'total': total_frames,
+                    'percentage': int((current / max(1, total_frames)) * 100)
+                }
+                if should_cancel and should_cancel():
+                    cancel_event.set()
+            # Raises the first segment failure (or AnalysisCancelled)
+            results = [future.result() for future in futures]
+
+        if should_cancel and should_cancel():
+            raise AnalysisCancelled(f"Analysis of {video_path} cancelled")
+
+        concat_videos(segment_paths, output_path)
+        readers = [TimelineReader(result['frame_data_path']) for result in results]
+        frame_data_path = timeline_path_for(output_path)
+        timeline = TimelineWriter(frame_data_path, readers[0].labels, fps)
+        stitch_timelines(readers, timeline, sampler.stride, sampler.fill)
+        timeline.close()
+        del readers
+        parts = [result.pop('detections', None) for result in results]
+        fresh_region = service.detection_region(scaled_zones, width, height, options.get('roi') or options.get('motion'))
+        if all(part is not None for part in parts):
+            detections = DetectionRecorder.merge(parts)
+            if options.get('use_cache'):
+                detection_cache.store(options['cache_key'], detections, fresh_region)
+        else:
+            cached = detection_cache.load(options['cache_key'], scaled_zones)
+            if cached is None:
+                raise Exception("Cached detections were evicted during the analysis")
+            detections = cached.arrays
+            fresh_region = cached.region or fresh_region
+        save_detection_centers(detections_path_for(output_path), detections, fps, timeline.rows,
+                               width, height, sampler.stride, sampler.fill, fresh_region, zones)
+    finally:
+        manager.shutdown()
+        for path in segment_paths:
+            if os.path.exists(path):
+                os.remove(path)
+            remove_frame_data(timeline_path_for(path))
+            discard_checkpoint(path)
+    service._export_timeline_json(frame_data_path, output_path)
+
+    zone_counts, total_count = merge_zone_counts(results)
+    service.progress[progress_key] = {'current': total_frames, 'total': total_frames, 'percentage': 100}
+    print(f"Detection complete! Results saved to {output_path}")
+    return {
+        'total_count': total_count,
+        'zone_counts': zone_counts,
+        'output_video': output_path,
+        'frame_data_path': frame_data_path,
+        'detection_cache': results[0].get('detection_cache', 'off'),
+        **sampler.summary(),
+        'detected_frames': sum(result['detected_frames'] for result in results),
+        **merge_motion_summaries(results),
+        **({'tracking': True, 'tracks': sum(result['tracks'] for result in results)}
+           if results[0].get('tracking') else {}),
+        'segments': len(bounds)
+    }
@@ -0,0 +1,49 @@
+import glob
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+from backend.services.checkpoints import discard_checkpoint, load_checkpoint
+from backend.services.timeline import remove_frame_data, timeline_path_for
+
+STREAM_MODE = 'stream'
+
+
+def zones_key(zones: List[Dict]) -> str:
+    """Fingerprint of a zone set; a checkpoint only resumes with the same zones"""
+    payload = json.dumps([
+        [zone['id'], zone['label'], zone['coordinates'], zone.get('type', 'occupancy')] for zone in zones
+    ], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _partial_sessions(video_id: int, results_dir: str) -> List[Dict]:
+    """Checkpoints of unfinished stream sessions of a video, newest first"""
+    sessions = []
+    for path in glob.glob(os.path.join(results_dir, f"analyzed_{video_id}_*_checkpoint.json")):
+        state = load_checkpoint(path.replace('_checkpoint.json', '.mp4'))
+        if state and state.get('mode') == STREAM_MODE:
+            sessions.append(state)
+    return sorted(sessions, key=lambda state: state['output_path'], reverse=True)
+
+
+def find_partial(video_id: int, key: str, sampling: Dict, results_dir: str = None) -> Optional[Dict]:
+    """Newest unfinished stream session of a video with the same zones and sampling options"""
+    for state in _partial_sessions(video_id, results_dir or os.path.join("data", "results")):
+        if state.get('zones_key') == key and state.get('sampling') == sampling:
+            return state
+    return None
+
+
+def discard_partials(video_id: int, keep: Iterable[str] = (), results_dir: str = None) -> int:
+    """Delete unfinished stream sessions of a video, except those writing to a path in `keep`"""
+    keep = set(keep)
+    discarded = 0
+    for state in _partial_sessions(video_id, results_dir or os.path.join("data", "results")):
+        if state['output_path'] in keep:
+            continue
+        discard_checkpoint(state['output_path'])
+        remove_frame_data(timeline_path_for(state['output_path']))
+        discarded += 1
+    return discarded
@@ -0,0 +1,84 @@
+import math
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from backend.services.preprocess import Letterbox, Region
+
+
+def _tile_starts(start: int, end: int, tile: int, overlap: float) -> List[int]:
+    """Evenly spread tile origins over [start, end); the last tile ends exactly at end"""
+    if end - start <= tile:
+        return [start]
+    step = tile * (1 - overlap)
+    count = math.ceil((end - start - tile) / step) + 1
+    return [int(round(x)) for x in np.linspace(start, end - tile, count)]
+
+
+class TileLayout:
+    """Overlapping native-resolution tiles covering a frame (or a region of it).
+
+    Every tile is `tile` x `tile` native pixels (smaller only where the
+    frame or region is), with at least `overlap` of its side shared with its
+    neighbours so a person cut by one tile border is whole in another. Each
+    tile has its own Letterbox at gain 1.0, so all tiles share one model
+    input shape and can go through the model in a single batch; boxes come
+    back to native pixels through that tile's inverse transform. With
+    `overview` an extra downscaled pass over the whole frame/region is
+    added for people too large for a tile.
+    """
+
+    def __init__(self, width: int, height: int, tile: int, overlap: float, roi: Region = None,
+                 overview_size: int = None):
+        x0, y0, x1, y1 = roi or (0, 0, width, height)
+        tile_w, tile_h = min(tile, x1 - x0), min(tile, y1 - y0)
+        self.tiles: List[Region] = [
+            (x, y, x + tile_w, y + tile_h)
+            for y in _tile_starts(y0, y1, tile, overlap)
+            for x in _tile_starts(x0, x1, tile, overlap)
+        ]
+        self.letterboxes = [Letterbox(width, height, tile, roi=region, gain=1.0) for region in self.tiles]
+        self.overview = Letterbox(width, height, overview_size, roi) if overview_size else None
+
+    @property
+    def pixels(self) -> int:
+        """Model input pixels per frame, over all tiles (and the overview pass)"""
+        return sum(lb.pixels for lb in self.letterboxes) + (self.overview.pixels if self.overview else 0)
+
+
+@lru_cache(maxsize=32)
+def tile_layout(width: int, height: int, tile: int, overlap: float, roi: Optional[Region] = None,
+                overview_size: int = None) -> TileLayout:
+    """Tile layout for a resolution (and region), computed once per process"""
+    return TileLayout(width, height, tile, overlap, roi, overview_size)
+
+
+def merge_boxes(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float,
+                ios_threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Cross-tile NMS: greedy by score over the boxes of all tiles of a frame.
+
+    A box is suppressed when its IoU with a kept box exceeds iou_threshold,
+    or when the intersection covers more than ios_threshold of the smaller
+    of the two. The second test removes the truncated half of a person at a
+    tile border, whose IoU with the full box from the neighbouring tile is
+    low.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    if len(boxes) < 2:
+        return boxes, scores
+    areas = np.maximum(0, boxes[:, 2] - boxes[:, 0]) * np.maximum(0, boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while len(order):
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        w = np.maximum(0, np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]))
+        h = np.maximum(0, np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]))
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        ios = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-6)
+        order = rest[(iou <= iou_threshold) & (ios <= ios_threshold)]
+    keep = np.array(keep, dtype=np.int64)
+    return boxes[keep], scores[keep]
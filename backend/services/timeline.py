@@ -0,0 +1,273 @@
+import json
+import os
+import shutil
+import time
+from typing import Dict, Generator, List
+
+import numpy as np
+
+from backend.core.config import settings
+
+TIMELINE_VERSION = 1
+TIME_DTYPE = np.float64
+COUNT_DTYPE = np.float32
+
+
+def timeline_path_for(output_path: str) -> str:
+    """Columnar timeline directory stored next to an analysis' output video"""
+    return output_path.replace('.mp4', '_timeline')
+
+
+def is_timeline(path: str) -> bool:
+    return bool(path) and os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+def remove_frame_data(path: str):
+    """Delete a timeline directory or a legacy _frames.json file"""
+    if not path or not os.path.exists(path):
+        return
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        os.remove(path)
+
+
+def _json_count(value) -> float:
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 2)
+
+
+class TimelineWriter:
+    """Appends per-frame zone counts to a columnar on-disk timeline.
+
+    The timeline is a directory with one raw little-endian column per field:
+    time.f64 (seconds) and zone_<i>.f32 (count of the i-th zone), plus
+    meta.json with the zone labels and the committed row count. Rows are
+    buffered and appended every flush_rows rows (or flush_seconds, whichever
+    comes first), so memory stays flat no matter how long the video is;
+    readers only trust rows up to the count in meta.json, which is
+    rewritten after each flush. `extra` is stored in meta.json as well.
+
+    With resume=True an existing timeline is reopened and appended to;
+    column bytes past the committed row count (or past resume_rows, the row
+    count of a checkpoint) are cut off first.
+    """
+
+    def __init__(self, path: str, labels: List[str], fps: float = None, flush_rows: int = None, extra: Dict = None,
+                 flush_seconds: float = None, resume: bool = False, resume_rows: int = None):
+        self.path = path
+        self.labels = list(labels)
+        self.fps = fps
+        self.flush_rows = flush_rows or settings.TIMELINE_FLUSH_ROWS
+        self.flush_seconds = flush_seconds
+        self.extra = dict(extra or {})
+        self.rows = 0
+        self.complete = False
+        self._times: List[float] = []
+        self._counts: List[List[float]] = []
+        self._last_flush = time.monotonic()
+        if resume and is_timeline(path):
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            if meta['labels'] != self.labels:
+                raise ValueError("Cannot resume a timeline with different zones")
+            self.rows = meta['rows'] if resume_rows is None else min(meta['rows'], resume_rows)
+            self._truncate()
+        else:
+            remove_frame_data(path)
+            os.makedirs(path, exist_ok=True)
+        self._files = [open(os.path.join(path, 'time.f64'), 'ab')] + [
+            open(os.path.join(path, f'zone_{i}.f32'), 'ab') for i in range(len(self.labels))
+        ]
+        self._write_meta()
+
+    def _truncate(self):
+        columns = [('time.f64', 8)] + [(f'zone_{i}.f32', 4) for i in range(len(self.labels))]
+        for name, itemsize in columns:
+            column_path = os.path.join(self.path, name)
+            with open(column_path, 'ab') as f:
+                f.truncate(self.rows * itemsize)
+
+    def append(self, frame_time: float, counts: Dict[str, float]):
+        self._times.append(frame_time)
+        self._counts.append([counts[label] for label in self.labels])
+        if len(self._times) >= self.flush_rows or \
+                (self.flush_seconds and time.monotonic() - self._last_flush >= self.flush_seconds):
+            self.flush()
+
+    def extend(self, rows: List[Dict]):
+        """Append timeline rows in the {'time', 'counts'} dict form"""
+        for row in rows:
+            self.append(row['time'], row['counts'])
+
+    def append_arrays(self, times: np.ndarray, counts: np.ndarray):
+        """Append a block of rows: times (n,) and counts (n, zones)"""
+        self.flush()
+        self._write(np.asarray(times, dtype=TIME_DTYPE), np.asarray(counts, dtype=COUNT_DTYPE).reshape(len(times), -1))
+
+    def _write(self, times: np.ndarray, counts: np.ndarray):
+        if not len(times):
+            return
+        times.astype('<f8', copy=False).tofile(self._files[0])
+        for i, f in enumerate(self._files[1:]):
+            np.ascontiguousarray(counts[:, i]).astype('<f4', copy=False).tofile(f)
+        for f in self._files:
+            f.flush()
+        self.rows += len(times)
+        self._write_meta()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._times:
+            return
+        times = np.asarray(self._times, dtype=TIME_DTYPE)
+        counts = np.asarray(self._counts, dtype=COUNT_DTYPE).reshape(len(times), len(self.labels))
+        self._times, self._counts = [], []
+        self._write(times, counts)
+
+    def _write_meta(self):
+        meta = {
+            'version': TIMELINE_VERSION,
+            'labels': self.labels,
+            'rows': self.rows,
+            'fps': self.fps,
+            'complete': self.complete,
+            **self.extra
+        }
+        tmp_path = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, 'meta.json'))
+
+    def close(self, complete: bool = True):
+        self.flush()
+        self.complete = complete
+        self._write_meta()
+        for f in self._files:
+            f.close()
+
+
+class TimelineReader:
+    """Memory-mapped read side of a TimelineWriter directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.labels = self.meta['labels']
+        self.rows = self.meta['rows']
+        self.fps = self.meta.get('fps')
+        self.time = self._column('time.f64', '<f8')
+        self.zones = [self._column(f'zone_{i}.f32', '<f4') for i in range(len(self.labels))]
+
+    @classmethod
+    def from_json(cls, json_path: str) -> 'TimelineReader':
+        """In-memory reader over a legacy _frames.json timeline"""
+        with open(json_path) as f:
+            rows = json.load(f)
+        reader = cls.__new__(cls)
+        reader.path = json_path
+        reader.labels = list(rows[0]['counts']) if rows else []
+        reader.rows = len(rows)
+        reader.meta = {'labels': reader.labels, 'rows': reader.rows, 'complete': True}
+        reader.fps = None
+        reader.time = np.array([row['time'] for row in rows], dtype=TIME_DTYPE)
+        reader.zones = [np.array([row['counts'].get(label, 0) for row in rows], dtype=COUNT_DTYPE) for label in reader.labels]
+        return reader
+
+    def _column(self, name: str, dtype: str) -> np.ndarray:
+        if not self.rows:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def counts(self, start: int = 0, end: int = None) -> np.ndarray:
+        """(rows x zones) count matrix for a row range"""
+        end = self.rows if end is None else end
+        if not self.labels:
+            return np.zeros((max(0, end - start), 0), dtype=COUNT_DTYPE)
+        return np.stack([zone[start:end] for zone in self.zones], axis=1)
+
+    def row_range(self, start_time: float = None, end_time: float = None):
+        """[first, last) rows with start_time <= time <= end_time, by binary search on the sorted time column"""
+        first = 0 if start_time is None else int(np.searchsorted(self.time, start_time, side='left'))
+        last = self.rows if end_time is None else int(np.searchsorted(self.time, end_time, side='right'))
+        return first, max(first, last)
+
+    def query(self, start_time: float = None, end_time: float = None, labels: List[str] = None,
+              points: int = 500) -> Dict:
+        """Downsampled series for a time window: min/max/mean per bucket and zone.
+
+        The window is located with row_range, so only its rows are read from
+        the memory-mapped columns. It is split into at most `points`
+        equal-row buckets (frames are evenly spaced, so these are equal-time
+        buckets); each bucket reports its first time and the min, max and
+        mean count of every selected zone. Payload size depends on `points`
+        only, not on the length of the video or the window.
+        """
+        labels = self.labels if labels is None else [label for label in labels if label in self.labels]
+        first, last = self.row_range(start_time, end_time)
+        rows = last - first
+        points = max(1, min(points, rows)) if rows else 0
+        starts = np.unique(np.linspace(first, last, points, endpoint=False).astype(np.int64)) if points else np.zeros(0, dtype=np.int64)
+        sizes = np.diff(np.append(starts, last))
+        series = {}
+        for label in labels:
+            column = self.zones[self.labels.index(label)]
+            window = np.asarray(column[first:last], dtype=np.float64)
+            offsets = starts - first
+            if len(offsets):
+                mins = np.minimum.reduceat(window, offsets)
+                maxs = np.maximum.reduceat(window, offsets)
+                means = np.add.reduceat(window, offsets) / sizes
+            else:
+                mins = maxs = means = np.zeros(0)
+            series[label] = {
+                'min': np.round(mins, 2).tolist(),
+                'max': np.round(maxs, 2).tolist(),
+                'mean': np.round(means, 2).tolist(),
+            }
+        return {
+            'start': float(self.time[first]) if rows else start_time,
+            'end': float(self.time[last - 1]) if rows else end_time,
+            'rows': rows,
+            'points': len(starts),
+            'rows_per_point': round(rows / len(starts), 2) if len(starts) else 0,
+            'time': np.asarray(self.time[starts], dtype=np.float64).tolist() if len(starts) else [],
+            'zones': series,
+        }
+
+    def iter_rows(self, chunk_rows: int = 4096) -> Generator[Dict, None, None]:
+        """Rows in the legacy {'time', 'counts'} dict form"""
+        for start in range(0, self.rows, chunk_rows):
+            end = min(self.rows, start + chunk_rows)
+            times = self.time[start:end].tolist()
+            counts = self.counts(start, end).tolist()
+            for frame_time, row in zip(times, counts):
+                yield {'time': frame_time, 'counts': {label: _json_count(v) for label, v in zip(self.labels, row)}}
+
+    def iter_json(self, chunk_rows: int = 4096) -> Generator[bytes, None, None]:
+        """The timeline as a JSON array, produced chunk by chunk"""
+        yield b'['
+        first = True
+        batch = []
+        for row in self.iter_rows(chunk_rows):
+            batch.append(json.dumps(row))
+            if len(batch) >= chunk_rows:
+                yield ((b'' if first else b', ') + ', '.join(batch).encode())
+                first = False
+                batch = []
+        if batch:
+            yield ((b'' if first else b', ') + ', '.join(batch).encode())
+        yield b']'
+
+    def export_json(self, json_path: str) -> str:
+        """Write the legacy _frames.json compatibility export"""
+        with open(json_path, 'wb') as f:
+            for chunk in self.iter_json():
+                f.write(chunk)
+        return json_path
+
+
+def open_timeline(path: str) -> TimelineReader:
+    """Reader over a columnar timeline or a legacy _frames.json"""
+    return TimelineReader(path) if is_timeline(path) else TimelineReader.from_json(path)
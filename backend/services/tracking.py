@@ -0,0 +1,258 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend.services.zone_geometry import LineCounter, ZoneIndex, box_centers
+
+# Constant-velocity model over (cx, cy, w, h, vx, vy); time is counted in frames
+_STATE = 6
+_MEASURE = np.hstack([np.eye(4), np.zeros((4, 2))])
+
+
+def _transition(dt: float) -> np.ndarray:
+    f = np.eye(_STATE)
+    f[0, 4] = f[1, 5] = dt
+    return f
+
+
+def _to_state(box: np.ndarray) -> np.ndarray:
+    x1, y1, x2, y2 = box
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1, 0.0, 0.0])
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(len(a) x len(b)) IoU of xyxy boxes"""
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)))
+    w = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    h = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = w * h
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+class Track:
+    """One tracked person: a Kalman filter over its box center, size and velocity"""
+
+    def __init__(self, track_id: int, box: np.ndarray, frame: int):
+        self.id = track_id
+        self.x = _to_state(box)
+        # Unknown velocity starts with a wide variance
+        self.p = np.diag([10.0, 10.0, 10.0, 10.0, 1000.0, 1000.0])
+        self.hits = 1
+        self.first_frame = frame
+        self.last_frame = frame
+        self.frame = frame
+
+    def predict(self, frame: int) -> np.ndarray:
+        """Move the state to `frame` and return the predicted xyxy box"""
+        dt = frame - self.frame
+        if dt > 0:
+            f = _transition(dt)
+            self.x = f @ self.x
+            q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01]) * dt
+            self.p = f @ self.p @ f.T + q
+            self.frame = frame
+        return self.box()
+
+    def update(self, box: np.ndarray, frame: int):
+        z = _to_state(box)[:4]
+        r = np.diag([1.0, 1.0, 10.0, 10.0])
+        s = _MEASURE @ self.p @ _MEASURE.T + r
+        k = self.p @ _MEASURE.T @ np.linalg.inv(s)
+        self.x = self.x + k @ (z - _MEASURE @ self.x)
+        self.p = (np.eye(_STATE) - k @ _MEASURE) @ self.p
+        self.hits += 1
+        self.last_frame = frame
+
+    def box(self) -> np.ndarray:
+        cx, cy, w, h = self.x[:4]
+        w, h = max(w, 1.0), max(h, 1.0)
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], dtype=np.float32)
+
+    def state(self) -> List:
+        return [self.id, self.x.tolist(), self.p.ravel().tolist(), self.hits,
+                self.first_frame, self.last_frame, self.frame]
+
+    @classmethod
+    def restore(cls, state: List) -> 'Track':
+        track = cls.__new__(cls)
+        track.id, x, p, track.hits, track.first_frame, track.last_frame, track.frame = state
+        track.x = np.asarray(x, dtype=np.float64)
+        track.p = np.asarray(p, dtype=np.float64).reshape(_STATE, _STATE)
+        return track
+
+
+class ZoneTracker:
+    """Persistent person IDs across frames, and the zone visits they make.
+
+    Detection frames feed `update`: tracks are predicted to the frame and
+    matched greedily to the detections by IoU (no appearance model);
+    unmatched detections start new tracks and tracks unseen for longer
+    than `max_age` frames are dropped. A track is confirmed after
+    `min_hits` detections, so one-off false positives are never counted.
+    Frames that skip the detector can call `predict` instead, which
+    returns the predicted boxes of the confirmed tracks seen recently, so
+    counts follow people between detections.
+
+    Each time a confirmed track is placed in a zone (first matching zone,
+    like the per-frame counts) a visit starts; moving to another zone (or
+    none), or the track being dropped, ends it as an exit. Per zone this
+    gives unique visitors, entries, exits and dwell times; visits still
+    open at the end of the video count as entries but not exits. Unique
+    visitors are counted incrementally from the zones each live track has
+    been in (track ids are never reused), so memory is bounded by the
+    live tracks even on a camera that runs indefinitely.
+
+    Counting `lines` get the centers of the same tracks every frame they
+    are placed, for directional crossing counts (see LineCounter).
+    """
+
+    def __init__(self, zones: List[Dict], fps: float, iou_threshold: float = 0.3, max_age: int = 30,
+                 min_hits: int = 3, predict_age: int = None, lines: List[Dict] = ()):
+        self.zone_ids = [zone['id'] for zone in zones]
+        self.zone_index = ZoneIndex(zones)
+        self.lines = LineCounter(list(lines))
+        self.line_labels = {line['id']: line['label'] for line in lines}
+        self.fps = fps or 1
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.predict_age = max_age if predict_age is None else predict_age
+        self.tracks: List[Track] = []
+        self.next_id = 1
+        self.confirmed = 0
+        # Open visit per track: [zone_id, first frame inside, last frame inside]
+        self.visits: Dict[int, List] = {}
+        # Zones each live track has visited, dropped with the track
+        self.visited: Dict[int, set] = {}
+        self.zones = {zone_id: {'unique': 0, 'entries': 0, 'exits': 0, 'dwell': 0.0, 'max_dwell': 0.0}
+                      for zone_id in self.zone_ids}
+
+    def update(self, frame: int, boxes: np.ndarray) -> Tuple[List[int], np.ndarray]:
+        """Associate a detection frame's boxes; returns the ids and boxes of the confirmed tracks it matched"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        predicted = np.array([track.predict(frame) for track in self.tracks], dtype=np.float32).reshape(-1, 4)
+        iou = iou_matrix(predicted, boxes)
+        matched_tracks, matched_boxes = set(), set()
+        for t, b in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+            if iou[t, b] < self.iou_threshold:
+                break
+            if t in matched_tracks or b in matched_boxes:
+                continue
+            self.tracks[t].update(boxes[b], frame)
+            matched_tracks.add(t)
+            matched_boxes.add(b)
+        for b in range(len(boxes)):
+            if b not in matched_boxes:
+                self.tracks.append(Track(self.next_id, boxes[b], frame))
+                self.next_id += 1
+        for track in self.tracks:
+            if track.hits == self.min_hits and track.last_frame == frame:
+                self.confirmed += 1
+        kept = []
+        for track in self.tracks:
+            if frame - track.last_frame > self.max_age:
+                self._end_visit(track.id, exited=True)
+                self.visited.pop(track.id, None)
+                self.lines.forget([track.id])
+            else:
+                kept.append(track)
+        self.tracks = kept
+        seen = [track for track in self.tracks if track.last_frame == frame and track.hits >= self.min_hits]
+        ids = [track.id for track in seen]
+        seen_boxes = np.array([track.box() for track in seen], dtype=np.float32).reshape(-1, 4)
+        self._place(frame, ids, seen_boxes)
+        return ids, seen_boxes
+
+    def predict(self, frame: int) -> Tuple[List[int], np.ndarray]:
+        """Predicted ids and boxes of the confirmed tracks at a frame without detections"""
+        live = [track for track in self.tracks
+                if track.hits >= self.min_hits and frame - track.last_frame <= self.predict_age]
+        ids = [track.id for track in live]
+        boxes = np.array([track.predict(frame) for track in live], dtype=np.float32).reshape(-1, 4)
+        self._place(frame, ids, boxes)
+        return ids, boxes
+
+    def _place(self, frame: int, ids: List[int], boxes: np.ndarray):
+        centers = box_centers(boxes)
+        self.lines.update(ids, centers)
+        for track_id, zone_idx in zip(ids, self.zone_index.assign(centers)):
+            zone_id = self.zone_ids[zone_idx] if zone_idx >= 0 else None
+            visit = self.visits.get(track_id)
+            if visit and visit[0] == zone_id:
+                visit[2] = frame
+                continue
+            if visit:
+                self._end_visit(track_id, exited=True)
+            if zone_id is not None:
+                zone = self.zones[zone_id]
+                visited = self.visited.setdefault(track_id, set())
+                if zone_id not in visited:
+                    visited.add(zone_id)
+                    zone['unique'] += 1
+                zone['entries'] += 1
+                self.visits[track_id] = [zone_id, frame, frame]
+
+    def _end_visit(self, track_id: int, exited: bool):
+        visit = self.visits.pop(track_id, None)
+        if visit is None:
+            return
+        zone_id, first, last = visit
+        zone = self.zones[zone_id]
+        dwell = (last - first + 1) / self.fps
+        zone['dwell'] += dwell
+        zone['max_dwell'] = max(zone['max_dwell'], dwell)
+        if exited:
+            zone['exits'] += 1
+
+    def finish(self):
+        """Close the visits still open at the end of the video (their dwell counts, not as exits)"""
+        for track_id in list(self.visits):
+            self._end_visit(track_id, exited=False)
+
+    def zone_summary(self, zone_id: int) -> Dict:
+        zone = self.zones[zone_id]
+        return {
+            'unique': zone['unique'],
+            'entries': zone['entries'],
+            'exits': zone['exits'],
+            'dwell_seconds': round(zone['dwell'], 2),
+            'avg_dwell_seconds': round(zone['dwell'] / zone['entries'], 2) if zone['entries'] else 0.0,
+            'max_dwell_seconds': round(zone['max_dwell'], 2)
+        }
+
+    def crossings(self) -> Dict[str, Dict[str, int]]:
+        """Crossing counts so far per line label, as sent to live viewers"""
+        return {self.line_labels[line_id]: dict(counts) for line_id, counts in self.lines.crossings.items()}
+
+    def line_summary(self, line_id: int) -> Dict:
+        counts = self.lines.crossings[line_id]
+        return {'type': 'line', 'count': counts['in'] + counts['out'], 'in': counts['in'], 'out': counts['out']}
+
+    def state(self) -> Dict:
+        """JSON-serializable tracker state, to continue tracking after a restart"""
+        return {
+            'tracks': [track.state() for track in self.tracks],
+            'next_id': self.next_id,
+            'confirmed': self.confirmed,
+            'visits': {str(track_id): visit for track_id, visit in self.visits.items()},
+            'visited': {str(track_id): sorted(zones) for track_id, zones in self.visited.items()},
+            'zones': {str(zone_id): dict(zone) for zone_id, zone in self.zones.items()},
+            'lines': self.lines.state()
+        }
+
+    def restore(self, state: Dict):
+        self.tracks = [Track.restore(track) for track in state.get('tracks', [])]
+        self.next_id = state.get('next_id', 1)
+        self.confirmed = state.get('confirmed', 0)
+        self.visits = {int(track_id): visit for track_id, visit in state.get('visits', {}).items()}
+        self.visited = {int(track_id): set(zones) for track_id, zones in state.get('visited', {}).items()}
+        for zone_id, zone in state.get('zones', {}).items():
+            if int(zone_id) in self.zones:
+                self.zones[int(zone_id)] = dict(zone)
+        self.lines.restore(state.get('lines', {}))
+
+    def summary(self) -> Dict:
+        return {'tracking': True, 'tracks': self.confirmed}
@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from typing import Dict, List
+
+from backend.core.config import settings
+
+
+def threads_per_worker(workers: int) -> int:
+    """Intra-op thread budget per worker process so N workers never oversubscribe the box"""
+    return settings.ANALYSIS_WORKER_THREADS or max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def limit_openmp_threads(num_threads: int):
+    """Cap OpenMP runtimes of this process; only effective before torch or cv2 is first imported"""
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+
+
+def configure_worker_threads(num_threads: int):
+    """Pin the intra-op thread budget of the current process"""
+    import cv2
+    import torch
+
+    torch.set_num_threads(num_threads)
+    cv2.setNumThreads(num_threads)
+
+
+def init_worker(num_threads: int):
+    """Process initializer: pin threads and load this process' own model once"""
+    limit_openmp_threads(num_threads)
+    from backend.services.yolo_service import yolo_service
+
+    configure_worker_threads(num_threads)
+    yolo_service._load_model()
+
+
+def job_worker_main(worker_name: str, num_threads: int, poll_interval: float, stop_event):
+    """Entry point of a spawned job-queue worker process.
+
+    Lives here rather than in job_queue, whose imports pull in cv2, so the
+    OpenMP cap is set before any heavy import of the new process.
+    """
+    limit_openmp_threads(num_threads)
+    from backend.services.job_queue import worker_main
+
+    worker_main(worker_name, num_threads, poll_interval, stop_event)
+
+
+def _worker_info() -> Dict:
+    import torch
+
+    return {'pid': os.getpid(), 'threads': torch.get_num_threads()}
+
+
+def _run_analysis(video_path: str, zones: List[Dict], output_path: str, options: Dict) -> Dict:
+    from backend.services.yolo_service import yolo_service
+
+    start = time.perf_counter()
+    result = yolo_service.analyze_video(video_path, zones, output_path, **options)
+    result['worker_pid'] = os.getpid()
+    result['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+class AnalysisProcessPool:
+    """Process pool where every worker holds its own YOLO model.
+
+    Workers are spawned (not forked) so each gets a clean torch runtime,
+    pin their torch/OpenCV thread count in the initializer and load the
+    model once. Submitted analyses go to whichever worker is free, so
+    several videos analyzed at once run in parallel instead of contending
+    for one interpreter and one set of torch threads.
+    """
+
+    def __init__(self, workers: int = None, threads: int = None):
+        self.workers = max(1, workers or settings.ANALYSIS_WORKERS)
+        self.threads = threads or threads_per_worker(self.workers)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(self.threads,)
+        )
+
+    def warmup(self) -> List[Dict]:
+        """Start every worker (loading its model) before timing-sensitive work"""
+        futures = [self.executor.submit(_worker_info) for _ in range(self.workers * 2)]
+        wait(futures)
+        workers = {}
+        for future in futures:
+            info = future.result()
+            workers[info['pid']] = info
+        return list(workers.values())
+
+    def submit(self, video_path: str, zones: List[Dict], output_path: str, **options) -> Future:
+        """Queue an analyze_video call; the future resolves to its result dict"""
+        return self.executor.submit(_run_analysis, video_path, zones, output_path, options)
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -1,10 +1,25 @@
+import time
 import cv2
 import numpy as np
-from typing import List, Dict, Generator
+from typing import List, Dict, Generator, Callable, Optional, Tuple, Union
 import torch
 import imageio_ffmpeg
-import base64
-import json
+from backend.core.config import settings
+from backend.services.broadcast import LiveEvent
+from backend.services.camera import LatestFrameReader, RollingCounts
+from backend.services.checkpoints import AnalysisCheckpoint, discard_checkpoint, load_checkpoint
+from backend.services.detection_cache import DetectionRecorder, detection_cache
+from backend.services.motion import MotionGate
+from backend.services.pipeline import FramePipeline
+from backend.services.preprocess import Letterbox, Region, display_size, images_to_tensor, zone_roi
+from backend.services.recount import detections_path_for, save_detection_centers, scale_zones
+from backend.services.sampling import DetectionSampler
+from backend.services.scheduler import InferenceScheduler
+from backend.services.stream_sessions import STREAM_MODE, zones_key
+from backend.services.tiling import TileLayout, merge_boxes, tile_layout
+from backend.services.tracking import ZoneTracker
+from backend.services.timeline import TimelineReader, TimelineWriter, timeline_path_for
+from backend.services.zone_geometry import ZoneIndex, box_centers, split_zones
 
 # Monkey patch torch.load to use weights_only=False for YOLO
 _original_torch_load = torch.load
@@ -13,145 +28,208 @@ def _patched_torch_load(*args, **kwargs):
     return _original_torch_load(*args, **kwargs)
 torch.load = _patched_torch_load
 
+class AnalysisCancelled(Exception):
+    """Raised inside an analysis loop when its job has been cancelled"""
+
 class YOLOService:
     def __init__(self):
         self.model = None
+        self.model_name = 'yolov8n.pt'
+        self.input_size = 640
         self.progress = {}
         self.live_counts = {}
+        self.pipelines = {}
+        self.scheduler = None
     
     def _load_model(self):
         """Lazy load YOLO model"""
         if self.model is None:
             from ultralytics import YOLO
-            self.model = YOLO('yolov8n.pt')
+            self.model = YOLO(self.model_name)
     
-    def analyze_video_stream(self, video_path: str, zones: List[Dict], output_path: str = None) -> Generator[bytes, None, None]:
-        """Ultra-fast real-time streaming - process every frame"""
+    def live_events(self, video_path: str, zones: List[Dict], output_path: str = None,
+                    detect_stride: int = 1, target_fps: float = None, fill: str = 'hold',
+                    session: Dict = None, resume: Dict = None, on_complete: Callable[[Dict], Dict] = None,
+                    jpeg_quality: int = None) -> Generator[LiveEvent, None, None]:
+        """Real-time analysis - annotate every frame, detect on every detect_stride-th frame.
+
+        Yields one LiveEvent per frame (JPEG plus counts and progress) and a
+        final summary event; analyze_video_stream and analyze_video_mjpeg
+        serialize them for a single client, the broadcast hub for many.
+
+        With an output_path, counts are appended to the on-disk timeline as
+        the stream runs and the video is checkpointed like analyze_video. When
+        the client disconnects a final checkpoint is committed, so the state
+        needed to continue (frames done, carried detections, zone maxima,
+        fill state, video parts) is on disk along with the `session` identity
+        fields, whether the stream was dropped or the process died; passing
+        that checkpoint back as `resume` continues from the next frame. On
+        completion the parts are joined and on_complete gets the summary (its
+        return value is merged into the final event).
+        """
         self._load_model()
         
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
-            yield b"data: {\"error\": \"Cannot open video file\"}\n\n"
+            yield LiveEvent({'error': 'Cannot open video file'})
             return
         
         fps = int(cap.get(cv2.CAP_PROP_FPS))
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        sampler = DetectionSampler(fps, detect_stride, target_fps, fill)
+        resume = resume if output_path else None
+        start_frame = 0
+        if resume:
+            start_frame = resume['frames']
+            sampler.restore(resume['sampler'])
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        
+        # Count at native resolution like analyze_video; draw on an aspect-correct preview
+        # Counting lines are counted from tracks, not occupancy, so they stay out of the zone index
+        all_zones = scale_zones(zones, width, height)
+        scaled_zones, scaled_lines = split_zones(all_zones)
+        zone_index = ZoneIndex(scaled_zones)
+        letterbox = Letterbox(width, height, self.input_size, self.detection_region(all_zones, width, height, settings.ANALYSIS_ROI))
+        preview_width, preview_height = display_size(width, height, settings.LIVE_DISPLAY_WIDTH)
+        preview_zones = scale_zones(zones, preview_width, preview_height)
+        preview_scale = np.array([preview_width / width, preview_height / height] * 2, dtype=np.float32)
+        gate = self.motion_gate(all_zones, width, height, fps, settings.ANALYSIS_MOTION_GATE)
+        tracker = None
+        if settings.ANALYSIS_TRACKING or sampler.fill == 'track' or scaled_lines:
+            tracker = self.zone_tracker(scaled_zones, fps, scaled_lines, sampler.stride)
+        if resume:
+            gate.restore(resume.get('motion_gate', {}))
+            if tracker and resume.get('tracker'):
+                tracker.restore(resume['tracker'])
+        
+        # Detections carried over to frames that skip the model
+        boxes = np.asarray(resume['boxes'] if resume else [], dtype=np.float32).reshape(-1, 4)
+        drawn = boxes
+        assigned = zone_index.assign(box_centers(boxes))
+        frame_zone_counts = zone_index.count(assigned)
+        
+        # Setup video writer (background), written in checkpointed parts
+        checkpoint = AnalysisCheckpoint(output_path, fps, resume) if output_path else None
+        identity = dict(session or {}, mode=STREAM_MODE)
         
-        # Resize for faster processing
-        process_width = 640
-        process_height = 480
-        
-        # Scale zones to processing resolution
-        scaled_zones = []
-        for zone in zones:
-            scaled_coords = []
-            for x, y in zone['coordinates']:
-                scaled_x = int((x / 640) * process_width)
-                scaled_y = int((y / 360) * process_height)
-                scaled_coords.append([scaled_x, scaled_y])
-            scaled_zones.append({
-                'id': zone['id'],
-                'label': zone['label'],
-                'coordinates': scaled_coords
-            })
+        zone_max_counts = {zone['id']: 0 for zone in scaled_zones}
+        if resume:
+            for zone in scaled_zones:
+                zone_max_counts[zone['id']] = resume['zone_max'].get(str(zone['id']), 0)
+        frame_count = start_frame
         
-        # Setup video writer (background)
-        writer = None
+        # Per-frame counts go straight to the on-disk timeline, flushed in batches and periodically
+        frame_data_path = None
+        timeline = None
         if output_path:
-            import imageio
-            writer = imageio.get_writer(output_path, fps=fps, codec='libx264', pixelformat='yuv420p')
-        
-        zone_max_counts = {zone['id']: 0 for zone in scaled_zones}
-        frame_count = 0
-        frame_data = []
+            frame_data_path = timeline_path_for(output_path)
+            timeline = TimelineWriter(
+                frame_data_path, [zone['label'] for zone in scaled_zones], fps,
+                flush_seconds=settings.STREAM_FLUSH_SECONDS,
+                resume=bool(resume), resume_rows=resume['rows'] if resume else None
+            )
         
         # JPEG encoding params for speed
-        encode_params = [cv2.IMWRITE_JPEG_QUALITY, 60]
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
+        encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality or settings.LIVE_JPEG_QUALITY]
+        
+        def checkpoint_state():
+            return dict(
+                identity,
+                frames=frame_count,
+                rows=timeline.rows,
+                boxes=boxes.tolist(),
+                zone_max={str(zone_id): count for zone_id, count in zone_max_counts.items()},
+                sampler=sampler.state(),
+                motion_gate=gate.state(),
+                tracker=tracker.state() if tracker else None
+            )
+        
+        # Decode and x264 encode run on their own threads around inference
+        pipeline = self._start_pipeline(f"stream_{video_path}", cap, encode=checkpoint.encode if checkpoint else None)
+        completed = False
+        
+        try:
+            for frames in pipeline.batches():
+                for frame in frames:
+                    keyframe = sampler.is_keyframe(frame_count)
+                    frame_count += 1
             
-            frame_count += 1
+                    # Run YOLO detection on detection frames that changed and count people in zones
+                    if keyframe:
+                        if gate.should_detect(frame, frame_count - 1):
+                            boxes, _ = self._detect_batch([frame], letterbox)[0]
+                        if tracker:
+                            tracker.update(frame_count - 1, boxes)
+                        drawn = boxes
+                    elif sampler.fill == 'track':
+                        # Follow people between detections with the tracks' predicted boxes
+                        _, drawn = tracker.predict(frame_count - 1)
+                    if keyframe or sampler.fill == 'track':
+                        assigned = zone_index.assign(box_centers(drawn))
+                        frame_zone_counts = zone_index.count(assigned)
             
-            # Resize for faster processing
-            frame_resized = cv2.resize(frame, (process_width, process_height))
+                    # Preview for the viewers
+                    frame_resized = self._draw_preview(frame, (preview_width, preview_height), preview_zones,
+                                                       drawn * preview_scale, assigned)
             
-            # Run YOLO detection (fast)
-            results = self.model(frame_resized, classes=[0], verbose=False)
+                    # Update max counts
+                    for zone_id, count in frame_zone_counts.items():
+                        if count > zone_max_counts[zone_id]:
+                            zone_max_counts[zone_id] = count
             
-            # Draw zones
-            for zone in scaled_zones:
-                pts = np.array(zone['coordinates'], np.int32).reshape((-1, 1, 2))
-                cv2.polylines(frame_resized, [pts], True, (0, 255, 0), 2)
-                cv2.putText(frame_resized, zone['label'], tuple(zone['coordinates'][0]), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                    # Save original frame to video (encoder thread)
+                    if checkpoint:
+                        pipeline.submit(frame)
             
-            # Count people in zones
-            frame_zone_counts = {zone['id']: 0 for zone in scaled_zones}
+                    # Store frame data (skipped frames held or interpolated)
+                    if timeline:
+                        frame_time = frame_count / fps
+                        timeline.extend(sampler.timeline_rows(
+                            round(frame_time, 2),
+                            {zone['label']: frame_zone_counts[zone['id']] for zone in scaled_zones},
+                            keyframe
+                        ))
+                        if checkpoint.due():
+                            timeline.flush()
+                            pipeline.submit(checkpoint.marker(checkpoint_state()))
             
-            for result in results:
-                for box in result.boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    center_x = int((x1 + x2) / 2)
-                    center_y = int((y1 + y2) / 2)
-                    
-                    cv2.rectangle(frame_resized, (int(x1), int(y1)), (int(x2), int(y2)), (255, 0, 0), 2)
-                    cv2.putText(frame_resized, 'Person', (int(x1), int(y1) - 10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 0, 0), 1)
-                    
-                    for zone in scaled_zones:
-                        if self.point_in_polygon((center_x, center_y), zone['coordinates']):
-                            frame_zone_counts[zone['id']] += 1
-                            cv2.circle(frame_resized, (center_x, center_y), 4, (0, 0, 255), -1)
-                            break
-            
-            # Update max counts
-            for zone_id, count in frame_zone_counts.items():
-                if count > zone_max_counts[zone_id]:
-                    zone_max_counts[zone_id] = count
-            
-            # Save original frame to video (background task)
-            if writer:
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                writer.append_data(rgb_frame)
-            
-            # Store frame data
-            frame_time = frame_count / fps
-            frame_data.append({
-                'time': round(frame_time, 2),
-                'counts': {zone['label']: frame_zone_counts[zone['id']] for zone in scaled_zones}
-            })
-            
-            # Encode and send EVERY frame for real-time streaming
-            _, buffer = cv2.imencode('.jpg', frame_resized, encode_params)
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            counts_data = {zone['label']: frame_zone_counts[zone['id']] for zone in scaled_zones}
+                    # Encode and send EVERY frame for real-time streaming
+                    _, buffer = cv2.imencode('.jpg', frame_resized, encode_params)
+                    counts_data = {zone['label']: frame_zone_counts[zone['id']] for zone in scaled_zones}
+                    data = {
+                        'counts': counts_data,
+                        'progress': int((frame_count / total_frames) * 100),
+                        'frame_number': frame_count,
+                        'total_frames': total_frames
+                    }
+                    if scaled_lines:
+                        data['crossings'] = tracker.crossings()
             
-            data = json.dumps({
-                'frame': frame_base64,
-                'counts': counts_data,
-                'progress': int((frame_count / total_frames) * 100),
-                'frame_number': frame_count,
-                'total_frames': total_frames
-            })
-            yield f"data: {data}\n\n".encode('utf-8')
-        
-        cap.release()
-        if writer:
-            writer.close()
-        
-        # Save frame data
-        frame_data_path = None
-        if output_path:
-            frame_data_path = output_path.replace('.mp4', '_frames.json')
-            with open(frame_data_path, 'w') as f:
-                json.dump(frame_data, f)
+                    yield LiveEvent(data, buffer.tobytes(), frame_resized)
+            completed = True
+        finally:
+            # Runs on client disconnect too, so the capture and writer are always released
+            pipeline.close(wait=completed)
+            cap.release()
+            if timeline and (not completed or pipeline.error):
+                # Everything needed to continue after the last fully processed frame
+                timeline.close(complete=False)
+                checkpoint.suspend(checkpoint_state())
+        if pipeline.error:
+            raise pipeline.error
+        
+        # Save frame data and join the video parts of all sessions
+        if timeline:
+            timeline.extend(sampler.flush())
+            timeline.close()
+            checkpoint.finish()
+            self._export_timeline_json(frame_data_path, output_path)
         
         # Send final summary
+        if tracker:
+            tracker.finish()
         zone_results = []
         total_count = 0
         for zone in scaled_zones:
@@ -159,20 +237,184 @@ class YOLOService:
             zone_results.append({
                 'zone_id': zone['id'],
                 'zone_label': zone['label'],
-                'count': count
+                'count': count,
+                **(tracker.zone_summary(zone['id']) if tracker else {})
             })
             total_count += count
+        for line in scaled_lines:
+            zone_results.append({'zone_id': line['id'], 'zone_label': line['label'], **tracker.line_summary(line['id'])})
         
-        yield f"data: {json.dumps({
+        summary = {
             'complete': True,
             'total_count': total_count,
             'zone_counts': zone_results,
             'output_video_path': output_path,
-            'frame_data_path': frame_data_path
-        })}\n\n"
+            'frame_data_path': frame_data_path,
+            'resumed_from_frame': start_frame,
+            **sampler.summary(),
+            **gate.summary(),
+            **(tracker.summary() if tracker else {})
+        }
+        if on_complete:
+            summary.update(on_complete(summary) or {})
+        yield LiveEvent(summary)
+    
+    def camera_events(self, source: str, zones: List[Dict], camera_key: str = None, jpeg_quality: int = None,
+                      fps_budget: float = None, priority: int = 1) -> Generator[LiveEvent, None, None]:
+        """Continuous analysis of a live camera feed (RTSP/HTTP URL or device index).
+
+        A LatestFrameReader keeps only the newest frame, so every step
+        analyzes the most recent one and the analysis never falls behind
+        real time; frames it had no time for are dropped at the reader. Each
+        analyzed frame is detected (unless the motion gate finds it static)
+        and tracked, with the source's frame number as the tracker's clock.
+        Events carry the current counts, the rolling average and maximum
+        over CAMERA_WINDOW_SECONDS, crossings of counting lines and the
+        glass-to-count latency: from the frame's arrival at the reader to
+        its counts being ready. While the source is stalled or reconnecting
+        a {'type': 'status'} event without a frame is sent every
+        CAMERA_STALL_SECONDS. The latest counts, latency percentiles and
+        reader stats are kept in live_counts[camera_key] for polling. Runs
+        until the generator is closed.
+
+        With CAMERA_SCHEDULER the camera doesn't call the model itself: it
+        takes at most `fps_budget` frames/s (CAMERA_FPS_BUDGET by default)
+        and its detections come from the shared camera scheduler, batched
+        with the other cameras' frames and shared fairly by `priority`.
+        """
+        self._load_model()
+        camera_key = camera_key or f"camera_{source}"
+        reader = LatestFrameReader(source, settings.CAMERA_RECONNECT_SECONDS, settings.CAMERA_MAX_RECONNECT_SECONDS,
+                                   settings.CAMERA_STALL_SECONDS).start()
+        scheduler = self.camera_scheduler() if settings.CAMERA_SCHEDULER else None
+        handle = scheduler.register(camera_key, fps_budget or settings.CAMERA_FPS_BUDGET, priority) if scheduler else None
+        try:
+            frame, seq, arrived = reader.latest(timeout=2 * settings.CAMERA_STALL_SECONDS)
+            if frame is None:
+                yield LiveEvent({'error': reader.last_error or f"No frames from {source}"})
+                return
+            
+            height, width = frame.shape[:2]
+            fps = reader.fps or 25.0
+            all_zones = scale_zones(zones, width, height)
+            scaled_zones, scaled_lines = split_zones(all_zones)
+            zone_index = ZoneIndex(scaled_zones)
+            letterbox = Letterbox(width, height, self.input_size, self.detection_region(all_zones, width, height, settings.ANALYSIS_ROI))
+            preview_size = display_size(width, height, settings.LIVE_DISPLAY_WIDTH)
+            preview_zones = scale_zones(zones, *preview_size)
+            preview_scale = np.array([preview_size[0] / width, preview_size[1] / height] * 2, dtype=np.float32)
+            gate = self.motion_gate(all_zones, width, height, fps, settings.ANALYSIS_MOTION_GATE)
+            # Source frame numbers are the tracker's clock, so a budgeted camera detects every fps / budget frames
+            stride = max(1, int(np.ceil(fps / handle.fps))) if handle and handle.fps else 1
+            tracker = self.zone_tracker(scaled_zones, fps, scaled_lines, stride)
+            rolling = RollingCounts([zone['label'] for zone in scaled_zones], settings.CAMERA_WINDOW_SECONDS)
+            encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality or settings.LIVE_JPEG_QUALITY]
+            boxes = np.zeros((0, 4), dtype=np.float32)
+            summary = rolling.summary()
+            summarized_at = 0.0
+            analyzed = 0
+            
+            while True:
+                if frame is None:
+                    yield LiveEvent({'type': 'status', 'status': 'reconnecting', **reader.stats()})
+                    frame, seq, arrived = reader.latest(seq, settings.CAMERA_STALL_SECONDS)
+                    continue
+                if frame.shape[:2] != (height, width):
+                    # A reconnect may come back at another resolution; keep the zones' geometry
+                    frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+                
+                if gate.should_detect(frame, seq):
+                    if handle:
+                        boxes, _ = scheduler.detect(handle, frame, letterbox)
+                    else:
+                        boxes, _ = self._detect_batch([frame], letterbox)[0]
+                tracker.update(seq, boxes)
+                assigned = zone_index.assign(box_centers(boxes))
+                frame_zone_counts = zone_index.count(assigned)
+                counts_data = {zone['label']: frame_zone_counts[zone['id']] for zone in scaled_zones}
+                counted_at = time.time()
+                latency = counted_at - arrived
+                rolling.add(counted_at, counts_data, latency)
+                analyzed += 1
+                # Percentiles over the window are refreshed once a second, not per frame
+                if counted_at - summarized_at >= 1.0:
+                    summary = rolling.summary()
+                    summarized_at = counted_at
+                
+                data = {
+                    'counts': counts_data,
+                    'rolling': summary['counts'],
+                    'frame_number': seq,
+                    'latency_ms': round(latency * 1000, 1)
+                }
+                if scaled_lines:
+                    data['crossings'] = tracker.crossings()
+                self.live_counts[camera_key] = dict(
+                    data, window=summary, analyzed_frames=analyzed, updated_at=counted_at,
+                    **gate.summary(), **reader.stats()
+                )
+                
+                preview = self._draw_preview(frame, preview_size, preview_zones, boxes * preview_scale, assigned)
+                _, buffer = cv2.imencode('.jpg', preview, encode_params)
+                yield LiveEvent(data, buffer.tobytes(), preview)
+                if handle:
+                    scheduler.pace(handle)
+                frame, seq, arrived = reader.latest(seq, settings.CAMERA_STALL_SECONDS)
+        finally:
+            if handle:
+                scheduler.unregister(handle)
+            reader.close()
+            self.live_counts.pop(camera_key, None)
+    
+    def camera_scheduler(self) -> InferenceScheduler:
+        """The scheduler shared by all live cameras, created on first use (and again after its workers failed)"""
+        if self.scheduler is None or self.scheduler.error is not None:
+            self.scheduler = InferenceScheduler(self._camera_detector, settings.CAMERA_INFERENCE_WORKERS,
+                                                settings.CAMERA_MAX_BATCH, settings.CAMERA_BATCH_WAIT_MS / 1000,
+                                                settings.CAMERA_INFERENCE_TIMEOUT_SECONDS)
+        return self.scheduler
+    
+    def _camera_detector(self, worker: int) -> Callable:
+        """Detector of a scheduler worker: the first uses this service's model, the others a model of their own"""
+        service = self if worker == 0 else YOLOService()
+        service._load_model()
+        return service._detect_letterboxed
+    
+    def _draw_preview(self, frame: np.ndarray, size: Tuple[int, int], preview_zones: List[Dict],
+                      preview_boxes: np.ndarray, assigned: np.ndarray) -> np.ndarray:
+        """Live preview of a native frame: resized to `size`, with zones and (preview-scaled) boxes drawn"""
+        if size != (frame.shape[1], frame.shape[0]):
+            preview = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            preview = frame.copy()
+        
+        # Draw zones
+        for zone in preview_zones:
+            pts = np.array(zone['coordinates'], np.int32).reshape((-1, 1, 2))
+            cv2.polylines(preview, [pts], True, (0, 255, 0), 2)
+            cv2.putText(preview, zone['label'], tuple(zone['coordinates'][0]), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        
+        for (x1, y1, x2, y2), (center_x, center_y), zone_idx in zip(preview_boxes, box_centers(preview_boxes), assigned):
+            cv2.rectangle(preview, (int(x1), int(y1)), (int(x2), int(y2)), (255, 0, 0), 2)
+            cv2.putText(preview, 'Person', (int(x1), int(y1) - 10), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 0, 0), 1)
+            if zone_idx >= 0:
+                cv2.circle(preview, (int(center_x), int(center_y)), 4, (0, 0, 255), -1)
+        return preview
+    
+    def analyze_video_stream(self, video_path: str, zones: List[Dict], output_path: str = None,
+                             **options) -> Generator[bytes, None, None]:
+        """Real-time streaming for one client as server-sent events (see live_events for options)"""
+        events = self.live_events(video_path, zones, output_path, **options)
+        try:
+            for event in events:
+                yield event.sse()
+        finally:
+            events.close()
     
     def point_in_polygon(self, point, polygon):
-        """Check if point is inside polygon"""
+        """Check if point is inside polygon (scalar reference for ZoneIndex)"""
         x, y = point
         n = len(polygon)
         inside = False
@@ -189,9 +431,178 @@ class YOLOService:
             p1x, p1y = p2x, p2y
         return inside
     
-    def analyze_video(self, video_path: str, zones: List[Dict], output_path: str) -> Dict:
-        """Process video with YOLO detections and count people in zones"""
-        self._load_model()
+    def _start_pipeline(self, key: str, cap, batch_size: int = 1, encode=None, max_frames: int = None) -> FramePipeline:
+        """Start a decode/detect/encode pipeline and register it for stats lookup"""
+        pipeline = FramePipeline(cap, batch_size, encode, settings.PIPELINE_QUEUE_SIZE, max_frames).start()
+        self.pipelines[key] = pipeline
+        return pipeline
+    
+    def get_pipeline_stats(self, video_path: str) -> Dict:
+        """Queue depth and per-stage latency of the pipelines running (or last run) on a video"""
+        stats = {}
+        for mode in ('video', 'stream'):
+            pipeline = self.pipelines.get(f"{mode}_{video_path}")
+            if pipeline:
+                stats[mode] = pipeline.stats()
+        return stats
+    
+    def _export_timeline_json(self, frame_data_path: str, output_path: str):
+        """Write the _frames.json compatibility export when TIMELINE_JSON_EXPORT is on"""
+        if settings.TIMELINE_JSON_EXPORT:
+            TimelineReader(frame_data_path).export_json(output_path.replace('.mp4', '_frames.json'))
+    
+    def detection_cache_key(self, video_path: str, stride: int, region: Region = None, tiled: bool = False,
+                            motion: str = None) -> str:
+        """Detection cache key for this video's content at the current model settings"""
+        tiling = None
+        if tiled:
+            tiling = f"{settings.TILE_SIZE}/{settings.TILE_OVERLAP}/{int(settings.TILE_OVERVIEW)}/" \
+                     f"{settings.TILE_NMS_IOU}/{settings.TILE_NMS_IOS}"
+        return detection_cache.key_for(video_path, self.model_name, self.input_size, stride, region, tiling, motion)
+    
+    def motion_signature(self, motion: bool) -> Optional[str]:
+        """Identity of the motion gate's settings, None when the gate is off.
+
+        The zones are not part of it: a gated cache entry records the region
+        its detections are fresh in, and is reused for any zones inside it.
+        """
+        if not motion:
+            return None
+        return f"{settings.MOTION_WIDTH}/{settings.MOTION_PIXEL_DELTA}/{settings.MOTION_THRESHOLD}/" \
+               f"{settings.MOTION_REFRESH_SECONDS}"
+    
+    def motion_gate(self, scaled_zones: List[Dict], width: int, height: int, fps: float, enabled: bool) -> MotionGate:
+        """Motion gate over the (native) zones, refreshing at least every MOTION_REFRESH_SECONDS"""
+        return MotionGate(scaled_zones, width, height, enabled, settings.MOTION_WIDTH, settings.MOTION_PIXEL_DELTA,
+                          settings.MOTION_THRESHOLD, settings.ANALYSIS_ROI_MARGIN,
+                          int(settings.MOTION_REFRESH_SECONDS * fps))
+    
+    def detection_input(self, width: int, height: int, region: Region = None,
+                        tiled: bool = False) -> Union[Letterbox, TileLayout]:
+        """What the model sees of each frame: one letterboxed image, or a cached tile layout"""
+        if tiled:
+            overview = self.input_size if settings.TILE_OVERVIEW else None
+            return tile_layout(width, height, settings.TILE_SIZE, settings.TILE_OVERLAP, region, overview)
+        return Letterbox(width, height, self.input_size, region)
+    
+    def detection_region(self, scaled_zones: List[Dict], width: int, height: int, roi: bool) -> Optional[Region]:
+        """Region the model runs on: the zones' bounding box when ROI cropping is on, else None (whole frame)"""
+        return zone_roi(scaled_zones, width, height, settings.ANALYSIS_ROI_MARGIN) if roi else None
+    
+    def zone_tracker(self, scaled_zones: List[Dict], fps: float, scaled_lines: List[Dict] = (),
+                     stride: int = 1) -> ZoneTracker:
+        """Person tracker over the (native) zones and counting lines, with its ages converted from seconds to frames.
+
+        stride is the number of frames between detections; tracks survive at
+        least one missed detection (2 x stride), and their predicted boxes
+        cover the whole gap between two detections.
+        """
+        max_age = max(1, int(settings.TRACK_MAX_AGE_SECONDS * fps), 2 * stride)
+        return ZoneTracker(scaled_zones, fps, settings.TRACK_IOU, max_age, settings.TRACK_MIN_HITS, lines=scaled_lines)
+    
+    def _detect_batch(self, frames: List[np.ndarray],
+                      letterbox: Union[Letterbox, TileLayout]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Person boxes (native xyxy) and scores for a list of frames, in a single model call.
+
+        Frames are letterboxed to the model input once and passed as a
+        tensor, so the model skips its own resize; boxes are mapped back to
+        native pixels with the letterbox's inverse transform.
+        """
+        if not frames:
+            return []
+        if isinstance(letterbox, TileLayout):
+            return self._detect_tiled(frames, letterbox)
+        return self._detect_letterboxed(frames, [letterbox] * len(frames))
+    
+    def _detect_letterboxed(self, frames: List[np.ndarray],
+                            letterboxes: List[Letterbox]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Single model call over frames that each have their own letterbox (all with the same input size)"""
+        batch = images_to_tensor([letterbox(frame) for frame, letterbox in zip(frames, letterboxes)])
+        results = self.model(batch, classes=[0], imgsz=self.input_size, verbose=False)
+        return [
+            (letterbox.to_native(result.boxes.xyxy.cpu().numpy()), result.boxes.conf.cpu().numpy())
+            for letterbox, result in zip(letterboxes, results)
+        ]
+    
+    def _detect_tiled(self, frames: List[np.ndarray], layout: TileLayout) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Tiled detection: all tiles of all frames batched TILE_BATCH at a time, merged per frame with cross-tile NMS"""
+        boxes = [[] for _ in frames]
+        scores = [[] for _ in frames]
+        tiles = [(i, letterbox) for i in range(len(frames)) for letterbox in layout.letterboxes]
+        for start in range(0, len(tiles), settings.TILE_BATCH):
+            chunk = tiles[start:start + settings.TILE_BATCH]
+            batch = images_to_tensor([letterbox(frames[i]) for i, letterbox in chunk])
+            results = self.model(batch, classes=[0], imgsz=self.input_size, verbose=False)
+            for (i, letterbox), result in zip(chunk, results):
+                boxes[i].append(letterbox.to_native(result.boxes.xyxy.cpu().numpy()))
+                scores[i].append(result.boxes.conf.cpu().numpy())
+        if layout.overview:
+            for i, (frame_boxes, frame_scores) in enumerate(self._detect_batch(frames, layout.overview)):
+                boxes[i].append(frame_boxes)
+                scores[i].append(frame_scores)
+        return [
+            merge_boxes(np.concatenate(frame_boxes), np.concatenate(frame_scores),
+                        settings.TILE_NMS_IOU, settings.TILE_NMS_IOS)
+            for frame_boxes, frame_scores in zip(boxes, scores)
+        ]
+    
+    def analyze_video(self, video_path: str, zones: List[Dict], output_path: str, batch_size: int = None,
+                      detect_stride: int = 1, target_fps: float = None, fill: str = 'hold',
+                      should_cancel: Callable[[], bool] = None, segments: int = None,
+                      start_frame: int = 0, end_frame: int = None, use_cache: bool = None,
+                      cache_key: str = None, resume: bool = False, roi: bool = None, tiled: bool = None,
+                      motion: bool = None, track: bool = None) -> Dict:
+        """Process video with YOLO detections and count people in zones.
+
+        Detection runs on every detect_stride-th frame (or at target_fps);
+        every frame is still written to the output video. should_cancel is
+        polled once per batch and aborts with AnalysisCancelled when true.
+        With segments > 1 the video is split into time segments analyzed in
+        parallel worker processes and stitched back together; start_frame /
+        end_frame restrict the analysis to one such segment.
+        
+        Raw detections are read from / written to the detection cache, so
+        re-running with edited zones only redoes zone assignment and drawing.
+        Their centers are also saved next to the output (_detections.npz) for
+        recounting with other zones without touching the video.
+        
+        Progress is checkpointed every CHECKPOINT_INTERVAL_SECONDS; with
+        resume=True a run interrupted by a crash continues from its last
+        checkpoint for the same output_path instead of from the start.
+        
+        With roi=True (default ANALYSIS_ROI) the model only sees the bounding
+        box of the zones plus a margin; people outside it are not detected,
+        so the stored detections only support recounts inside that region.
+        With tiled=True (default ANALYSIS_TILED) frames are detected in
+        overlapping native-resolution tiles (see TileLayout) for small people
+        in high-resolution footage, at a multiple of the inference cost.
+        With motion=True (default ANALYSIS_MOTION_GATE, off) detection frames
+        where nothing changed inside the zones reuse the last detections
+        (see MotionGate); like roi, recounts are then limited to the zones'
+        bounding box, and the cache entry records that box so it is only
+        reused for zones inside it.
+        With track=True (default ANALYSIS_TRACKING, implied by fill='track')
+        people get persistent IDs across frames (see ZoneTracker) and each
+        zone also reports unique visitors, entries, exits and dwell times;
+        fill='track' counts the frames between detections from the tracks'
+        predicted boxes. Segmented runs track each segment on its own, so a
+        person present at a segment boundary counts once per segment.
+        """
+        use_cache = settings.DETECTION_CACHE_ENABLED if use_cache is None else use_cache
+        segments = settings.ANALYSIS_SEGMENTS if segments is None else segments
+        roi = settings.ANALYSIS_ROI if roi is None else roi
+        tiled = settings.ANALYSIS_TILED if tiled is None else tiled
+        motion = settings.ANALYSIS_MOTION_GATE if motion is None else motion
+        track = (settings.ANALYSIS_TRACKING if track is None else track) or fill == 'track'
+        if segments > 1:
+            from backend.services.segments import analyze_video_segmented
+            return analyze_video_segmented(
+                self, video_path, zones, output_path, segments, should_cancel=should_cancel,
+                batch_size=batch_size, detect_stride=detect_stride, target_fps=target_fps, fill=fill,
+                use_cache=use_cache, resume=resume, roi=roi, tiled=tiled, motion=motion, track=track
+            )
+        
+        batch_size = max(1, batch_size or settings.ANALYSIS_BATCH_SIZE)
         
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
@@ -203,102 +614,220 @@ class YOLOService:
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
         print(f"Video dimensions: {width}x{height}")
+        sampler = DetectionSampler(fps, detect_stride, target_fps, fill)
         
         # Scale zones from normalized 640x360 to actual video dimensions
-        scaled_zones = []
-        for zone in zones:
-            scaled_coords = []
-            for x, y in zone['coordinates']:
-                scaled_x = int((x / 640) * width)
-                scaled_y = int((y / 360) * height)
-                scaled_coords.append([scaled_x, scaled_y])
-            scaled_zones.append({
-                'id': zone['id'],
-                'label': zone['label'],
-                'coordinates': scaled_coords
-            })
-        
-        print(f"Scaled zones: {scaled_zones}")
-        
-        # Use imageio-ffmpeg for web-compatible H.264 encoding
-        import imageio
-        writer = imageio.get_writer(output_path, fps=fps, codec='libx264', pixelformat='yuv420p')
+        all_zones = scale_zones(zones, width, height)
+        print(f"Scaled zones: {all_zones}")
+        # Counting lines are counted from tracks, not occupancy, so they stay out of the zone index
+        scaled_zones, scaled_lines = split_zones(all_zones)
+        zone_index = ZoneIndex(scaled_zones)
+        region = self.detection_region(all_zones, width, height, roi)
+        letterbox = self.detection_input(width, height, region, tiled)
+        if region or tiled:
+            tiles = f", {len(letterbox.tiles)} tiles" if tiled else ""
+            print(f"Detecting in region {region or 'full frame'}{tiles} ({letterbox.pixels} model input pixels per frame)")
+        gate = self.motion_gate(all_zones, width, height, fps, motion)
+        motion_key = self.motion_signature(motion)
+        # Where the detections are fresh: gated frames reuse detections that are stale outside the zones
+        fresh_region = self.detection_region(all_zones, width, height, roi or motion)
+        # Crossing counts need tracks
+        track = track or bool(scaled_lines)
+        tracker = self.zone_tracker(scaled_zones, fps, scaled_lines, sampler.stride) if track else None
+        
+        # Reuse raw detections of an earlier analysis of the same content
+        cached = None
+        recorder = None
+        if use_cache:
+            cache_key = cache_key or self.detection_cache_key(video_path, sampler.stride, region, tiled, motion_key)
+            cached = detection_cache.load(cache_key, all_zones)
+        if cached is None:
+            recorder = DetectionRecorder()
+            self._load_model()
+        
+        # Continue from the last checkpoint of an interrupted run with the same settings
+        identity = {
+            'mode': 'video', 'start_frame': start_frame, 'end_frame': end_frame, 'stride': sampler.stride,
+            'fill': sampler.fill, 'zones_key': zones_key(zones), 'cached': cached is not None,
+            'roi': list(region) if region else None, 'tiled': tiled, 'motion': motion_key, 'track': track
+        }
+        state = load_checkpoint(output_path) if resume else None
+        if state and any(state.get(key) != value for key, value in identity.items()):
+            state = None
+        if state is None:
+            discard_checkpoint(output_path)
+        else:
+            print(f"Resuming analysis of {video_path} from frame {state['frames']}")
+            sampler.restore(state['sampler'])
+            gate.restore(state.get('motion_gate', {}))
+            if tracker:
+                tracker.restore(state['tracker'])
+        resume_frame = state['frames'] if state else start_frame
+        if resume_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, resume_frame)
+        
+        # Use imageio-ffmpeg for web-compatible H.264 encoding, one part per checkpoint
+        checkpoint = AnalysisCheckpoint(output_path, fps, state)
         
         # Initialize zone counters
         zone_max_counts = {zone['id']: 0 for zone in scaled_zones}
+        if state:
+            for zone in scaled_zones:
+                zone_max_counts[zone['id']] = state['zone_max'].get(str(zone['id']), 0)
         total_people = 0
-        frame_count = 0
+        # Frame indices (and timeline times) stay absolute when analyzing a segment
+        frame_count = resume_frame
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        frame_data = []  # Store frame-by-frame counts
+        if end_frame is not None:
+            total_frames = min(total_frames, end_frame)
+        segment_frames = None if end_frame is None else end_frame - resume_frame
+        
+        # Store frame-by-frame counts in a columnar timeline, appended as analysis runs
+        frame_data_path = timeline_path_for(output_path)
+        timeline = TimelineWriter(
+            frame_data_path, [zone['label'] for zone in scaled_zones], fps,
+            resume=state is not None, resume_rows=state['rows'] if state else None
+        )
         
         # Store progress
         progress_key = f"video_{video_path}"
-        self.progress[progress_key] = {'current': 0, 'total': total_frames, 'percentage': 0}
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
+        self.progress[progress_key] = {'current': 0, 'total': total_frames - start_frame, 'percentage': 0}
+        
+        # Decode and x264 encode run on their own threads around inference
+        # Decode enough frames per batch to fill batch_size detections
+        pipeline = self._start_pipeline(progress_key, cap, batch_size * sampler.stride, checkpoint.encode, segment_frames)
+        completed = False
+        
+        # Detections carried over to frames that skip the model
+        boxes = np.asarray(state['boxes'] if state else [], dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(state.get('scores', [1.0] * len(boxes)) if state else [], dtype=np.float32)
+        drawn = boxes
+        centers = box_centers(boxes)
+        assigned = zone_index.assign(centers)
+        frame_zone_counts = zone_index.count(assigned)
+        
+        try:
+            for frames in pipeline.batches():
+                if should_cancel and should_cancel():
+                    raise AnalysisCancelled(f"Analysis of {video_path} cancelled")
+                
+                # Run the batch's detection frames that changed through the model in one call
+                detect = set() if cached is not None else {
+                    i for i, frame in enumerate(frames, frame_count)
+                    if sampler.is_keyframe(i) and gate.should_detect(frame, i)
+                }
+                keyframes = [frame for i, frame in enumerate(frames, frame_count) if i in detect]
+                batch_results = iter(self._detect_batch(keyframes, letterbox))
             
-            frame_count += 1
-            
-            # Update progress
-            percentage = int((frame_count / total_frames) * 100)
-            self.progress[progress_key] = {'current': frame_count, 'total': total_frames, 'percentage': percentage}
-            
-            # Run YOLO detection (only detect people - class 0)
-            results = self.model(frame, classes=[0], verbose=False)
-            
-            # Draw zones FIRST (static) using scaled coordinates
-            for zone in scaled_zones:
-                pts = np.array(zone['coordinates'], np.int32).reshape((-1, 1, 2))
-                cv2.polylines(frame, [pts], True, (0, 255, 0), 3)
-                cv2.putText(frame, zone['label'], tuple(zone['coordinates'][0]), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            
-            # Count people in zones
-            frame_zone_counts = {zone['id']: 0 for zone in scaled_zones}
-            
-            for result in results:
-                for box in result.boxes:
-                    # Get person bounding box
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    center_x = int((x1 + x2) / 2)
-                    center_y = int((y1 + y2) / 2)
+                for frame in frames:
+                    keyframe = sampler.is_keyframe(frame_count)
+                    frame_count += 1
+                
+                    # Update progress
+                    current = frame_count - start_frame
+                    percentage = int((current / max(1, total_frames - start_frame)) * 100)
+                    self.progress[progress_key] = {'current': current, 'total': total_frames - start_frame, 'percentage': percentage}
+                
+                    # Draw zones FIRST (static) using scaled coordinates
+                    for zone in all_zones:
+                        pts = np.array(zone['coordinates'], np.int32).reshape((-1, 1, 2))
+                        cv2.polylines(frame, [pts], True, (0, 255, 0), 3)
+                        cv2.putText(frame, zone['label'], tuple(zone['coordinates'][0]), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                
+                    # Count people in zones (all detections against all zones at once)
+                    if keyframe:
+                        if cached is not None:
+                            boxes, scores = cached.get(frame_count - 1)
+                        else:
+                            if frame_count - 1 in detect:
+                                boxes, scores = next(batch_results)
+                            # Static frames record the reused detections, so cache hits replay them
+                            recorder.add(frame_count - 1, boxes, scores)
+                        if tracker:
+                            tracker.update(frame_count - 1, boxes)
+                        drawn = boxes
+                    elif sampler.fill == 'track':
+                        # Follow people between detections with the tracks' predicted boxes
+                        _, drawn = tracker.predict(frame_count - 1)
+                    if keyframe or sampler.fill == 'track':
+                        centers = box_centers(drawn)
+                        assigned = zone_index.assign(centers)
+                        frame_zone_counts = zone_index.count(assigned)
+                
+                    for (x1, y1, x2, y2), (center_x, center_y), zone_idx in zip(drawn, centers, assigned):
+                        # Draw bounding box for person
+                        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (255, 0, 0), 2)
+                        cv2.putText(frame, 'Person', (int(x1), int(y1) - 10), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
                     
-                    # Draw bounding box for person
-                    cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (255, 0, 0), 2)
-                    cv2.putText(frame, 'Person', (int(x1), int(y1) - 10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                    
-                    # Check which zone this person is in
-                    for zone in scaled_zones:
-                        if self.point_in_polygon((center_x, center_y), zone['coordinates']):
-                            frame_zone_counts[zone['id']] += 1
+                        if zone_idx >= 0:
                             # Draw red dot for person in zone
-                            cv2.circle(frame, (center_x, center_y), 5, (0, 0, 255), -1)
-                            break
-            
-            # Store frame data with timestamp
-            frame_time = frame_count / fps
-            frame_data.append({
-                'time': round(frame_time, 2),
-                'counts': {zone['label']: frame_zone_counts[zone['id']] for zone in scaled_zones}
-            })
-            
-            # Update max counts
-            for zone_id, count in frame_zone_counts.items():
-                if count > zone_max_counts[zone_id]:
-                    zone_max_counts[zone_id] = count
-            
-            # Convert BGR to RGB for imageio
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            writer.append_data(rgb_frame)
-        
-        cap.release()
-        writer.close()
+                            cv2.circle(frame, (int(center_x), int(center_y)), 5, (0, 0, 255), -1)
+                
+                    # Store frame data with timestamp (skipped frames held or interpolated)
+                    frame_time = frame_count / fps
+                    timeline.extend(sampler.timeline_rows(
+                        round(frame_time, 2),
+                        {zone['label']: frame_zone_counts[zone['id']] for zone in scaled_zones},
+                        keyframe
+                    ))
+                
+                    # Update max counts
+                    for zone_id, count in frame_zone_counts.items():
+                        if count > zone_max_counts[zone_id]:
+                            zone_max_counts[zone_id] = count
+                
+                    pipeline.submit(frame)
+                
+                # Commit a checkpoint once the encoder has written every frame so far
+                if checkpoint.due():
+                    timeline.flush()
+                    pipeline.submit(checkpoint.marker(dict(
+                        identity,
+                        frames=frame_count,
+                        rows=timeline.rows,
+                        boxes=boxes.tolist(),
+                        scores=scores.tolist(),
+                        zone_max={str(zone_id): count for zone_id, count in zone_max_counts.items()},
+                        sampler=sampler.state(),
+                        motion_gate=gate.state(),
+                        tracker=tracker.state() if tracker else None
+                    ), recorder))
+            completed = True
+        finally:
+            pipeline.close(wait=completed)
+            cap.release()
+            if not completed or pipeline.error:
+                checkpoint.close()
+                timeline.close(complete=False)
+        if pipeline.error:
+            raise pipeline.error
+        timeline.extend(sampler.flush())
+        timeline.close()
+        
+        # Whole-video runs store their detections; segments hand them to the caller to merge
+        if recorder:
+            detections = DetectionRecorder.merge(checkpoint.load_detections() + [recorder.arrays()])
+        else:
+            detections = cached.arrays
+        checkpoint.finish()
+        if start_frame == 0 and end_frame is None:
+            if recorder and use_cache:
+                detection_cache.store(cache_key, detections, fresh_region)
+            # Gated detections are only fresh around the zones they were gated on, like a cropped run's
+            if cached is not None and cached.region:
+                fresh_region = cached.region
+            save_detection_centers(detections_path_for(output_path), detections, fps, timeline.rows,
+                                   width, height, sampler.stride, sampler.fill, fresh_region, zones)
+            detections = None
+        elif recorder is None:
+            # Cache hit: the caller reads the whole-video entry itself
+            detections = None
         
         # Calculate results
+        if tracker:
+            tracker.finish()
         zone_results = []
         total_count = 0
         for zone in scaled_zones:
@@ -306,96 +835,42 @@ class YOLOService:
             zone_results.append({
                 'zone_id': zone['id'],
                 'zone_label': zone['label'],
-                'count': count
+                'count': count,
+                **(tracker.zone_summary(zone['id']) if tracker else {})
             })
             total_count += count
+        for line in scaled_lines:
+            zone_results.append({'zone_id': line['id'], 'zone_label': line['label'], **tracker.line_summary(line['id'])})
         
-        # Save frame data as JSON
-        import json
-        frame_data_path = output_path.replace('.mp4', '_frames.json')
-        with open(frame_data_path, 'w') as f:
-            json.dump(frame_data, f)
+        # Whole-video runs can also keep the legacy JSON timeline
+        if start_frame == 0 and end_frame is None:
+            self._export_timeline_json(frame_data_path, output_path)
         
         print(f"Detection complete! Results saved to {output_path}")
         
-        return {
+        result = {
             'total_count': total_count,
             'zone_counts': zone_results,
             'output_video': output_path,
-            'frame_data_path': frame_data_path
+            'frame_data_path': frame_data_path,
+            'detection_cache': 'hit' if cached is not None else ('miss' if use_cache else 'off'),
+            **sampler.summary(),
+            **gate.summary(),
+            **(tracker.summary() if tracker else {})
         }
+        if detections is not None:
+            result['detections'] = detections
+        return result
 
     def analyze_video_mjpeg(self, video_path: str, zones: List[Dict]) -> Generator[bytes, None, None]:
-        """MJPEG streaming - process every frame and yield bytes"""
-        self._load_model()
-        
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            return
-        
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
-        # Resize for faster processing
-        process_width = 640
-        process_height = 480
-        
-        # Scale zones to processing resolution
-        scaled_zones = []
-        for zone in zones:
-            scaled_coords = []
-            for x, y in zone['coordinates']:
-                scaled_x = int((x / 640) * process_width)
-                scaled_y = int((y / 360) * process_height)
-                scaled_coords.append([scaled_x, scaled_y])
-            scaled_zones.append({
-                'id': zone['id'],
-                'label': zone['label'],
-                'coordinates': scaled_coords
-            })
-            
-        encode_params = [cv2.IMWRITE_JPEG_QUALITY, 70]
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Resize for faster processing
-            frame_resized = cv2.resize(frame, (process_width, process_height))
-            
-            # Run YOLO detection
-            results = self.model(frame_resized, classes=[0], verbose=False)
-            
-            # Draw zones
-            for zone in scaled_zones:
-                pts = np.array(zone['coordinates'], np.int32).reshape((-1, 1, 2))
-                cv2.polylines(frame_resized, [pts], True, (0, 255, 0), 2)
-                cv2.putText(frame_resized, zone['label'], tuple(zone['coordinates'][0]), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-            
-            # Count people and draw boxes
-            for result in results:
-                for box in result.boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    center_x = int((x1 + x2) / 2)
-                    center_y = int((y1 + y2) / 2)
-                    
-                    cv2.rectangle(frame_resized, (int(x1), int(y1)), (int(x2), int(y2)), (255, 0, 0), 2)
-                    
-                    for zone in scaled_zones:
-                        if self.point_in_polygon((center_x, center_y), zone['coordinates']):
-                            cv2.circle(frame_resized, (center_x, center_y), 4, (0, 0, 255), -1)
-                            break
-            
-            # Encode frame
-            _, buffer = cv2.imencode('.jpg', frame_resized, encode_params)
-            frame_bytes = buffer.tobytes()
-            
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        cap.release()
+        """MJPEG streaming for one client - detect on every frame and yield multipart JPEG parts"""
+        events = self.live_events(video_path, zones)
+        try:
+            for event in events:
+                if event.jpeg:
+                    yield event.mjpeg()
+        finally:
+            events.close()
 
 # Singleton instance
 yolo_service = YOLOService()
@@ -0,0 +1,168 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+# Zone.zone_type values: an area counted by occupancy, or a counting line crossed by tracked people
+ZONE_TYPES = ('occupancy', 'line')
+
+
+def is_line(zone: Dict) -> bool:
+    """Whether a zone is a counting line rather than an occupancy area (zones without a type are areas)"""
+    return zone.get('type', 'occupancy') == 'line'
+
+
+def zone_shape_error(zone_type: str, coordinates) -> Optional[str]:
+    """Why a zone of this type can't have these coordinates, or None if it can"""
+    if zone_type not in ZONE_TYPES:
+        return f"Zone type must be one of: {', '.join(ZONE_TYPES)}"
+    if not isinstance(coordinates, list):
+        return "Zone coordinates must be a list of points"
+    if zone_type == 'line' and len(coordinates) != 2:
+        return "A counting line needs exactly 2 points"
+    if zone_type == 'occupancy' and len(coordinates) < 3:
+        return "A zone needs at least 3 points"
+    return None
+
+
+def split_zones(zones: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """(area zones, counting lines), each in their original order"""
+    return [zone for zone in zones if not is_line(zone)], [zone for zone in zones if is_line(zone)]
+
+
+def box_centers(boxes: np.ndarray) -> np.ndarray:
+    """Integer centers of xyxy boxes, truncated the same way as int((x1 + x2) / 2)"""
+    boxes = np.asarray(boxes)
+    if len(boxes) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    centers = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+    return centers.astype(np.int64)
+
+
+class ZoneIndex:
+    """Zone membership for all detections of a frame in one vectorized step.
+
+    Built once per video from the scaled zone polygons: the edges of every
+    zone are flattened into one table, so a frame's detection centers are
+    tested against all edges of all zones with a single (points x edges)
+    ray-casting pass. The comparisons are the same as in
+    YOLOService.point_in_polygon, so boundary points land on the same side,
+    and each point is assigned to the first zone (in zone order) that
+    contains it, like the break-on-first-match loops it replaces.
+    """
+
+    def __init__(self, zones: List[Dict]):
+        self.zone_ids = [zone['id'] for zone in zones]
+        p1, p2, starts = [], [], []
+        for zone in zones:
+            polygon = np.asarray(zone['coordinates'], dtype=np.float64).reshape(-1, 2)
+            starts.append(sum(len(p) for p in p1))
+            p1.append(polygon)
+            p2.append(np.roll(polygon, -1, axis=0))
+        p1 = np.concatenate(p1) if p1 else np.zeros((0, 2))
+        p2 = np.concatenate(p2) if p2 else np.zeros((0, 2))
+        self.edge_starts = np.array(starts, dtype=np.int64)
+        self.p1x, self.p1y = p1[:, 0], p1[:, 1]
+        self.dx = p2[:, 0] - p1[:, 0]
+        self.dy = p2[:, 1] - p1[:, 1]
+        self.y_min = np.minimum(p1[:, 1], p2[:, 1])
+        self.y_max = np.maximum(p1[:, 1], p2[:, 1])
+        self.x_max = np.maximum(p1[:, 0], p2[:, 0])
+        self.vertical = self.dx == 0
+        # Horizontal edges never pass the y test; avoid dividing by zero for them
+        self.safe_dy = np.where(self.dy == 0, 1, self.dy)
+
+    def inside(self, points: np.ndarray) -> np.ndarray:
+        """(points x zones) boolean matrix of polygon membership"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) == 0 or len(self.zone_ids) == 0:
+            return np.zeros((len(points), len(self.zone_ids)), dtype=bool)
+        x = points[:, 0:1]
+        y = points[:, 1:2]
+        crosses = (y > self.y_min) & (y <= self.y_max) & (x <= self.x_max)
+        xinters = (y - self.p1y) * self.dx / self.safe_dy + self.p1x
+        flips = crosses & (self.vertical | (x <= xinters))
+        # A point is inside when an odd number of its zone's edges flip
+        return (np.add.reduceat(flips, self.edge_starts, axis=1) % 2).astype(bool)
+
+    def assign(self, points: np.ndarray) -> np.ndarray:
+        """Index of the first zone containing each point, -1 when none does"""
+        inside = self.inside(points)
+        if inside.shape[1] == 0:
+            return np.full(len(inside), -1, dtype=np.int64)
+        first = inside.argmax(axis=1)
+        return np.where(inside.any(axis=1), first, -1)
+
+    def count(self, assigned: np.ndarray) -> Dict[int, int]:
+        """Per-zone counts keyed by zone id from the output of assign()"""
+        counts = np.bincount(assigned[assigned >= 0], minlength=len(self.zone_ids))
+        return {zone_id: int(counts[i]) for i, zone_id in enumerate(self.zone_ids)}
+
+
+class LineCounter:
+    """Directional crossing counts of tracked people over counting lines.
+
+    A line is a zone with two points A and B. Walking from A to B, a
+    person crossing from the left-hand side to the right-hand side (as
+    seen on screen) counts as 'in', the other way as 'out'. Each update
+    moves every given track from its last position off the lines to its
+    current center, so the work per frame is O(tracks x lines) and no
+    trajectory is kept beyond one point per track and line. A crossing
+    needs the side to flip and the step to pass between A and B, so
+    walking around the end of a line does not count; a center exactly on
+    the line keeps the previous side until it leaves it.
+    """
+
+    def __init__(self, lines: List[Dict]):
+        self.line_ids = [line['id'] for line in lines]
+        points = np.asarray([line['coordinates'] for line in lines], dtype=np.float64).reshape(-1, 2, 2)
+        self.a = points[:, 0]
+        self.direction = points[:, 1] - points[:, 0]
+        self.crossings = {line_id: {'in': 0, 'out': 0} for line_id in self.line_ids}
+        # Per track: last position off each line, and which side of it that was (-1 left, 1 right, 0 unknown)
+        self.last: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _sides(self, point: np.ndarray) -> np.ndarray:
+        offset = point - self.a
+        return np.sign(self.direction[:, 0] * offset[:, 1] - self.direction[:, 1] * offset[:, 0])
+
+    def update(self, track_ids: List[int], centers: np.ndarray):
+        """Count the crossings of the tracks' steps to their current centers"""
+        if not self.line_ids:
+            return
+        for track_id, center in zip(track_ids, np.asarray(centers, dtype=np.float64).reshape(-1, 2)):
+            sides = self._sides(center)
+            last = self.last.get(track_id)
+            if last is None:
+                self.last[track_id] = (np.tile(center, (len(self.line_ids), 1)), sides)
+                continue
+            positions, last_sides = last
+            for i in np.flatnonzero(last_sides * sides < 0):
+                # The step must cross between A and B, not the line's extension
+                step = center - positions[i]
+                start, end = self.a[i] - positions[i], self.a[i] + self.direction[i] - positions[i]
+                if (step[0] * start[1] - step[1] * start[0]) * (step[0] * end[1] - step[1] * end[0]) <= 0:
+                    self.crossings[self.line_ids[i]]['in' if last_sides[i] < 0 else 'out'] += 1
+            off_line = sides != 0
+            positions[off_line] = center
+            last_sides[off_line] = sides[off_line]
+
+    def forget(self, track_ids: List[int]):
+        """Drop the positions of tracks that ended"""
+        for track_id in track_ids:
+            self.last.pop(track_id, None)
+
+    def state(self) -> Dict:
+        return {
+            'crossings': {str(line_id): counts for line_id, counts in self.crossings.items()},
+            'last': {str(track_id): [positions.tolist(), sides.tolist()]
+                     for track_id, (positions, sides) in self.last.items()}
+        }
+
+    def restore(self, state: Dict):
+        for line_id, counts in state.get('crossings', {}).items():
+            if int(line_id) in self.crossings:
+                self.crossings[int(line_id)] = dict(counts)
+        self.last = {
+            int(track_id): (np.asarray(positions, dtype=np.float64), np.asarray(sides, dtype=np.float64))
+            for track_id, (positions, sides) in state.get('last', {}).items()
+        }
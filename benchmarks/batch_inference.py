@@ -0,0 +1,67 @@
+"""Benchmark batched inference in YOLOService.analyze_video.
+
+Runs every sample clip in data/uploads through analyze_video with batch sizes
+1, 4, 8 and 16, reports frames/sec and checks that the per-frame counts match
+the frame-at-a-time (batch size 1) run.
+
+Usage (from the repository root):
+    python -m benchmarks.batch_inference [--batch-sizes 1 4 8 16] [clip ...]
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import cv2
+
+from backend.services.timeline import iter_frame_data
+from backend.services.yolo_service import YOLOService
+
+# One zone covering the whole 640x360 drawing canvas
+FULL_FRAME_ZONE = [{'id': 1, 'label': 'Full frame', 'coordinates': [[0, 0], [640, 0], [640, 360], [0, 360]]}]
+
+
+def frame_count(path):
+    cap = cv2.VideoCapture(path)
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return count
+
+
+def run(service, clip, batch_size, out_dir):
+    output_path = os.path.join(out_dir, f"bench_b{batch_size}.mp4")
+    start = time.perf_counter()
+    result = service.analyze_video(clip, FULL_FRAME_ZONE, output_path, batch_size=batch_size,
+                                   use_cache=False, motion=False)
+    elapsed = time.perf_counter() - start
+    timeline = list(iter_frame_data(result['frame_data_path']))
+    return elapsed, timeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('clips', nargs='*', help='Video files (default: data/uploads/*.mp4)')
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    clips = args.clips or sorted(glob.glob(os.path.join('data', 'uploads', '*.mp4')))
+    service = YOLOService()
+    service._load_model()
+
+    print(f"{'clip':<45} {'batch':>5} {'frames':>7} {'seconds':>8} {'fps':>7} {'counts':>8}")
+    for clip in clips:
+        frames = frame_count(clip)
+        baseline = None
+        with tempfile.TemporaryDirectory() as out_dir:
+            for batch_size in args.batch_sizes:
+                elapsed, timeline = run(service, clip, batch_size, out_dir)
+                if baseline is None:
+                    baseline = timeline
+                match = 'same' if timeline == baseline else 'DIFFER'
+                print(f"{os.path.basename(clip)[:45]:<45} {batch_size:>5} {frames:>7} "
+                      f"{elapsed:>8.2f} {frames / elapsed:>7.1f} {match:>8}")
+
+
+if __name__ == '__main__':
+    main()
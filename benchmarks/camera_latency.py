@@ -0,0 +1,131 @@
+"""Benchmark live camera ingestion: glass-to-count latency, drops and reconnects.
+
+Serves a local clip as a looping MJPEG stream over HTTP (a stand-in for an
+IP camera), paced at the clip's frame rate, and runs camera_events on it
+for --seconds. The server records when it sent every frame, so the true
+end-to-end latency (frame on the wire to counts ready) is measured next
+to the service's own glass-to-count latency (frame arrival at the reader
+to counts ready). With --drop-after the server cuts the connection once
+after that many seconds to exercise reconnect with backoff.
+
+Reports latency percentiles, the analysis frame rate against the source
+rate, frames dropped at the reader and reconnects.
+
+Usage (from the repository root):
+    python -m benchmarks.camera_latency [--seconds 30] [--drop-after 10] [--port 8554] [--clip PATH]
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from backend.services.yolo_service import YOLOService
+
+FULL_FRAME_ZONE = [{'id': 1, 'label': 'Full frame', 'coordinates': [[0, 0], [640, 0], [640, 360], [0, 360]]}]
+
+
+class StandInCamera:
+    """Looping MJPEG-over-HTTP server for one clip; sent_at[i] is when frame i + 1 went out"""
+
+    def __init__(self, clip: str, port: int, drop_after: float = None):
+        cap = cv2.VideoCapture(clip)
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.jpegs = []
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            self.jpegs.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+        cap.release()
+        self.sent_at = []
+        self.drop_after = drop_after
+        self.started = time.monotonic()
+        camera = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+                self.end_headers()
+                index = 0
+                next_at = time.monotonic()
+                try:
+                    while True:
+                        if camera.drop_after and time.monotonic() - camera.started > camera.drop_after:
+                            camera.drop_after = None
+                            return
+                        jpeg = camera.jpegs[index % len(camera.jpegs)]
+                        self.wfile.write(b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n' % len(jpeg))
+                        self.wfile.write(jpeg + b'\r\n')
+                        camera.sent_at.append(time.time())
+                        index += 1
+                        next_at += 1.0 / camera.fps
+                        time.sleep(max(0.0, next_at - time.monotonic()))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clip', help='Clip to serve (default: smallest file in data/uploads)')
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--drop-after', type=float, default=None, help='Cut the connection once after N seconds')
+    parser.add_argument('--port', type=int, default=8554)
+    args = parser.parse_args()
+
+    clip = args.clip or min(glob.glob(os.path.join('data', 'uploads', '*.mp4')), key=os.path.getsize)
+    camera = StandInCamera(clip, args.port, args.drop_after)
+    service = YOLOService()
+    service._load_model()
+
+    events = service.camera_events(f"http://127.0.0.1:{args.port}/stream.mjpg", FULL_FRAME_ZONE, 'bench')
+    end_to_end, service_latency, statuses = [], [], 0
+    stats = None
+    start = time.monotonic()
+    try:
+        for event in events:
+            if 'error' in event.data:
+                print(f"error: {event.data['error']}")
+                break
+            if event.data.get('type') == 'status':
+                statuses += 1
+            else:
+                stats = dict(service.live_counts['bench'])
+                service_latency.append(event.data['latency_ms'])
+                # Sequence numbers only line up with the server's frames on the first connection
+                if not stats['reconnects']:
+                    end_to_end.append((time.time() - camera.sent_at[event.data['frame_number'] - 1]) * 1000)
+            if time.monotonic() - start > args.seconds:
+                break
+    finally:
+        events.close()
+        camera.close()
+
+    print(f"clip: {clip} at {camera.fps:.1f} fps, {args.seconds:.0f}s")
+    for name, values in (('service glass-to-count', service_latency), ('end-to-end from server', end_to_end)):
+        if values:
+            p50, p95 = np.percentile(values, [50, 95])
+            print(f"{name:>24}: p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  max {max(values):7.1f} ms  ({len(values)} frames)")
+    if stats is None:
+        return
+    print(f"{'analysis fps':>24}: {stats['window']['analysis_fps']:.2f} (source {stats['source_fps']:.2f})")
+    print(f"{'reader':>24}: {stats['frames_read']} read, {stats['frames_dropped']} dropped, "
+          f"{stats['reconnects']} reconnects, {statuses} status events")
+
+
+if __name__ == '__main__':
+    main()
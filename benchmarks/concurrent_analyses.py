@@ -0,0 +1,65 @@
+"""Load test for the multi-process analysis pool.
+
+Runs 1, 2, 4 and 8 concurrent analyze_video calls on an AnalysisProcessPool
+with the same number of workers (each with its own model and a pinned
+torch thread budget) and reports the aggregate frames/sec. With enough
+cores the total should scale close to linearly with the worker count.
+
+Usage (from the repository root):
+    python -m benchmarks.concurrent_analyses [--concurrency 1 2 4 8] [--clip PATH]
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import cv2
+
+from backend.services.worker_pool import AnalysisProcessPool
+
+FULL_FRAME_ZONE = [{'id': 1, 'label': 'Full frame', 'coordinates': [[0, 0], [640, 0], [640, 360], [0, 360]]}]
+
+
+def frame_count(path):
+    cap = cv2.VideoCapture(path)
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 2, 4, 8])
+    parser.add_argument('--clip', help='Video to analyze (default: smallest file in data/uploads)')
+    parser.add_argument('--threads', type=int, default=None, help='Threads per worker (default: cpu_count / workers)')
+    args = parser.parse_args()
+
+    clip = args.clip or min(glob.glob(os.path.join('data', 'uploads', '*.mp4')), key=os.path.getsize)
+    frames = frame_count(clip)
+    print(f"clip: {clip} ({frames} frames), cpus: {os.cpu_count()}")
+    print(f"{'concurrent':>10} {'threads':>8} {'seconds':>8} {'total fps':>10} {'per-video fps':>14} {'scaling':>8}")
+
+    baseline = None
+    for concurrency in args.concurrency:
+        with AnalysisProcessPool(workers=concurrency, threads=args.threads) as pool, \
+                tempfile.TemporaryDirectory() as out_dir:
+            pool.warmup()
+            start = time.perf_counter()
+            futures = [
+                pool.submit(clip, FULL_FRAME_ZONE, os.path.join(out_dir, f"load_{i}.mp4"),
+                            use_cache=False, motion=False)
+                for i in range(concurrency)
+            ]
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+
+        total_fps = frames * concurrency / elapsed
+        baseline = baseline or total_fps
+        print(f"{concurrency:>10} {pool.threads:>8} {elapsed:>8.2f} {total_fps:>10.1f} "
+              f"{total_fps / concurrency:>14.1f} {total_fps / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Benchmark re-analysis from the detection cache.
+
+Analyzes a clip once with an empty cache (inference), then again with a
+different zone set (served from the cache), and reports both times, the
+counts of the re-analysis against an uncached run, and the cache stats.
+
+Usage (from the repository root):
+    python -m benchmarks.detection_cache [--clip PATH]
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from backend.services.detection_cache import DetectionCache
+from backend.services import yolo_service as yolo_module
+
+FULL_FRAME_ZONE = [{'id': 1, 'label': 'Full frame', 'coordinates': [[0, 0], [640, 0], [640, 360], [0, 360]]}]
+HALF_ZONES = [
+    {'id': 1, 'label': 'Left', 'coordinates': [[0, 0], [320, 0], [320, 360], [0, 360]]},
+    {'id': 2, 'label': 'Right', 'coordinates': [[320, 0], [640, 0], [640, 360], [320, 360]]},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clip', help='Video to analyze (default: smallest file in data/uploads)')
+    args = parser.parse_args()
+
+    clip = args.clip or min(glob.glob(os.path.join('data', 'uploads', '*.mp4')), key=os.path.getsize)
+    service = yolo_module.YOLOService()
+    service._load_model()
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        # Private cache so the benchmark neither reads nor evicts real entries
+        yolo_module.detection_cache = DetectionCache(os.path.join(out_dir, 'cache'))
+        runs = [
+            ('cold (inference)', FULL_FRAME_ZONE, True),
+            ('edited zones (cached)', HALF_ZONES, True),
+            ('edited zones (uncached)', HALF_ZONES, False),
+        ]
+        print(f"clip: {clip}")
+        print(f"{'run':<26} {'seconds':>8} {'cache':>6} {'zone counts'}")
+        for i, (name, zones, use_cache) in enumerate(runs):
+            start = time.perf_counter()
+            result = service.analyze_video(clip, zones, os.path.join(out_dir, f"run_{i}.mp4"), use_cache=use_cache)
+            elapsed = time.perf_counter() - start
+            counts = [zone['count'] for zone in result['zone_counts']]
+            print(f"{name:<26} {elapsed:>8.2f} {result['detection_cache']:>6} {counts}")
+        print(f"cache stats: {yolo_module.detection_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
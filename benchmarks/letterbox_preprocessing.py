@@ -0,0 +1,93 @@
+"""Benchmark the shared letterbox preprocessing and check cross-endpoint counts.
+
+For each clip:
+- times person detection on --frames frames three ways: native frames
+  handed to the model (which letterboxes them itself), the shared
+  Letterbox tensor path used by every endpoint, and the old live-path
+  behaviour of forcing frames to 640x480 first;
+- runs analyze_video and the live event stream on the same frames and
+  reports how many frames get different zone counts (0 expected now that
+  both count native-resolution boxes from the same letterboxed input).
+
+Usage (from the repository root):
+    python -m benchmarks.letterbox_preprocessing [--frames 120] [clip ...]
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import cv2
+
+from backend.core.config import settings
+from backend.services.preprocess import Letterbox
+from backend.services.timeline import iter_frame_data
+from backend.services.yolo_service import YOLOService
+
+FULL_FRAME_ZONE = [{'id': 1, 'label': 'Full frame', 'coordinates': [[0, 0], [640, 0], [640, 360], [0, 360]]}]
+
+
+def read_frames(path, count):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def per_frame_ms(fn, frames):
+    start = time.perf_counter()
+    for frame in frames:
+        fn(frame)
+    return (time.perf_counter() - start) * 1000 / max(1, len(frames))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('clips', nargs='*', help='Video files (default: data/uploads/*.mp4)')
+    parser.add_argument('--frames', type=int, default=120)
+    args = parser.parse_args()
+
+    clips = args.clips or sorted(glob.glob(os.path.join('data', 'uploads', '*.mp4')))
+    service = YOLOService()
+    service._load_model()
+    model, size = service.model, service.input_size
+
+    print(f"{'clip':<40} {'size':>10} {'native ms':>10} {'letterbox ms':>13} {'640x480 ms':>11} {'mismatch':>9}")
+    for clip in clips:
+        frames = read_frames(clip, args.frames)
+        if not frames:
+            continue
+        height, width = frames[0].shape[:2]
+        letterbox = Letterbox(width, height, size)
+        native = per_frame_ms(lambda f: model(f, classes=[0], imgsz=size, verbose=False), frames)
+        shared = per_frame_ms(lambda f: service._detect_batch([f], letterbox), frames)
+        forced = per_frame_ms(lambda f: model(cv2.resize(f, (640, 480)), classes=[0], imgsz=size, verbose=False), frames)
+
+        # Counts of the batch analysis vs the live path over the same frames
+        settings.CHECKPOINT_INTERVAL_SECONDS = 0
+        with tempfile.TemporaryDirectory() as out_dir:
+            result = service.analyze_video(clip, FULL_FRAME_ZONE, os.path.join(out_dir, 'bench.mp4'),
+                                           end_frame=len(frames), use_cache=False)
+            batch_counts = [row['counts'] for row in iter_frame_data(result['frame_data_path'])]
+        live_counts = []
+        events = service.live_events(clip, FULL_FRAME_ZONE)
+        for event in events:
+            if event.jpeg is None:
+                break
+            live_counts.append(event.data['counts'])
+            if len(live_counts) >= len(batch_counts):
+                break
+        events.close()
+        mismatch = sum(1 for a, b in zip(batch_counts, live_counts) if a != b)
+        print(f"{os.path.basename(clip)[:40]:<40} {f'{width}x{height}':>10} {native:>10.1f} {shared:>13.1f} "
+              f"{forced:>11.1f} {mismatch:>9}")
+
+
+if __name__ == '__main__':
+    main()
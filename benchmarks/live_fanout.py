@@ -0,0 +1,84 @@
+"""Benchmark live-view fan-out: one analysis per viewer vs one shared session.
+
+For 1, 2, 4 and 8 viewers, first runs one analyze_video_mjpeg generator per
+viewer (the old behaviour, N decodes and N model runs), then attaches the
+same number of viewers to a single broadcast hub session. Each viewer reads
+--frames frames; one of them can be made slow with --slow-ms to show that it
+drops frames instead of holding back the others. Reports the frames/sec each
+viewer saw and, for the hub, the frames dropped by the slow viewer.
+
+Usage (from the repository root):
+    python -m benchmarks.live_fanout [--viewers 1 2 4 8] [--frames 200] [--slow-ms 0] [--clip PATH]
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+
+from backend.core.config import settings
+from backend.services.broadcast import BroadcastHub
+from backend.services.yolo_service import YOLOService
+
+FULL_FRAME_ZONE = [{'id': 1, 'label': 'Full frame', 'coordinates': [[0, 0], [640, 0], [640, 360], [0, 360]]}]
+
+
+def consume(parts, frames: int, delay: float, results: list, index: int):
+    start = time.perf_counter()
+    seen = 0
+    for _ in parts:
+        seen += 1
+        if delay:
+            time.sleep(delay)
+        if seen >= frames:
+            break
+    parts.close()
+    results[index] = seen / (time.perf_counter() - start)
+
+
+def run_viewers(streams, frames: int, slow_ms: float):
+    results = [0.0] * len(streams)
+    threads = [
+        threading.Thread(target=consume, args=(stream, frames, slow_ms / 1000 if i == 0 else 0, results, i))
+        for i, stream in enumerate(streams)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--viewers', nargs='+', type=int, default=[1, 2, 4, 8])
+    parser.add_argument('--frames', type=int, default=200, help='Frames each viewer reads')
+    parser.add_argument('--slow-ms', type=float, default=0.0, help='Extra delay per frame for the first viewer')
+    parser.add_argument('--clip', help='Video to stream (default: smallest file in data/uploads)')
+    args = parser.parse_args()
+
+    clip = args.clip or min(glob.glob(os.path.join('data', 'uploads', '*.mp4')), key=os.path.getsize)
+    service = YOLOService()
+    service._load_model()
+    print(f"clip: {clip}, frames per viewer: {args.frames}, cpus: {os.cpu_count()}")
+    print(f"{'viewers':>7} {'mode':>10} {'seconds':>8} {'min fps':>8} {'max fps':>8} {'dropped':>8}")
+
+    for viewers in args.viewers:
+        streams = [service.analyze_video_mjpeg(clip, FULL_FRAME_ZONE) for _ in range(viewers)]
+        elapsed, fps = run_viewers(streams, args.frames, args.slow_ms)
+        print(f"{viewers:>7} {'per-viewer':>10} {elapsed:>8.2f} {min(fps):>8.1f} {max(fps):>8.1f} {'-':>8}")
+
+        hub = BroadcastHub()
+        subscriptions = [
+            hub.subscribe('bench', lambda: service.live_events(clip, FULL_FRAME_ZONE))
+            for _ in range(viewers)
+        ]
+        elapsed, fps = run_viewers([subscription.mjpeg() for subscription in subscriptions], args.frames, args.slow_ms)
+        print(f"{viewers:>7} {'shared':>10} {elapsed:>8.2f} {min(fps):>8.1f} {max(fps):>8.1f} {subscriptions[0].dropped:>8}")
+        # Let the session notice it has no viewers left and stop before the next round
+        time.sleep(settings.BROADCAST_IDLE_SECONDS + 1.0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Watch the adaptive live-stream controller settle on a bandwidth-limited viewer.
+
+Attaches one viewer to a live session of a clip and throttles it to
+--kbps (each message takes len / bandwidth seconds to "send"). Once per
+second prints the viewer's controller state: quality level, JPEG quality,
+scale, frame skip, smoothed delivery latency and bytes per frame, so the
+step-downs (and recoveries once --kbps allows it) can be followed.
+
+Usage (from the repository root):
+    python -m benchmarks.live_quality [--kbps 2000] [--seconds 30] [--target-ms 500] [--clip PATH]
+"""
+import argparse
+import glob
+import os
+import time
+
+from backend.core.config import settings
+from backend.services.broadcast import BroadcastHub
+from backend.services.yolo_service import YOLOService
+
+FULL_FRAME_ZONE = [{'id': 1, 'label': 'Full frame', 'coordinates': [[0, 0], [640, 0], [640, 360], [0, 360]]}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kbps', type=float, default=2000.0, help='Simulated viewer bandwidth in kilobits/sec')
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--target-ms', type=float, default=settings.LIVE_TARGET_LATENCY_MS)
+    parser.add_argument('--clip', help='Video to stream (default: smallest file in data/uploads)')
+    args = parser.parse_args()
+
+    settings.LIVE_TARGET_LATENCY_MS = args.target_ms
+    clip = args.clip or min(glob.glob(os.path.join('data', 'uploads', '*.mp4')), key=os.path.getsize)
+    service = YOLOService()
+    service._load_model()
+    hub = BroadcastHub()
+    subscription = hub.subscribe('bench', lambda: service.live_events(clip, FULL_FRAME_ZONE), transport='mjpeg')
+    messages = subscription.mjpeg()
+    print(f"clip: {clip}, bandwidth: {args.kbps:.0f} kbps, target latency: {args.target_ms:.0f} ms")
+    print(f"{'t':>5} {'level':>5} {'quality':>7} {'scale':>5} {'skip':>4} {'latency':>8} {'bytes/frame':>11} {'dropped':>7}")
+
+    start = time.monotonic()
+    next_report = start + 1.0
+    frames = bytes_sent = 0
+    for message in messages:
+        time.sleep(len(message) * 8 / (args.kbps * 1000))
+        frames += 1
+        bytes_sent += len(message)
+        now = time.monotonic()
+        if now >= next_report:
+            state = subscription.controller.state()
+            print(f"{now - start:>5.0f} {state['level']:>5} {str(state['jpeg_quality'] or settings.LIVE_JPEG_QUALITY):>7} "
+                  f"{state['scale']:>5.2f} {state['frame_skip']:>4} {state['latency_ms'] or 0:>6.0f}ms "
+                  f"{bytes_sent / max(1, frames):>11.0f} {subscription.dropped:>7}")
+            frames = bytes_sent = 0
+            next_report = now + 1.0
+        if now - start >= args.seconds:
+            break
+    messages.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Compare bytes and server CPU per frame of the SSE and WebSocket live transports.
+
+Runs one live analysis over --frames frames of a clip, keeps its events, then
+serializes every frame the way each transport does: SSE builds a JSON event
+with the JPEG base64-encoded inside it; the WebSocket endpoint sends a small
+JSON header and the raw JPEG as a binary message. Reports the average
+payload bytes per frame (excluding HTTP/WebSocket framing, a few bytes) and
+the CPU time per frame spent serializing, next to the analysis' own CPU per
+frame for scale.
+
+Usage (from the repository root):
+    python -m benchmarks.live_transport [--frames 300] [--clip PATH]
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from backend.services.broadcast import LiveEvent
+from backend.services.yolo_service import YOLOService
+
+FULL_FRAME_ZONE = [{'id': 1, 'label': 'Full frame', 'coordinates': [[0, 0], [640, 0], [640, 360], [0, 360]]}]
+
+
+def serialize_sse(event: LiveEvent) -> int:
+    return len(LiveEvent(event.data, event.jpeg).sse())
+
+
+def serialize_websocket(event: LiveEvent) -> int:
+    header = json.dumps(dict(event.data, type='frame'))
+    return len(header) + len(event.jpeg)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--clip', help='Video to stream (default: smallest file in data/uploads)')
+    args = parser.parse_args()
+
+    clip = args.clip or min(glob.glob(os.path.join('data', 'uploads', '*.mp4')), key=os.path.getsize)
+    service = YOLOService()
+    service._load_model()
+
+    frames = []
+    events = service.live_events(clip, FULL_FRAME_ZONE)
+    cpu_start = time.process_time()
+    for event in events:
+        if event.jpeg is None:
+            continue
+        frames.append(event)
+        if len(frames) >= args.frames:
+            break
+    analysis_cpu = (time.process_time() - cpu_start) / max(1, len(frames))
+    events.close()
+
+    jpeg_bytes = sum(len(event.jpeg) for event in frames) / len(frames)
+    print(f"clip: {clip}, frames: {len(frames)}, jpeg: {jpeg_bytes:.0f} bytes/frame, "
+          f"analysis: {analysis_cpu * 1000:.2f} ms cpu/frame")
+    print(f"{'transport':>10} {'bytes/frame':>12} {'vs jpeg':>8} {'cpu ms/frame':>13}")
+    for name, serialize in (('sse', serialize_sse), ('websocket', serialize_websocket)):
+        cpu_start = time.process_time()
+        total = sum(serialize(event) for event in frames)
+        cpu = (time.process_time() - cpu_start) / len(frames)
+        print(f"{name:>10} {total / len(frames):>12.0f} {total / len(frames) / jpeg_bytes:>7.2f}x {cpu * 1000:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
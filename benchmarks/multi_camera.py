@@ -0,0 +1,102 @@
+"""Benchmark many live cameras on one node: shared scheduler vs one model loop per camera.
+
+Serves a local clip as --cameras looping MJPEG streams (stand-in IP
+cameras, see benchmarks.camera_latency) and runs camera_events on each of
+them concurrently for --seconds, once with the shared camera scheduler
+(batched model calls on CAMERA_INFERENCE_WORKERS workers, each camera
+capped at --budget fps) and once with every camera calling the model on
+its own thread, as before the scheduler.
+
+Reports the analysis fps and glass-to-count latency per camera, the total
+frames analyzed per second, Jain's fairness index over the cameras'
+analysis rates (1.0 = perfectly even) and, for the scheduler, its average
+batch size and worker utilization.
+
+Usage (from the repository root):
+    python -m benchmarks.multi_camera [--cameras 16] [--budget 2] [--seconds 30] [--port 8600] [--clip PATH]
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+
+import numpy as np
+
+from backend.core.config import settings
+from backend.services.yolo_service import YOLOService
+from benchmarks.camera_latency import FULL_FRAME_ZONE, StandInCamera
+
+
+def watch(service: YOLOService, url: str, key: str, budget: float, seconds: float, latencies: list):
+    events = service.camera_events(url, FULL_FRAME_ZONE, key, fps_budget=budget)
+    start = time.monotonic()
+    try:
+        for event in events:
+            if 'error' in event.data:
+                print(f"{key}: {event.data['error']}")
+                break
+            # The first two seconds (connecting, warm-up) are left out of the rates
+            if 'latency_ms' in event.data and time.monotonic() - start > 2.0:
+                latencies.append(event.data['latency_ms'])
+            if time.monotonic() - start > seconds:
+                break
+    finally:
+        events.close()
+
+
+def run(service: YOLOService, urls: list, budget: float, seconds: float):
+    latencies = [[] for _ in urls]
+    threads = [
+        threading.Thread(target=watch, args=(service, url, f"bench_{i}", budget, seconds, latencies[i]))
+        for i, url in enumerate(urls)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds / 2)
+    scheduler_stats = service.scheduler.stats() if service.scheduler else None
+    for thread in threads:
+        thread.join()
+    rates = np.array([len(values) / (seconds - 2.0) for values in latencies])
+    return rates, latencies, scheduler_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clip', help='Clip to serve (default: smallest file in data/uploads)')
+    parser.add_argument('--cameras', type=int, default=16)
+    parser.add_argument('--budget', type=float, default=2.0, help='Analysis fps budget per camera')
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--port', type=int, default=8600)
+    args = parser.parse_args()
+
+    clip = args.clip or min(glob.glob(os.path.join('data', 'uploads', '*.mp4')), key=os.path.getsize)
+    cameras = [StandInCamera(clip, args.port + i) for i in range(args.cameras)]
+    urls = [f"http://127.0.0.1:{args.port + i}/stream.mjpg" for i in range(args.cameras)]
+    print(f"clip: {clip}, {args.cameras} cameras at {cameras[0].fps:.1f} fps, budget {args.budget} fps each, "
+          f"{args.seconds:.0f}s per run")
+
+    try:
+        for scheduled in (True, False):
+            settings.CAMERA_SCHEDULER = scheduled
+            service = YOLOService()
+            service._load_model()
+            rates, latencies, scheduler_stats = run(service, urls, args.budget, args.seconds)
+            all_latencies = np.concatenate([values for values in latencies if values] or [[0.0]])
+            fairness = rates.sum() ** 2 / (len(rates) * (rates ** 2).sum()) if rates.any() else 0.0
+            name = 'shared scheduler' if scheduled else 'loop per camera'
+            print(f"\n{name}:")
+            print(f"  analyzed: {rates.sum():6.2f} frames/s total, per camera min {rates.min():.2f} / "
+                  f"avg {rates.mean():.2f} / max {rates.max():.2f}, fairness {fairness:.3f}")
+            p50, p95 = np.percentile(all_latencies, [50, 95])
+            print(f"  glass-to-count: p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  max {all_latencies.max():7.1f} ms")
+            if scheduler_stats:
+                print(f"  scheduler: {scheduler_stats['workers']} worker(s), avg batch {scheduler_stats['avg_batch_size']}, "
+                      f"utilization {scheduler_stats['utilization']:.0%}")
+    finally:
+        for camera in cameras:
+            camera.close()
+
+
+if __name__ == '__main__':
+    main()
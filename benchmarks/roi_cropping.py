@@ -0,0 +1,64 @@
+"""Benchmark detection on the zones' region of interest vs the full frame.
+
+Analyzes each clip twice with a zone covering part of the 640x360 canvas
+(--zone x0 y0 x1 y1, default: the central quarter): once on the full frame
+and once with roi=True, so the model only sees the zone's bounding box
+plus ANALYSIS_ROI_MARGIN. Reports model input pixels per frame, wall-clock
+time, and how many timeline rows have a different zone count.
+
+Usage (from the repository root):
+    python -m benchmarks.roi_cropping [--zone 160 90 480 270] [--margin 0.05] [clip ...]
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import cv2
+
+from backend.core.config import settings
+from backend.services.preprocess import Letterbox
+from backend.services.recount import scale_zones
+from backend.services.timeline import iter_frame_data
+from backend.services.yolo_service import YOLOService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('clips', nargs='*', help='Video files (default: data/uploads/*.mp4)')
+    parser.add_argument('--zone', nargs=4, type=int, default=[160, 90, 480, 270], metavar=('X0', 'Y0', 'X1', 'Y1'))
+    parser.add_argument('--margin', type=float, default=settings.ANALYSIS_ROI_MARGIN)
+    args = parser.parse_args()
+
+    settings.ANALYSIS_ROI_MARGIN = args.margin
+    x0, y0, x1, y1 = args.zone
+    zones = [{'id': 1, 'label': 'Zone', 'coordinates': [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]}]
+    clips = args.clips or sorted(glob.glob(os.path.join('data', 'uploads', '*.mp4')))
+    service = YOLOService()
+    service._load_model()
+
+    print(f"{'clip':<40} {'full px':>9} {'roi px':>9} {'full s':>7} {'roi s':>7} {'speedup':>8} {'rows differ':>12}")
+    for clip in clips:
+        cap = cv2.VideoCapture(clip)
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        region = service.detection_region(scale_zones(zones, width, height), width, height, True)
+        full_pixels = Letterbox(width, height, service.input_size).pixels
+        roi_pixels = Letterbox(width, height, service.input_size, region).pixels
+
+        timings, timelines = [], []
+        with tempfile.TemporaryDirectory() as out_dir:
+            for roi in (False, True):
+                start = time.perf_counter()
+                result = service.analyze_video(clip, zones, os.path.join(out_dir, f"roi_{roi}.mp4"),
+                                               use_cache=False, roi=roi)
+                timings.append(time.perf_counter() - start)
+                timelines.append([row['counts'] for row in iter_frame_data(result['frame_data_path'])])
+        differ = sum(1 for a, b in zip(*timelines) if a != b)
+        print(f"{os.path.basename(clip)[:40]:<40} {full_pixels:>9} {roi_pixels:>9} {timings[0]:>7.2f} "
+              f"{timings[1]:>7.2f} {timings[0] / timings[1]:>7.2f}x {differ:>12}")
+
+
+if __name__ == '__main__':
+    main()
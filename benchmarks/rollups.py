@@ -0,0 +1,104 @@
+"""Benchmark timeline rollups: building and inserting them, and querying SQL vs the frame JSON.
+
+Writes a synthetic timeline (--hours of video at --fps with --zones zones)
+and rolls it up into ROLLUP_BUCKETS buckets in an in-memory SQLite
+database (--db to use another URL), timing the aggregation and the bulk
+inserts separately. Then answers a dashboard-style question, the per-zone
+min/max/average over a --window-minutes window at 10s resolution, both
+with SQL over the rollup table and by loading the legacy _frames.json
+into Python, as before the rollups, and checks the answers agree.
+
+Usage (from the repository root):
+    python -m benchmarks.rollups [--hours 2] [--fps 25] [--zones 4] [--window-minutes 30] [--db sqlite://]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from backend import models
+from backend.core.config import settings
+from backend.services.rollups import rollup_rows
+from backend.services.timeline import TimelineReader, TimelineWriter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=float, default=2.0)
+    parser.add_argument('--fps', type=float, default=25.0)
+    parser.add_argument('--zones', type=int, default=4)
+    parser.add_argument('--window-minutes', type=float, default=30.0)
+    parser.add_argument('--db', default='sqlite://')
+    args = parser.parse_args()
+
+    rows = int(args.hours * 3600 * args.fps)
+    labels = [f"Zone {i + 1}" for i in range(args.zones)]
+    rng = np.random.default_rng(0)
+    times = np.arange(rows) / args.fps
+    counts = rng.poisson(5 + 4 * np.sin(times[:, None] / 600 + np.arange(args.zones)), (rows, args.zones))
+
+    engine = create_engine(args.db)
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        path = os.path.join(out_dir, 'bench_timeline')
+        timeline = TimelineWriter(path, labels, args.fps)
+        timeline.append_arrays(times, counts)
+        timeline.close()
+        reader = TimelineReader(path)
+        json_path = reader.export_json(os.path.join(out_dir, 'bench_frames.json'))
+        print(f"timeline: {rows} rows x {args.zones} zones, frames JSON {os.path.getsize(json_path) / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        rollups = [dict(row, result_id=1, video_id=1) for row in rollup_rows(reader, settings.ROLLUP_BUCKETS)]
+        aggregated = time.perf_counter() - start
+        start = time.perf_counter()
+        table = models.ZoneCountRollup.__table__
+        for i in range(0, len(rollups), settings.ROLLUP_INSERT_BATCH):
+            db.execute(table.insert(), rollups[i:i + settings.ROLLUP_INSERT_BATCH])
+        db.commit()
+        inserted = time.perf_counter() - start
+        print(f"rollups: {len(rollups)} rows for buckets {settings.ROLLUP_BUCKETS}, "
+              f"aggregate {aggregated:.2f}s, insert {inserted:.2f}s ({len(rollups) / inserted:,.0f} rows/s)")
+
+        # Whole minutes, so the window is made of whole 10s buckets
+        window_start = max(0.0, np.floor(times[-1] / 2 / 60 - args.window_minutes / 2) * 60)
+        window_end = window_start + args.window_minutes * 60
+
+        start = time.perf_counter()
+        rollup = models.ZoneCountRollup
+        sql = {
+            label: (low, high, avg)
+            for label, low, high, avg in db.query(
+                rollup.zone_label, func.min(rollup.min_count), func.max(rollup.max_count),
+                func.sum(rollup.avg_count * rollup.samples) / func.sum(rollup.samples)
+            ).filter(
+                rollup.result_id == 1, rollup.bucket_seconds == 10,
+                rollup.bucket_start >= window_start, rollup.bucket_start < window_end
+            ).group_by(rollup.zone_label).all()
+        }
+        sql_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(json_path) as f:
+            frames = [row for row in json.load(f) if window_start <= row['time'] < window_end]
+        loaded = {
+            label: (min(values), max(values), sum(values) / len(values))
+            for label in labels
+            for values in [[row['counts'][label] for row in frames]]
+        }
+        json_seconds = time.perf_counter() - start
+
+    agree = all(np.allclose(sql[label], loaded[label], atol=0.01) for label in labels)
+    print(f"window of {args.window_minutes:.0f} min: SQL over rollups {sql_seconds * 1000:8.1f} ms, "
+          f"frames JSON {json_seconds * 1000:8.1f} ms ({json_seconds / sql_seconds:.0f}x), answers agree: {agree}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark segmented (chunked parallel) analysis of a single video.
+
+Runs analyze_video on one clip with 1, 2, 4 and 8 time segments, reports the
+wall-clock time and speedup, and checks that the stitched timeline and zone
+counts match the single-pass run.
+
+Usage (from the repository root):
+    python -m benchmarks.segmented_analysis [--segments 1 2 4 8] [--min-seconds 5] [--clip PATH]
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from backend.core.config import settings
+from backend.services.timeline import iter_frame_data
+from backend.services.yolo_service import YOLOService
+
+FULL_FRAME_ZONE = [{'id': 1, 'label': 'Full frame', 'coordinates': [[0, 0], [640, 0], [640, 360], [0, 360]]}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--segments', nargs='+', type=int, default=[1, 2, 4, 8])
+    parser.add_argument('--clip', help='Video to analyze (default: largest file in data/uploads)')
+    parser.add_argument('--min-seconds', type=float, default=5.0, help='Shortest segment to split off')
+    parser.add_argument('--detect-stride', type=int, default=1)
+    parser.add_argument('--fill', default='hold')
+    args = parser.parse_args()
+
+    settings.ANALYSIS_MIN_SEGMENT_SECONDS = args.min_seconds
+    clip = args.clip or max(glob.glob(os.path.join('data', 'uploads', '*.mp4')), key=os.path.getsize)
+    service = YOLOService()
+    print(f"clip: {clip}, cpus: {os.cpu_count()}")
+    print(f"{'segments':>8} {'used':>5} {'seconds':>8} {'speedup':>8} {'timeline':>9} {'counts':>7}")
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as out_dir:
+        for segments in args.segments:
+            output_path = os.path.join(out_dir, f"seg_{segments}.mp4")
+            start = time.perf_counter()
+            result = service.analyze_video(clip, FULL_FRAME_ZONE, output_path, segments=segments,
+                                           detect_stride=args.detect_stride, fill=args.fill,
+                                           use_cache=False, motion=False)
+            elapsed = time.perf_counter() - start
+            timeline = list(iter_frame_data(result['frame_data_path']))
+            if baseline is None:
+                baseline = (elapsed, timeline, result['zone_counts'])
+            same_timeline = 'same' if timeline == baseline[1] else 'DIFFER'
+            same_counts = 'same' if result['zone_counts'] == baseline[2] else 'DIFFER'
+            print(f"{segments:>8} {result.get('segments', 1):>5} {elapsed:>8.2f} "
+                  f"{baseline[0] / elapsed:>7.2f}x {same_timeline:>9} {same_counts:>7}")
+
+
+if __name__ == '__main__':
+    main()
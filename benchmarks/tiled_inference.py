@@ -0,0 +1,118 @@
+"""Benchmark tiled inference: accuracy vs throughput, and memory.
+
+Each mode runs in its own spawned process (so peak RSS is per mode) over
+the first --frames frames of a clip:
+- single: one letterboxed pass per frame (the default path);
+- tiled: overlapping TILE_SIZE native tiles merged with cross-tile NMS;
+- tiled+overview: the same plus a downscaled full-frame pass.
+There is no ground truth, so recall is measured against the union-like
+reference of the most thorough mode (tiled+overview): the share of its
+boxes another mode finds at IoU >= 0.5. Also reported: frames/sec, people
+per frame, small people (box height < --small px) per frame and peak RSS.
+
+Usage (from the repository root):
+    python -m benchmarks.tiled_inference [--frames 60] [--tile 640] [--overlap 0.2] [--clip PATH]
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import resource
+import time
+
+import numpy as np
+
+MODES = ('single', 'tiled', 'tiled+overview')
+
+
+def run_mode(mode, clip, frames, tile, overlap, batch_size):
+    import cv2
+
+    from backend.core.config import settings
+    from backend.services.yolo_service import YOLOService
+
+    settings.TILE_SIZE = tile
+    settings.TILE_OVERLAP = overlap
+    settings.TILE_OVERVIEW = mode == 'tiled+overview'
+    service = YOLOService()
+    service._load_model()
+
+    cap = cv2.VideoCapture(clip)
+    images = []
+    while len(images) < frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        images.append(frame)
+    cap.release()
+    height, width = images[0].shape[:2]
+    view = service.detection_input(width, height, tiled=mode != 'single')
+
+    detections = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        detections.extend(boxes for boxes, _ in service._detect_batch(images[i:i + batch_size], view))
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        'size': f"{width}x{height}",
+        'tiles': len(view.tiles) if mode != 'single' else 1,
+        'fps': len(images) / elapsed,
+        'peak_mb': peak_mb,
+        'boxes': detections,
+    }
+
+
+def iou_matrix(a, b):
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)))
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def recall(found, reference):
+    hits = total = 0
+    for boxes, ref in zip(found, reference):
+        total += len(ref)
+        if len(ref) and len(boxes):
+            hits += int((iou_matrix(ref, boxes).max(axis=1) >= 0.5).sum())
+    return hits / total if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clip', help='Video to analyze (default: largest file in data/uploads)')
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--tile', type=int, default=640)
+    parser.add_argument('--overlap', type=float, default=0.2)
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--small', type=int, default=32, help='Box height (px) below which a person counts as small')
+    args = parser.parse_args()
+
+    clip = args.clip or max(glob.glob(os.path.join('data', 'uploads', '*.mp4')), key=os.path.getsize)
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for mode in MODES:
+        with context.Pool(1) as pool:
+            results[mode] = pool.apply(run_mode, (mode, clip, args.frames, args.tile, args.overlap, args.batch_size))
+
+    reference = results[MODES[-1]]['boxes']
+    print(f"clip: {clip} ({results['single']['size']}), frames: {len(reference)}")
+    print(f"{'mode':>15} {'tiles':>5} {'fps':>7} {'people':>7} {'small':>6} {'recall':>7} {'peak MB':>8}")
+    for mode in MODES:
+        result = results[mode]
+        boxes = result['boxes']
+        people = np.mean([len(b) for b in boxes])
+        small = np.mean([int(((b[:, 3] - b[:, 1]) < args.small).sum()) if len(b) else 0 for b in boxes])
+        print(f"{mode:>15} {result['tiles']:>5} {result['fps']:>7.2f} {people:>7.1f} {small:>6.1f} "
+              f"{recall(boxes, reference):>7.1%} {result['peak_mb']:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark the tracker: count accuracy with sparse detection, and its overhead.
+
+For each clip, a stride-1 analysis with tracking is the reference. Then
+every --strides value is analyzed with fill='hold' (counts held between
+detections) and fill='track' (counts from the tracks' predicted boxes).
+Reports wall-clock time, the mean absolute error of the per-frame zone
+counts against the reference, and the unique visitors found, summed over
+the zones. A stride-1 run without tracking shows the tracker's own cost.
+
+Usage (from the repository root):
+    python -m benchmarks.tracking [--strides 2 4 8] [--zone 0 0 640 360] [clip ...]
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from backend.services.timeline import iter_frame_data
+from backend.services.yolo_service import YOLOService
+
+
+def run(service, clip, zones, out_dir, name, **options):
+    start = time.perf_counter()
+    result = service.analyze_video(clip, zones, os.path.join(out_dir, f"{name}.mp4"), use_cache=False,
+                                   segments=1, motion=False, **options)
+    elapsed = time.perf_counter() - start
+    counts = np.array([list(row['counts'].values()) for row in iter_frame_data(result['frame_data_path'])])
+    unique = sum(zone.get('unique', 0) for zone in result['zone_counts'])
+    return elapsed, counts, unique
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('clips', nargs='*', help='Video files (default: data/uploads/*.mp4)')
+    parser.add_argument('--strides', nargs='+', type=int, default=[2, 4, 8])
+    parser.add_argument('--zone', nargs=4, type=int, default=[0, 0, 640, 360], metavar=('X0', 'Y0', 'X1', 'Y1'))
+    args = parser.parse_args()
+
+    x0, y0, x1, y1 = args.zone
+    zones = [{'id': 1, 'label': 'Zone', 'coordinates': [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]}]
+    clips = args.clips or sorted(glob.glob(os.path.join('data', 'uploads', '*.mp4')))
+    service = YOLOService()
+    service._load_model()
+
+    print(f"{'clip':<32} {'stride':>6} {'fill':>6} {'seconds':>8} {'count MAE':>10} {'unique':>7}")
+    for clip in clips:
+        name = os.path.basename(clip)[:32]
+        with tempfile.TemporaryDirectory() as out_dir:
+            elapsed, _, _ = run(service, clip, zones, out_dir, 'untracked', track=False)
+            print(f"{name:<32} {1:>6} {'-':>6} {elapsed:>8.2f} {'-':>10} {'-':>7}")
+            elapsed, reference, unique = run(service, clip, zones, out_dir, 'reference', track=True)
+            print(f"{name:<32} {1:>6} {'hold':>6} {elapsed:>8.2f} {0.0:>10.3f} {unique:>7}")
+            for stride in args.strides:
+                for fill in ('hold', 'track'):
+                    elapsed, counts, unique = run(service, clip, zones, out_dir, f"{fill}_{stride}",
+                                                  detect_stride=stride, fill=fill, track=True)
+                    rows = min(len(counts), len(reference))
+                    error = np.abs(counts[:rows] - reference[:rows]).mean() if rows else 0.0
+                    print(f"{name:<32} {stride:>6} {fill:>6} {elapsed:>8.2f} {error:>10.3f} {unique:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Micro-benchmark for zone assignment of detection centers.
+
+Compares the scalar point_in_polygon loop (every box against every zone,
+first match wins) with the vectorized ZoneIndex for 10, 100 and 500
+detections per frame and 1 to 50 zones, and checks both give the same
+assignment.
+
+Usage (from the repository root):
+    python -m benchmarks.zone_assignment [--frames 200]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.services.yolo_service import YOLOService
+from backend.services.zone_geometry import ZoneIndex
+
+WIDTH, HEIGHT = 1920, 1080
+
+
+def random_zones(rng, count):
+    """Random convex-ish polygons with 4-8 vertices spread over the frame"""
+    zones = []
+    for i in range(count):
+        cx, cy = rng.uniform(0, WIDTH), rng.uniform(0, HEIGHT)
+        radius = rng.uniform(80, 400)
+        vertices = rng.randint(4, 9)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+        coords = np.stack([cx + radius * np.cos(angles), cy + radius * np.sin(angles)], axis=1).astype(int)
+        zones.append({'id': i + 1, 'label': f'Zone {i + 1}', 'coordinates': coords.tolist()})
+    return zones
+
+
+def scalar_assign(service, centers, zones):
+    assigned = []
+    for center_x, center_y in centers:
+        match = -1
+        for index, zone in enumerate(zones):
+            if service.point_in_polygon((center_x, center_y), zone['coordinates']):
+                match = index
+                break
+        assigned.append(match)
+    return np.array(assigned)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=200, help='Frames (center sets) per configuration')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(args.seed)
+    service = YOLOService()
+
+    print(f"{'detections':>10} {'zones':>6} {'scalar ms':>10} {'vector ms':>10} {'speedup':>8} {'match':>6}")
+    for detections in (10, 100, 500):
+        for zone_count in (1, 5, 10, 25, 50):
+            zones = random_zones(rng, zone_count)
+            frames = [rng.randint(0, [WIDTH, HEIGHT], size=(detections, 2)) for _ in range(args.frames)]
+
+            start = time.perf_counter()
+            scalar = [scalar_assign(service, [(int(x), int(y)) for x, y in centers], zones) for centers in frames]
+            scalar_ms = (time.perf_counter() - start) * 1000 / args.frames
+
+            start = time.perf_counter()
+            index = ZoneIndex(zones)  # built once per video in the analysis paths
+            vector = [index.assign(centers) for centers in frames]
+            vector_ms = (time.perf_counter() - start) * 1000 / args.frames
+
+            match = all(np.array_equal(a, b) for a, b in zip(scalar, vector))
+            print(f"{detections:>10} {zone_count:>6} {scalar_ms:>10.3f} {vector_ms:>10.3f} "
+                  f"{scalar_ms / vector_ms:>7.1f}x {'yes' if match else 'NO':>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -248,16 +248,6 @@ export default function Analytics() {
       setProcessingTime(prev => prev + 1);
     }, 1000);
 
-    progressRef.current = setInterval(async () => {
-      try {
-        const res = await fetch(`http://127.0.0.1:8000/api/analysis/progress/${selectedVideo.id}`);
-        const data = await res.json();
-        setProgress(data.percentage || 0);
-      } catch (err) {
-        console.error('Failed to fetch progress');
-      }
-    }, 500);
-
     try {
       const response = await fetch(`http://127.0.0.1:8000/api/analysis/start`, {
         method: 'POST',
@@ -273,7 +263,29 @@ export default function Analytics() {
         throw new Error(error.detail || 'Analysis failed');
       }
 
-      const data = await response.json();
+      // The analysis runs as a background job; poll it until it finishes
+      const job = await response.json();
+      const finishedJob: any = await new Promise((resolve) => {
+        progressRef.current = setInterval(async () => {
+          try {
+            const res = await fetch(`http://127.0.0.1:8000/api/analysis/jobs/${job.job_id}`);
+            const data = await res.json();
+            setProgress(data.progress || 0);
+            if (['completed', 'failed', 'cancelled'].includes(data.status)) {
+              if (progressRef.current) clearInterval(progressRef.current);
+              resolve(data);
+            }
+          } catch (err) {
+            console.error('Failed to fetch job status');
+          }
+        }, 500);
+      });
+
+      if (finishedJob.status !== 'completed' || !finishedJob.result) {
+        throw new Error(finishedJob.error || `Analysis ${finishedJob.status}`);
+      }
+
+      const data = finishedJob.result;
       setResult(data);
       if (data.frame_data_path) {
         loadFrameData(selectedVideo.id);